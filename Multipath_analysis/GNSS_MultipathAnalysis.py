@@ -1,5 +1,6 @@
 import os, numpy as np, pickle
 from readRinexObs import *
+from rinexObsCache import readRinexObsCached
 from Geodetic_functions import *
 from computeSatElevations import computeSatElevations
 from computeSatElevAimut_fromNav import computeSatElevAimut_fromNav
@@ -33,7 +34,13 @@ def GNSS_MultipathAnalysis(rinObsFilename,
                           includeResultSummary= None,
                           includeCompactSummary=None,
                           includeObservationOverview=None,
-                          includeLLIOverview= None
+                          includeLLIOverview= None,
+                          tStart=None,
+                          tEnd=None,
+                          nReadWorkers=None,
+                          useObsCache=None,
+                          obsCacheDir=None,
+                          obsCodePairsOnly=None
                           ):
     
     """
@@ -71,7 +78,12 @@ def GNSS_MultipathAnalysis(rinObsFilename,
     --------------------------------------------------------------------------------------------------------------------------
     INPUTS:
     
-    rinObsFilename:           string. Path to RINEX 3 observation file
+    rinObsFilename:           string. Path to RINEX 3 observation file. May be
+                              compressed by gzip (.gz), bzip2 (.bz2) or Unix 
+                              compress (.Z)
+                              Can also be a list of paths to observation files
+                              of one session, in order of time, that are 
+                              analysed as one continuous file. See readRinexObs
     
     sp3NavFilename_1:         string. Path to first SP3 navigation file
     
@@ -122,6 +134,28 @@ def GNSS_MultipathAnalysis(rinObsFilename,
     includeObservationOverview:     boolean. 1 if user desires output file to
                                       include overview of obseration types observed
                                       by each satellite. 0 otherwise (optional)
+    
+    tStart:                   start of time window to analyse, [YYYY, MM, DD, hh, mm, ss].
+                              Default: first epoch of observation file (optional)
+    
+    tEnd:                     end of time window to analyse, [YYYY, MM, DD, hh, mm, ss].
+                              Default: last epoch of observation file (optional)
+    
+    nReadWorkers:             number of processes used to read the RINEX observation 
+                              file. Useful for large high-rate files. Default: 1 (optional)
+    
+    useObsCache:              boolean. 1 if the decoded observations should be stored in, 
+                              and loaded from, a cache. Reruns on the same observation 
+                              file then skip parsing the file. Default: 0 (optional)
+    
+    obsCacheDir:              directory of observation cache files. 
+                              Default: ~/.cache/GNSS_Multipath_Analysis (optional)
+    
+    obsCodePairsOnly:         boolean. 1 if only code and phase observations that can 
+                              form code-phase linear combinations should be read. 
+                              Reading is faster, but codes without phase observations,
+                              and bands without such pairs, are then left out of the 
+                              results and output file. Default: 0 (optional)
     --------------------------------------------------------------------------------------------------------------------------
     OUTPUTS:
     
@@ -188,6 +222,12 @@ def GNSS_MultipathAnalysis(rinObsFilename,
     if includeLLIOverview == None:
         includeLLIOverview = 1
 
+    if useObsCache == None:
+        useObsCache = 0
+
+    if obsCodePairsOnly == None:
+        obsCodePairsOnly = 0
+
     if desiredGNSSsystems == None:
         includeAllGNSSsystems   = 1
         desiredGNSSsystems = ["G", "R", "E", "C"];  # All GNSS systems.
@@ -215,14 +255,15 @@ def GNSS_MultipathAnalysis(rinObsFilename,
         analysisResults = np.nan
         return
     
-    if type(rinObsFilename) != str:
-        print('ERROR(GNSS_Receiver_QC_2020): The input variable rinObsFilename must be a string\n' \
+    rinObsFilenames = [rinObsFilename] if type(rinObsFilename) == str else rinObsFilename
+    if type(rinObsFilenames) not in [list, tuple] or len(rinObsFilenames) == 0 or any([type(file) != str for file in rinObsFilenames]):
+        print('ERROR(GNSS_Receiver_QC_2020): The input variable rinObsFilename must be a string or a list of strings\n' \
             'Argument is now of type %s\n' %  (type(rinObsFilename)))
         analysisResults = np.nan
         return
  
     
-    if not os.path.isfile(rinObsFilename):
+    if not all([os.path.isfile(file) for file in rinObsFilenames]):
         print('ERROR(GNSS_Receiver_QC_2020): RINEX observation file can not be found. Please check that the path is correct.\n') 
         analysisResults = np.nan
         return 
@@ -256,11 +297,20 @@ def GNSS_MultipathAnalysis(rinObsFilename,
     readLLI = 1
     
     ## --- Read RINEX 3.0x observation file
-    [GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs, GNSSsystems,\
-        obsCodes, approxPosition, max_sat, tInterval, markerName, rinexVersion, recType, timeSystem, leapSec, gnssType,\
-        rinexProgr, rinexDate, antDelta, tFirstObs, tLastObs, clockOffsetsON, GLO_Slot2ChannelMap, success] = \
-        readRinexObs(rinObsFilename, readSS=readSS, readLLI=readLLI, includeAllGNSSsystems=includeAllGNSSsystems,includeAllObsCodes=includeAllObsCodes, desiredGNSSsystems=desiredGNSSsystems,\
-        desiredObsCodes=desiredObsCodes, desiredObsBands=desiredObsBands)
+    if useObsCache:
+        [GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs, GNSSsystems,\
+            obsCodes, approxPosition, max_sat, tInterval, markerName, rinexVersion, recType, timeSystem, leapSec, gnssType,\
+            rinexProgr, rinexDate, antDelta, tFirstObs, tLastObs, clockOffsetsON, GLO_Slot2ChannelMap, success] = \
+            readRinexObsCached(rinObsFilename, readSS=readSS, readLLI=readLLI, includeAllGNSSsystems=includeAllGNSSsystems,includeAllObsCodes=includeAllObsCodes, desiredGNSSsystems=desiredGNSSsystems,\
+            desiredObsCodes=desiredObsCodes, desiredObsBands=desiredObsBands, denseObs=1, tStart=tStart, tEnd=tEnd, useMmap=1, nWorkers=nReadWorkers, cacheDir=obsCacheDir, \
+            obsCodePairsOnly=obsCodePairsOnly)
+    else:
+        [GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs, GNSSsystems,\
+            obsCodes, approxPosition, max_sat, tInterval, markerName, rinexVersion, recType, timeSystem, leapSec, gnssType,\
+            rinexProgr, rinexDate, antDelta, tFirstObs, tLastObs, clockOffsetsON, GLO_Slot2ChannelMap, success] = \
+            readRinexObs(rinObsFilename, readSS=readSS, readLLI=readLLI, includeAllGNSSsystems=includeAllGNSSsystems,includeAllObsCodes=includeAllObsCodes, desiredGNSSsystems=desiredGNSSsystems,\
+            desiredObsCodes=desiredObsCodes, desiredObsBands=desiredObsBands, denseObs=1, tStart=tStart, tEnd=tEnd, useMmap=1, nWorkers=nReadWorkers, \
+            obsCodePairsOnly=obsCodePairsOnly)
             
             
     sat_pos = {}
@@ -277,10 +327,7 @@ def GNSS_MultipathAnalysis(rinObsFilename,
         sat_pos_dummy = sat_pos.copy()
         for sys in np.arange(0,len(GNSSsystems)):
             currentGNSSsystem = GNSSsystems[sys+1]
-            if currentGNSSsystem != 'C':
-                sat_elevation_angles[sys] = sat_pos_dummy[currentGNSSsystem]['Elevation'][:,0:37]
-            else:
-                sat_elevation_angles[sys] = sat_pos_dummy[currentGNSSsystem]['Elevation']
+            sat_elevation_angles[sys] = sat_pos_dummy[currentGNSSsystem]['Elevation'][:,0:int(max_sat[sys][0])+1]
             
         ## - Check for missing systems in navigation file, and remove if found
         missing_sys = []
@@ -378,8 +425,12 @@ def GNSS_MultipathAnalysis(rinObsFilename,
         ## -- Extract the possible bands of current GNSS system, example GPS: 1,2,5
         GNSSsystemPossibleBands = GNSSsystem2BandsMap[GNSSsystemName]
         nPossibleBands = len(GNSSsystemPossibleBands)
+        ## -- Overview of all PRN of the constellation. For GLONASS also all slots of the header
+        nSatOverview = int(max_sat[sys][0])
+        if GNSSsystems[sys+1] == 'R' and len(GLO_Slot2ChannelMap) > 0:
+            nSatOverview = max(nSatOverview, int(max(GLO_Slot2ChannelMap.keys())))
         
-        for i in np.arange(0,int(max_sat[sys][0])):
+        for i in np.arange(0,nSatOverview):
             i = i + 1 # dont want sat_0 but sat_1
             ## create field for current sat. Field is dict
             current_sys_dict['observationOverview']['Sat_'+ str(i)] = {}
@@ -462,6 +513,8 @@ def GNSS_MultipathAnalysis(rinObsFilename,
             ## create linear combination. The analysis with the most estimates
             ## is the analysis that is stored.
             
+            ## Codes without phase observations. Removed from band dict after the loop over its codes
+            codes_without_phase = []
             for i in np.arange(0,nCodes): # replaced "range" with np.arange for speed
                 ## -- Get code(range) and phase obervation codes
                 range1_Code = current_band_dict['Codes'][i]
@@ -582,12 +635,14 @@ def GNSS_MultipathAnalysis(rinObsFilename,
                   
                     else:
                         ## If phase1 observation is not read from RINEX observation file
-                        print('\nINFO(GNSS_MultipathAnalysis): %s code exists in RINEX observation file, but not %s\n',\
+                        print('\nINFO(GNSS_MultipathAnalysis): %s code exists in RINEX observation file, but not %s\n' \
                                         'Linear combination using this signal is not used.\n\n' % (range1_Code, phase1_Code))
 
-                        current_band_dict['Codes'][ismember(current_band_dict['Codes'], range1_Code)] = []
-                        current_band_dict['nCodes'] = current_band_dict['nCodes'] - 1 
-                        
+                        codes_without_phase.append(range1_Code)
+            
+            for range1_Code in codes_without_phase:
+                current_band_dict['Codes'].remove(range1_Code)
+                current_band_dict['nCodes'] = current_band_dict['nCodes'] - 1 
                          
             ## -- Replace the, now altered, hard copy of current band dict in its original place in system dict
             current_sys_dict[current_sys_dict['Bands'][bandNumInd]] = current_band_dict
@@ -605,8 +660,7 @@ def GNSS_MultipathAnalysis(rinObsFilename,
         analysisResults[GNSSsystemName] = current_sys_dict
     
         ## -- Store information needed for output file in result dict
-        rinex_obs_filename = rinObsFilename.split('/')
-        rinex_obs_filename = rinex_obs_filename[-1]
+        rinex_obs_filename = ', '.join([os.path.basename(file) for file in rinObsFilenames])
         
         analysisResults['ExtraOutputInfo']  = {}
         analysisResults['ExtraOutputInfo']['rinex_obs_filename']  = rinex_obs_filename
@@ -660,7 +714,7 @@ def GNSS_MultipathAnalysis(rinObsFilename,
     if not os.path.isdir(graphDir):
         os.mkdir(graphDir)
         
-    baseFileName = os.path.basename(rinObsFilename)
+    baseFileName = os.path.basename(rinObsFilenames[0])
     outputFilename = baseFileName.split('.')[0] +   '_Report.txt'
     writeOutputFile(outputFilename, outputDir, analysisResults, includeResultSummary, includeCompactSummary, includeObservationOverview, includeLLIOverview)
     print('INFO: The output file %s has been written.\n' % (outputFilename))
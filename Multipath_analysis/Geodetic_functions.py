@@ -187,6 +187,25 @@ def date2gpstime(year,month,day,hour,minute,seconds):
     return week, tow
 
 
+def dates2gpstime(dates):
+    """
+    Vectorized version of date2gpstime. Computing GPS-week nr. and "time-of-week"
+    for every row of dates, a matrix [n x 6] with [year,month,day,hour,min,sec].
+    Gives the same values as date2gpstime called on each row.
+    """
+    dates = np.asarray(dates, dtype=float).reshape(-1, 6)
+    ## -- Days since 06.01.1980, from the calendar date of each row
+    days = (dates[:,0].astype(int) - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (dates[:,1].astype(int) - 1)
+    days = days.astype('datetime64[D]') + (dates[:,2].astype(int) - 1)
+    days = (days - np.datetime64('1980-01-06')).astype(int)
+    week_flt = days/7
+    week = np.fix(week_flt)
+    tow_0 = (week_flt-week)*604800
+    tow = tow_0 + dates[:,3]*3600 + dates[:,4]*60 + dates[:,5]
+
+    return week, tow
+
+
 
 # def date2gpstime(year, month, day, hour, minute, seconds):
 #     """
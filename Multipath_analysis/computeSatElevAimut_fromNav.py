@@ -1,6 +1,7 @@
 import numpy as np
 from readRinexNav import read_rinex3_nav
 from Geodetic_functions import *
+from prnColumnMap import getObservedPRNs
 import pandas as pd, re, os
 # from datetime import datetime
 
@@ -44,16 +45,13 @@ def computeSatElevAimut_fromNav(navigationFile,approxPosition,GNSS_SVs,GNSS_obs,
         sat_pos[sys] = {}                  # new dict for each system
         curr_pos = {}                      # Cells for storing data
         nepochs = len(GNSS_obs[sys])       # total nr of epochs 
-        X = np.zeros([nepochs,61])         # Array for storing X-coordinate
-        Y = np.zeros([nepochs,61])         # Array for storing X-coordinate
-        Z = np.zeros([nepochs,61])         # Array for storing X-coordinate
-        azimut    = np.zeros([nepochs,61]) # Array for storing satellites azimut angle
-        elevation = np.zeros([nepochs,61]) # Array for storing Satellites elevation angle
-        aktuelle_sat_list_all = []         # Dummy list for availible satellites
-        for ep in np.arange(0,nepochs):
-            aktuelle_sat = [PRN for PRN in list(GNSS_SVs[sys][ep][1::].astype(int)) if PRN !=0] ## added [1::] because first ele is nr of satellites
-            aktuelle_sat_list_all.append(aktuelle_sat)
-        aktuelle_sat_list_all = sorted(list({x for l in aktuelle_sat_list_all for x in l})) # finding uniqe value in list in list
+        aktuelle_sat_list_all = getObservedPRNs(GNSS_SVs[sys]).tolist() # List of availible satellites, sorted
+        nSat = aktuelle_sat_list_all[-1] + 1 if len(aktuelle_sat_list_all) > 0 else 1 # columns up to highest PRN with observations
+        X = np.zeros([nepochs,nSat])         # Array for storing X-coordinate
+        Y = np.zeros([nepochs,nSat])         # Array for storing X-coordinate
+        Z = np.zeros([nepochs,nSat])         # Array for storing X-coordinate
+        azimut    = np.zeros([nepochs,nSat]) # Array for storing satellites azimut angle
+        elevation = np.zeros([nepochs,nSat]) # Array for storing Satellites elevation angle
             
         ## -- Run through all epochs
         null_epoch = time_epochs[:,1][0]
@@ -4,6 +4,7 @@ from readRinexNav import *
 from get_elevation_angle import get_elevation_angle
 from gpstime2date import gpstime2date
 from tqdm import tqdm
+from prnColumnMap import getObservedPRNs
 import numpy as np
 
 def computeSatElevations(GNSS_SVs, GNSSsystems, approxPosition,\
@@ -119,11 +120,11 @@ def computeSatElevations(GNSS_SVs, GNSSsystems, approxPosition,\
     
     for i in np.arange(0,nGNSSsystems):
        curr_sys = GNSSsystems[i+1]
-       nepochs_current_sys, max_sat_current_sys = GNSS_SVs[curr_sys].shape
-       FirstLastObsEpochOverview[i] = np.zeros([nepochs_current_sys, max_sat_current_sys])
+       nepochs_current_sys = GNSS_SVs[curr_sys].shape[0]
+       FirstLastObsEpochOverview[i] = np.zeros([nepochs_current_sys, int(max_sat[i]) + 1])
        
-       for PRN_ in np.arange(0,max_sat_current_sys-1):
-          PRN = PRN_ + 1 # add 1 because of python null-indexed
+       ## -- Only satellites with observations. Columns of other PRN remain 0
+       for PRN in getObservedPRNs(GNSS_SVs[curr_sys]):
           # logical, 1 for every epoch with observation for this PRN
           dumm = GNSS_SVs[curr_sys][:, 1::] ==PRN
           dummy = np.sum(dumm.astype(np.int8),axis=1).reshape(len(dumm.astype(np.int8)),1)
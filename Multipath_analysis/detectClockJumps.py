@@ -4,18 +4,18 @@ def detectClockJumps(GNSS_obs, nGNSSsystems, obsCodes, time_epochs, tInterval, G
     --------------------------------------------------------------------------------------------------------------------------
     INPUTS
     
-    GNSS_obs:                 cell containing a matrix for each GNSS system.
+    GNSS_obs:                 dict containing a matrix for each GNSS system.
                               Each matrix is a 3D matrix containing all 
                               observation of current GNSS system for all epochs. 
                               Order of obsType index is same order as in 
-                              obsCodes cell
+                              obsCodes cell. One column per satellite with
+                              observations, see getPRN2ColumnMap
     
-                              GNSS_obs{GNSSsystemIndex}(PRN, obsType, epoch)
-                                               GNSSsystemIndex: double,
-                                               1,2,...,numGNSSsystems
-                                               PRN: double
-                                               ObsType: double: 1,2,...,numObsTypes
-                                               epoch: double
+                              GNSS_obs[GNSSsystem][epoch, col, obsType]
+                                               GNSSsystem: str, ex. 'G'
+                                               epoch: int
+                                               col: int
+                                               ObsType: int: 0,1,...,numObsTypes-1
     
     nGNSSsystems:             number of GNSS systems present
     
@@ -59,12 +59,8 @@ def detectClockJumps(GNSS_obs, nGNSSsystems, obsCodes, time_epochs, tInterval, G
         # obsTypes = obsCodes[1][curr_sys]
         codeIndices = [idx for idx ,obstype in enumerate(obsTypes) if 'C' in obstype[0]]
         nCodeObs = len(codeIndices)
-        max_sat_sys,max_ncodes = GNSS_obs[curr_sys][1].shape
-        nepochs = len(GNSS_obs[curr_sys])
-        current_obs = np.zeros([nepochs,max_ncodes,max_sat_sys-1])
         # current_obs = permute(GNSS_obs{i},[3 2 1]);
-        for ep in range(0,nepochs):
-            current_obs[ep,:,:] = np.transpose(GNSS_obs[curr_sys][ep+1][1::, None], (1,2,0))
+        current_obs = np.transpose(GNSS_obs[curr_sys][:, 1::, :], (0,2,1))
             
         nepochs, _, nSat = current_obs.shape
         
@@ -1,28 +1,23 @@
 import numpy as np
-def detectCycleSlips(estimates, missing_obs_overview,epoch_first_obs, epoch_last_obs, tInterval, crit_slip_rate):
+def detectCycleSlipMasks(estimates, missing_obs_overview, tInterval, crit_slip_rate):
     """
-     Function that detects epochs with cycle slips, given test estimates
-     and a critical rate of change
+     Function that detects epochs with cycle slips for all satellites at
+     once, given test estimates and a critical rate of change. Missing
+     estimates before the first and after the last estimate of a satellite
+     are not slips, see getFirstLastEstimates.
     --------------------------------------------------------------------------------------------------------------------------
     
      INPUTS:            
     --------------------------------------------------------------------------------------------------------------------------
      estimates:            matrix containing estimates from a linear combination
-                           for a specific PRN estimates(epoch, PRN)
+                           for all PRN estimates(epoch, PRN). 0 if no estimate
     
      missing_obs_overview: matrix of size nepochs x nPRN containing 1 or 0.
                            1 indicates that the satellite with this PRN has no
-                           estimate at this epoch. There are no 1s before
-                           first observation epoch or after last observation epoch            
-                           as lack of estimates are implied here.
+                           estimate at this epoch.
     
                            missing_obs_overview(epoch, PRN)
     
-    
-     epoch_first_obs:      epoch of first estimate for the current satellite
-    
-     epoch_last_obs:       epoch of last estimate for the current satellite
-    
      tInterval:            observations interval in seconds. 
     
      crit_slip_rate:       critical rate of change of estimate to
@@ -32,86 +27,86 @@ def detectCycleSlips(estimates, missing_obs_overview,epoch_first_obs, epoch_last
     
      OUTPUTS:
     
-     slip_epochs:          array, contains epochs with detected cycle slip
+     slip_mask:            boolean matrix of size nepochs x nPRN. True at
+                           epochs with detected cycle slip
     --------------------------------------------------------------------------------------------------------------------------
     """
-    ## -- Preallocating
-    slips_from_missing_obs = []
-    ## -- Calculate rate of change of estimates of ionospheric delay (time derivative)
-    estimates_rate_of_change = np.diff(estimates)/tInterval
-
-    ## -- Detect slips for current sat. as epochs with either estimates_rate_of_change
-    ## higher than critical value, or epochs with missing estimates
-    slips_from_crit_rate =  [idx for idx,val in enumerate(estimates_rate_of_change) if abs(val) > crit_slip_rate] # use listcomp instead
-
-    if type(epoch_first_obs) !=np.ndarray and type(epoch_last_obs) != np.ndarray:
-        slips_from_missing_obs = (np.where(missing_obs_overview[epoch_first_obs:epoch_last_obs] == 1) + epoch_first_obs)[0].tolist() 
-
-    if len(slips_from_missing_obs) != 0:
-        slip_epochs = np.array(sorted(set(slips_from_crit_rate + slips_from_missing_obs)))
-    else:
-        slip_epochs = np.array(sorted(set(slips_from_crit_rate)))
-
-    return slip_epochs 
-
-
+    nepochs = estimates.shape[0]
+    slip_mask = np.zeros(estimates.shape, dtype=bool)
+    
+    ## -- Detect slips as epochs with rate of change of estimates (time derivative) higher than critical value
+    slip_mask[0:nepochs-1, :] = np.abs(np.diff(estimates, axis=0)/tInterval) > crit_slip_rate
+    
+    ## -- or epochs with missing estimates, from first estimate up to, but not including, last estimate
+    epoch_first_obs, epoch_last_obs = getFirstLastEstimates(estimates)
+    epochs = np.arange(nepochs)[:, None]
+    slip_mask = slip_mask | ((missing_obs_overview == 1) & (epochs >= epoch_first_obs) & (epochs < epoch_last_obs))
+    
+    return slip_mask
 
 
-def orgSlipEpochs(slip_epochs):
+def getFirstLastEstimates(estimates):
     """
-     Function that takes array of epochs with detected cycle slips and for
-     one satellite and organizing them into slip periods
+     Function that finds the first and last epoch with estimates, ie. nonzero
+     values, of every PRN
     --------------------------------------------------------------------------------------------------------------------------
     
      INPUTS
     
-     slip_epochs:          array, contains epochs with detected cycle slip
+     estimates:            matrix containing estimates for all PRN, estimates(epoch, PRN)
     --------------------------------------------------------------------------------------------------------------------------
     
      OUTPUTS
     
-     slip_periods:         Matrix that contains the start of periods with cycle slips in
-                           the first column and the ends of the same periods in
-                           the second column.
-    
-                           cycle_slip_periods(ambiguity_slip_priod, j),
-                           j = 1, ambiguity period start
-                           j = 2, ambiguity period ends
-    
-     n_slip_periods:       amount of slip periods for current satellite
+     epoch_first_obs:      array, first epoch with estimate of each PRN. -1 if
+                           PRN has no estimates
     
+     epoch_last_obs:       array, last epoch with estimate of each PRN. -1 if
+                           PRN has no estimates
     --------------------------------------------------------------------------------------------------------------------------
     """
-
-    ## -- If no slips occurs there are no slip periods for this sat.
-    if len(slip_epochs) != 0:    
-        # dummy is logical. It will be 1 at indices where the following
-        # slip epoch is NOT the epoch following the current slip epoch.
-        # These will therefor be the indices where slip periods end.
-        # The last slip end is not detected this way and is inserted manually
-        dummy = (np.diff(slip_epochs) != 1) * 1 # multiply with one to get from "False" and "True" to "0" and "1"
-        dummy2 = np.where(dummy==1)
-        slip_period_ends = np.append(slip_epochs[dummy2], np.array([slip_epochs[-1]]))
-        n_slip_periods = np.sum(dummy) + 1 
-        
-        ## -- Slip_periods = zeros(n_slip_periods,2); 
-        slip_periods = np.zeros([n_slip_periods,2])
-        ## -- Store slip ends
-        slip_periods[:,1] = slip_period_ends
-        ## -- Store first slip start manually
-        slip_periods[0,0] = slip_epochs[0]
-       
-        ## Insert remaining slip period starts
-        for k in range(1,n_slip_periods):
-            indx = [x+1 for x, val in enumerate(slip_epochs) if val == slip_periods[k-1, 1]]
-            if len(indx) != 0:
-                indx = indx[0]
-                slip_periods[k, 0] = slip_epochs[indx]
-             
-    else:
-        slip_periods = []
-        n_slip_periods = 0
-
-    return slip_periods, n_slip_periods
+    nepochs = estimates.shape[0]
+    has_estimate = estimates != 0
+    epoch_first_obs = np.where(has_estimate.any(axis=0), np.argmax(has_estimate, axis=0), -1)
+    epoch_last_obs = np.where(has_estimate.any(axis=0), nepochs - 1 - np.argmax(has_estimate[::-1, :], axis=0), -1)
+    return epoch_first_obs, epoch_last_obs
 
 
+def getSlipPeriods(slip_mask):
+    """
+     Function that organizes epochs with cycle slips of all satellites into
+     slip periods, ie. runs of consecutive slip epochs
+    --------------------------------------------------------------------------------------------------------------------------
+    
+     INPUTS
+    
+     slip_mask:            boolean matrix of size nepochs x nPRN. True at
+                           epochs with cycle slip, slip_mask(epoch, PRN)
+    --------------------------------------------------------------------------------------------------------------------------
+    
+     OUTPUTS
+    
+     slip_periods:         dict, one element for each column of slip_mask.
+                           Each element is a matrix that contains the start
+                           of periods with cycle slips in the first column and
+                           the ends of the same periods in the second column,
+                           or [] if there are no slips
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    nepochs, ncols = slip_mask.shape
+    
+    ## -- Periods start where the mask changes from False to True, and end before it changes from True to False.
+    ## The mask is padded with False before the first and after the last epoch
+    padded_mask = np.zeros([ncols, nepochs+2], dtype=np.int8)
+    padded_mask[:, 1:nepochs+1] = slip_mask.T
+    changes = np.diff(padded_mask, axis=1)
+    period_cols, period_starts = np.nonzero(changes == 1)
+    _, period_ends = np.nonzero(changes == -1)
+    
+    ## -- Split periods by column
+    periods = np.column_stack([period_starts, period_ends - 1]).astype(float)
+    periods_per_col = np.split(periods, np.cumsum(np.bincount(period_cols, minlength=ncols))[0:-1])
+    slip_periods = {}
+    for col in range(0, ncols):
+        slip_periods[col] = periods_per_col[col] if len(periods_per_col[col]) != 0 else []
+    return slip_periods
@@ -1,5 +1,6 @@
 import numpy as np
-from detectCycleSlips import detectCycleSlips, orgSlipEpochs
+from detectCycleSlips import detectCycleSlipMasks, getFirstLastEstimates, getSlipPeriods
+from prnColumnMap import getPRN2ColumnMap
 import warnings
 warnings.filterwarnings(action='ignore', message='Mean of empty slice')
 
@@ -65,12 +66,13 @@ def estimateSignalDelays(range1_Code, range2_Code,phase1_Code, phase2_Code, carr
     
      GNSS_obs:             3D matrix containing all observation of current 
                            GNSS system for all epochs. Order of obsType index
-                           is same order as in obsCodes cell
+                           is same order as in obsCodes cell. One column per
+                           satellite with observations, see getPRN2ColumnMap
     
-                           GNSS_obs(PRN, obsType, epoch)
-                                               PRN: double
-                                               ObsType: double: 1,2,...,numObsTypes
-                                               epoch: double
+                           GNSS_obs[epoch, col, obsType]
+                                               epoch: int
+                                               col: int
+                                               ObsType: int: 0,1,...,numObsTypes-1
     
      currentGNSSsystem:    string, code to indicate which GNSS system is the
                            current observations are coming from. Only used to
@@ -146,185 +148,94 @@ def estimateSignalDelays(range1_Code, range2_Code,phase1_Code, phase2_Code, carr
                                     # N1_pseudo_estimate to indicate ambiguity slip on
                                     # the range1/phase1 signal
  
-    ## -- Initialize data matrices
-    ion_delay_phase1        = np.zeros([nepochs, max_sat+1]) # Addin 1 to since python is nullindexed
-    multipath_range1        = np.zeros([nepochs, max_sat+1])
-    # multipath_range2        = np.zeros([nepochs, max_sat+1]) # kommenterte bort 23.01.2023
-    N1_pseudo_estimate      = np.zeros([nepochs, max_sat+1])
-    missing_obs_overview    = np.zeros([nepochs, max_sat+1])
-    missing_range1_overview = np.zeros([nepochs, max_sat+1])
-    
     ## -- Initialize cell for storing phase slip periods
     ambiguity_slip_periods = {}
     ## -- Initialize cell for storing slip periods for only range1/phase1
 
     range1_slip_periods = {}
     
-    ## -- Make estimates of delays
-    for epoch in np.arange(0,nepochs):
-        ## -- Calculate how many satelites with observations in current epoch
-        n_sat = int(GNSS_SVs[epoch,0])
-        ## - Iterate over all satellites of current epoch
-        for i in np.arange(0,n_sat):  
-            PRN = int(GNSS_SVs[epoch, 1+i]) # Get PRN ## KANSJE FJERNE +1??? for å få med PRN 11
-            
-            if FDMA_used:
-                carrier_freq1 = carrier_freq1_list[PRN]
-                carrier_freq2 = carrier_freq2_list[PRN]
-                alpha = carrier_freq1**2/carrier_freq2**2 # amplfication factor
-            
-            
-            ## -- Get observations            
-            range1 = GNSS_obs[epoch+1][PRN, ismember(obsCodes[currentGNSSsystem],range1_Code)] 
-            range2 = GNSS_obs[epoch+1][PRN, ismember(obsCodes[currentGNSSsystem],range2_Code)]
-            
-            phase1 = GNSS_obs[epoch+1][PRN, ismember(obsCodes[currentGNSSsystem],phase1_Code)]*c/carrier_freq1
-            phase2 = GNSS_obs[epoch+1][PRN, ismember(obsCodes[currentGNSSsystem],phase2_Code)]*c/carrier_freq2
-            
-            if any([str(range1), str(range2), str(phase1), str(phase2)]) == '[]':
-                print('ERROR(estimateSignalDelays): There is no observation type #s. Check for missing data in RINEX observation file!' % (phase1_Code))
-                success = 0
-                return success 
-            
-            
-            ## -- If any of the four observations are missing, ie 0, estimate remains 0 for that epoch and satellite
-            if [range1, range2, phase1, phase2].count(0) == 0:
-                ## -- Calculate estimate for Ionospheric delay on phase 1 signal
-                ion_delay_phase1[epoch, PRN] = 1/(alpha-1)*(phase1-phase2)
-                
-                ## -- Calculate multipath on both code signals
-                multipath_range1[epoch,PRN] = range1 - (1 + 2/(alpha-1))*phase1 + (2/(alpha-1))*phase2
-                # multipath_range2[epoch,PRN] = range2 - (2*alpha/(alpha-1))*phase1 + ((2*alpha)/(alpha-1) - 1)*phase2 ## kommenterte bort 23.01.2023
-                N1_pseudo_estimate[epoch, PRN] = phase1 - range1
-            else:
-                ## Flag epoch and PRN as missing obs
-                missing_obs_overview[epoch, PRN] = 1
-                if range1 == 0 or phase1 == 0:
-                    missing_range1_overview[epoch, PRN] = 1 
-                else:
-                    N1_pseudo_estimate[epoch, PRN] = phase1 - range1
-
+    ## -- Column of each PRN in GNSS_obs. PRN without observations get the unused column 0
+    PRN2col, _ = getPRN2ColumnMap(GNSS_SVs, max_sat)
+    PRN2col = PRN2col[0:max_sat+1]
+    
+    ## -- Index of each observation type in GNSS_obs
+    obsIndex = [ismember(obsCodes[currentGNSSsystem], code) for code in [range1_Code, range2_Code, phase1_Code, phase2_Code]]
+    if [] in obsIndex:
+        print('ERROR(estimateSignalDelays): There is no observation type %s. Check for missing data in RINEX observation file!' \
+              % ([code for code, indx in zip([range1_Code, range2_Code, phase1_Code, phase2_Code], obsIndex) if indx == []][0]))
+        success = 0
+        return np.array([]), np.array([]), range1_slip_periods, ambiguity_slip_periods, np.array([]), np.array([]), success
+    
+    ## -- Carrier frequencies and amplification factor of each PRN
+    if FDMA_used:
+        carrier_freq1 = np.full(max_sat+1, np.nan)
+        carrier_freq2 = np.full(max_sat+1, np.nan)
+        n_freq = min(len(carrier_freq1_list), max_sat+1)
+        carrier_freq1[0:n_freq] = carrier_freq1_list[0:n_freq]
+        carrier_freq2[0:n_freq] = carrier_freq2_list[0:n_freq]
+        alpha = carrier_freq1**2/carrier_freq2**2 # amplfication factor
     
-    ## -- Detect and correct for ambiguity slips
-    for PRN in np.arange(0,max_sat):
-        PRN = PRN + 1
-        ## -- Get first and last epoch with observations for current PRN
-        if len(np.nonzero(ion_delay_phase1[:,PRN])[0]) != 0:
-            epoch_first_obs = np.nonzero(ion_delay_phase1[:,PRN])[0][0]
-            epoch_last_obs = np.nonzero(ion_delay_phase1[:,PRN])[0][-1]
-        else:
-            epoch_first_obs = np.nonzero(ion_delay_phase1[:,PRN])[0]
-            epoch_last_obs = np.nonzero(ion_delay_phase1[:,PRN])[0]
-                
-               
-        ## -- Get first and last epoch with range 1 observations for current PRN
-        if len(np.nonzero(N1_pseudo_estimate[:,PRN])[0]) != 0:
-            epoch_first_range1obs =  np.nonzero(N1_pseudo_estimate[:,PRN])[0][0]
-            epoch_last_range1obs =  np.nonzero(N1_pseudo_estimate[:,PRN])[0][-1]
-        else:
-            epoch_first_range1obs =  np.nonzero(N1_pseudo_estimate[:,PRN])[0]
-            epoch_last_range1obs =  np.nonzero(N1_pseudo_estimate[:,PRN])[0]
-        
-        
-        ## -- Run function to detect cycle slips for current epoch for range1/phase1 only 
-        range1_slip_epochs = detectCycleSlips(N1_pseudo_estimate[:, PRN], missing_range1_overview[:, PRN],epoch_first_range1obs, epoch_last_range1obs, tInterval, phaseCodeLimit)
-       
-        # Run function to detect cycle slips for current epoch for either range1/phase1 signal, range2/phase2 signal, or both
-        ionosphere_slip_epochs = detectCycleSlips(ion_delay_phase1[:, PRN], missing_obs_overview[:, PRN],epoch_first_obs, epoch_last_obs, tInterval, ionLimit)
-           
-        ## -- Make combined array of slip epochs from both lin. combinations used to detects slips
-        ambiguity_slip_epochs = np.union1d(range1_slip_epochs, ionosphere_slip_epochs) 
-        # range1_slip_epochs = np.intersect1d(range1_slip_epochs, ionosphere_slip_epochs) # hvorfor intersect her?
-        range1_slip_epochs = range1_slip_epochs #tester om det gir stor forskjell uten intersect
+    ## -- Mask of epochs and PRN with observations, ie. PRN listed in GNSS_SVs for the epoch
+    n_sat = GNSS_SVs[0:nepochs, 0].astype(int)
+    epoch_PRNs = GNSS_SVs[0:nepochs, 1:].astype(int)
+    listed = np.arange(epoch_PRNs.shape[1]) < n_sat[:, None]
+    observed = np.zeros([nepochs, max_sat+1], dtype=bool)
+    observed[np.nonzero(listed)[0], epoch_PRNs[listed]] = True
+    
+    ## -- Get observations of all epochs and PRN. Column PRN of these matrices is satellite PRN
+    range1 = GNSS_obs[0:nepochs, PRN2col, obsIndex[0]]
+    range2 = GNSS_obs[0:nepochs, PRN2col, obsIndex[1]]
+    phase1 = GNSS_obs[0:nepochs, PRN2col, obsIndex[2]]*c/carrier_freq1
+    phase2 = GNSS_obs[0:nepochs, PRN2col, obsIndex[3]]*c/carrier_freq2
+    
+    ## -- If any of the four observations are missing, ie 0, estimate remains 0 for that epoch and satellite
+    complete = observed & (range1 != 0) & (range2 != 0) & (phase1 != 0) & (phase2 != 0)
+    range1_complete = observed & (range1 != 0) & (phase1 != 0)
+    
+    ## -- Calculate estimate for Ionospheric delay on phase 1 signal, and multipath on first code signal
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ion_delay_phase1 = np.where(complete, 1/(alpha-1)*(phase1-phase2), 0)
+        multipath_range1 = np.where(complete, range1 - (1 + 2/(alpha-1))*phase1 + (2/(alpha-1))*phase2, 0)
+    N1_pseudo_estimate = np.where(range1_complete, phase1 - range1, 0)
+    
+    ## Flag epochs and PRN as missing obs
+    missing_obs_overview = (observed & ~complete)*1.0
+    missing_range1_overview = (observed & ~range1_complete)*1.0
 
-        ## -- Organize slips detected on range1/phase1 signal only
-        range1_slip_periods[PRN],_ = orgSlipEpochs(range1_slip_epochs)
-        
-        ## -- Orginize combined slips detected on range1/phase1 signal only
-        ambiguity_slip_periods[PRN], n_slip_periods = orgSlipEpochs(ambiguity_slip_epochs)
-        
-        # Set all zero estimates to NaN so that epochs with missing observations are not corrected        
-        ion_delay_phase1[ion_delay_phase1[:, PRN]==0, PRN] = np.nan
-        multipath_range1[multipath_range1[:, PRN]==0, PRN] = np.nan
-        # multipath_range2[multipath_range2[:, PRN]==0, PRN] = np.nan ## 23.01.2023 kommenterer bort
-        
-        ## If there are no slips then there is only one "ambiguity period". All estimates are therefore reduced by the same relative value
-        if len(ambiguity_slip_periods[PRN]) == 0:
-            # if len(list(epoch_first_obs)) == 0:
-            if epoch_first_obs.size == 0: # added 18.02.2023 because of error when running on RINEX v2 (should be like this either way!)
-                pass
-            else:    
-                ion_delay_phase1[epoch_first_obs::, PRN] = ion_delay_phase1[epoch_first_obs::, PRN] - ion_delay_phase1[epoch_first_obs, PRN]  
-                # multipath_range1[epoch_first_obs::, PRN] = multipath_range1[epoch_first_obs::, PRN] - np.mean(np.nonzero(multipath_range1[epoch_first_obs::, PRN]))
-                ### removed np.nonzero and use np.nanmean instead since every zero is replaced by nan in line 247 and 248
-                multipath_range1[epoch_first_obs::, PRN] = multipath_range1[epoch_first_obs::, PRN] - np.nanmean(multipath_range1[epoch_first_obs::, PRN])  
-
-                # multipath_range2[epoch_first_obs::, PRN] = multipath_range2[epoch_first_obs::, PRN] - np.mean(np.nonzero(multipath_range2[epoch_first_obs::, PRN])) 
-        else:
-            ## -- Set all estimates of epochs with cycle slips to nan
-            for slip_period in np.arange(0,n_slip_periods):
-                slip_start   = int(ambiguity_slip_periods[PRN][slip_period,0])
-                slip_end     = int(ambiguity_slip_periods[PRN][slip_period,1])
-               
-                if slip_start == slip_end:  # need a if test bacause if there equal, python dont set to nan
-                    ion_delay_phase1[slip_start, PRN] = np.nan
-                    multipath_range1[slip_start, PRN] = np.nan
-                    # multipath_range2[slip_start, PRN] = np.nan
-                else: 
-                    ion_delay_phase1[slip_start:slip_end+1, PRN] = np.nan # + 1 because a[2:3] gives one element. Matlab a(2:3) gives 2 element.
-                    multipath_range1[slip_start:slip_end+1, PRN] = np.nan # if error msg here, try add "if slip_end != epoch_last_obs else epoch_last_obs" in the slicing (oneliner)
-                    # multipath_range2[slip_start:slip_end+1, PRN] = np.nan
-            
-              
-            ## Extract start and end of each segment and correct multipath and ionosphere estimates for each segment
-            for ambiguity_period in np.arange(0,n_slip_periods+1): # removed + 1 cause of indexproblem 29.11
-                if ambiguity_period == 0: 
-                    ambiguity_period_start  = epoch_first_obs
-                    ambiguity_period_end    = int(ambiguity_slip_periods[PRN][0,0])   #INK -1 igjen???
-                ## -- If last ambiguity period
-                elif ambiguity_period == n_slip_periods: # removed + 1 
-                    ambiguity_period_start       = int(ambiguity_slip_periods[PRN][-1,1] + 1) 
-                    ambiguity_period_end         = epoch_last_obs +1
-                   
-                    ## If last epoch with observation is a slip, then there is no  last ambiguity period
-                    if ambiguity_period_start > epoch_last_obs:
-                        ambiguity_period_start = []
-                        ambiguity_period_end = []
-                    
-                else:
-                    ambiguity_period_start = int(ambiguity_slip_periods[PRN][ambiguity_period-1, 1] + 1)
-                    ambiguity_period_end   = int(ambiguity_slip_periods[PRN][ambiguity_period, 0])
-                
-               
-                ## -- Ionosphere delay estimates of current ambiguity period is reduced by first estimate of ambiguity period
-                if ambiguity_period_start != ambiguity_period_end:
-                    ion_delay_phase1[ambiguity_period_start:ambiguity_period_end, PRN] = ion_delay_phase1[ambiguity_period_start:ambiguity_period_end, PRN] - \
-                        ion_delay_phase1[ambiguity_period_start, PRN]
-                   
-                    ## -- Multipath delays of current ambiguity period are reduced by mean of estimates in ambiguity period, excluding NaN and
-                    multipath_range1[ambiguity_period_start:ambiguity_period_end, PRN] = multipath_range1[ambiguity_period_start:ambiguity_period_end, PRN] - \
-                        np.nanmean(multipath_range1[ambiguity_period_start:ambiguity_period_end, PRN]) # added nanmean 30.11
-                        
-                    # multipath_range2[ambiguity_period_start:ambiguity_period_end, PRN] = multipath_range2[ambiguity_period_start:ambiguity_period_end, PRN] -\
-                        # np.nanmean(multipath_range2[ambiguity_period_start:ambiguity_period_end, PRN])
-                else:
-                    
-                    ion_delay_phase1[ambiguity_period_start, PRN] = ion_delay_phase1[ambiguity_period_start, PRN] - \
-                        ion_delay_phase1[ambiguity_period_start, PRN]
-                    ## -- Multipath delays of current ambiguity period are reduced by mean of estimates in ambiguity period, excluding NaN and
-                    multipath_range1[ambiguity_period_start, PRN] = multipath_range1[ambiguity_period_start, PRN] - \
-                        np.nanmean(multipath_range1[ambiguity_period_start, PRN])
-                       
-                    # multipath_range2[ambiguity_period_start, PRN] = multipath_range2[ambiguity_period_start, PRN] -\
-                        # np.nanmean(multipath_range2[ambiguity_period_start, PRN])
+    ## -- Detect cycle slips of all PRN for range1/phase1 only, and for either range1/phase1 signal, range2/phase2 signal, or both
+    range1_slip_mask = detectCycleSlipMasks(N1_pseudo_estimate, missing_range1_overview, tInterval, phaseCodeLimit)
+    ionosphere_slip_mask = detectCycleSlipMasks(ion_delay_phase1, missing_obs_overview, tInterval, ionLimit)
+    
+    ## -- Make combined slips from both lin. combinations used to detects slips
+    ambiguity_slip_mask = range1_slip_mask | ionosphere_slip_mask
+    
+    ## -- Get first and last epoch with observations for all PRN
+    epoch_first_obs, epoch_last_obs = getFirstLastEstimates(ion_delay_phase1)
+    
+    ## -- Organize slips detected on range1/phase1 signal only, and combined slips, of all PRN into slip periods
+    range1_slip_periods = getSlipPeriods(range1_slip_mask)
+    ambiguity_slip_periods = getSlipPeriods(ambiguity_slip_mask)
+    del range1_slip_periods[0], ambiguity_slip_periods[0]
+    
+    ## -- Ambiguity periods of all PRN, ie. periods between slip periods, as [start, end) epochs
+    ambiguity_period_PRNs, ambiguity_period_starts, ambiguity_period_ends = getAmbiguityPeriods(ambiguity_slip_mask, epoch_first_obs, epoch_last_obs)
+    
+    ## -- Set all zero estimates to NaN so that epochs with missing observations are not corrected
+    ion_delay_phase1[:, 1:][ion_delay_phase1[:, 1:] == 0] = np.nan
+    multipath_range1[:, 1:][multipath_range1[:, 1:] == 0] = np.nan
+    
+    ## -- Set all estimates of epochs with cycle slips to nan
+    ion_delay_phase1[:, 1:][ambiguity_slip_mask[:, 1:]] = np.nan
+    multipath_range1[:, 1:][ambiguity_slip_mask[:, 1:]] = np.nan
+    
+    ## -- Ionosphere delay estimates of each ambiguity period are reduced by first estimate of ambiguity period, and
+    ## multipath delays are reduced by mean of estimates in ambiguity period, excluding NaN
+    ion_delay_phase1, multipath_range1 = levelAmbiguityPeriods(ion_delay_phase1, multipath_range1, ambiguity_period_PRNs, \
+                                             ambiguity_period_starts, ambiguity_period_ends)
                         
-        ## -- Get range1 and phase 1 observations for all epochs and PRN
-        range1_observations =  np.zeros([nepochs, max_sat+1]) 
-        phase1_observations =  np.zeros([nepochs, max_sat+1]) 
-        for ep in np.arange(0, len(GNSS_obs)):
-            for PRN in np.arange(0,max_sat):
-                range1_observations[ep,PRN] = GNSS_obs[ep+1][PRN,ismember(obsCodes[currentGNSSsystem],range1_Code)] 
-                phase1_observations[ep,PRN] = GNSS_obs[ep+1][PRN,ismember(obsCodes[currentGNSSsystem],phase1_Code)]
+    ## -- Get range1 and phase 1 observations for all epochs and PRN
+    range1_observations = GNSS_obs[0:nepochs, PRN2col, obsIndex[0]]
+    phase1_observations = GNSS_obs[0:nepochs, PRN2col, obsIndex[2]]
 
     # return ion_delay_phase1, multipath_range1, multipath_range2, range1_slip_periods, range1_observations, phase1_observations, success
     # return ion_delay_phase1, multipath_range1, multipath_range2, ambiguity_slip_periods, range1_observations, phase1_observations, success # changeing from range1slip to amgiguity
@@ -341,3 +252,99 @@ def ismember(list_,code):
     return indx
 
 
+def getAmbiguityPeriods(slip_mask, epoch_first_obs, epoch_last_obs):
+    """
+     Function that finds the ambiguity periods of all PRN, ie. the periods
+     between slip periods, from the runs of epochs without slips of the slip
+     mask. The first period of a PRN starts at its first estimate. The last
+     period ends at its last estimate, or at the last epoch if the PRN has no
+     slips.
+    --------------------------------------------------------------------------------------------------------------------------
+     INPUTS
+
+     slip_mask:            boolean matrix, slip_mask(epoch, PRN) is True for
+                           epochs with slips. Column 0 is not a PRN
+
+     epoch_first_obs:      array, first epoch with estimate of each PRN. -1
+                           if PRN has no estimates, see getFirstLastEstimates
+
+     epoch_last_obs:       array, last epoch with estimate of each PRN
+    --------------------------------------------------------------------------------------------------------------------------
+     OUTPUTS
+
+     PRNs:                 array, PRN of each ambiguity period
+
+     period_starts:        array, first epoch of each ambiguity period
+
+     period_ends:          array, epoch after last epoch of each ambiguity
+                           period. Empty periods are left out, and periods
+                           are ordered by PRN and epoch
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    nepochs, ncols = slip_mask.shape
+    ## -- Runs of epochs without slips of all columns, from one diff of the padded mask. Runs are ordered by column and epoch
+    no_slip = np.zeros([ncols, nepochs+2], dtype=np.int8)
+    no_slip[:, 1:-1] = ~slip_mask.T
+    edges = np.diff(no_slip, axis=1)
+    PRNs, period_starts = np.nonzero(edges == 1)
+    _, period_ends = np.nonzero(edges == -1)
+    
+    ## -- First period starts at first estimate. If there are slips, last period ends at last estimate
+    has_slips = slip_mask.any(axis=0)
+    period_starts = np.where(period_starts == 0, epoch_first_obs[PRNs], period_starts)
+    period_ends = np.where((period_ends == nepochs) & has_slips[PRNs], epoch_last_obs[PRNs] + 1, period_ends)
+    
+    ## -- PRN without estimates have no ambiguity periods
+    keep = (PRNs > 0) & (epoch_first_obs[PRNs] >= 0) & (period_ends > period_starts)
+    return PRNs[keep], period_starts[keep], period_ends[keep]
+
+
+def levelAmbiguityPeriods(ion_delay_phase1, multipath_range1, PRNs, period_starts, period_ends):
+    """
+     Function that reduces the ionospheric delay estimates of every ambiguity
+     period by the first estimate of the period, and the multipath estimates
+     by the mean of the estimates of the period, excluding NaN. All periods
+     of all PRN are reduced at once.
+    --------------------------------------------------------------------------------------------------------------------------
+     INPUTS
+
+     ion_delay_phase1:     matrix of ionospheric delay estimates, ion_delay_phase1(epoch, PRN)
+
+     multipath_range1:     matrix of multipath estimates, multipath_range1(epoch, PRN)
+
+     PRNs:                 array, PRN of each ambiguity period
+
+     period_starts:        array, first epoch of each ambiguity period
+
+     period_ends:          array, epoch after last epoch of each ambiguity
+                           period. Periods must not be empty, and must be
+                           ordered by PRN and epoch, as from getAmbiguityPeriods
+    --------------------------------------------------------------------------------------------------------------------------
+     OUTPUTS
+
+     ion_delay_phase1:     matrix of reduced ionospheric delay estimates
+
+     multipath_range1:     matrix of reduced multipath estimates
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    if len(PRNs) == 0:
+        return ion_delay_phase1, multipath_range1
+    
+    ## -- Epoch and PRN of every estimate of every period. The estimates of a period follow each other
+    lengths = period_ends - period_starts
+    offsets = np.cumsum(lengths) - lengths
+    epochs = np.arange(lengths.sum()) + np.repeat(period_starts - offsets, lengths)
+    cols = np.repeat(PRNs, lengths)
+    
+    ## -- First ionosphere delay estimate and mean of multipath estimates, excluding NaN, of each period
+    first_ion_delay = ion_delay_phase1[period_starts, PRNs]
+    multipath = multipath_range1[epochs, cols]
+    missing = np.isnan(multipath)
+    multipath_sum = np.add.reduceat(np.where(missing, 0, multipath), offsets)
+    multipath_count = np.add.reduceat(~missing*1, offsets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        multipath_mean = multipath_sum/multipath_count
+    
+    ion_delay_phase1[epochs, cols] = ion_delay_phase1[epochs, cols] - np.repeat(first_ion_delay, lengths)
+    multipath_range1[epochs, cols] = multipath - np.repeat(multipath_mean, lengths)
+    return ion_delay_phase1, multipath_range1
@@ -11,6 +11,8 @@ def getLLISlipPeriods(LLI_current_phase):
     #                           for all satellites.
     
     #                           LLI_current_phase(epoch, satID)
+    #                           int8 as read by readRinexObs. Blank indicators
+    #                           are -1 and are not slips
     #--------------------------------------------------------------------------------------------------------------------------
     
     # OUTPUTS:
@@ -22,62 +24,19 @@ def getLLISlipPeriods(LLI_current_phase):
     #--------------------------------------------------------------------------------------------------------------------------
     """
     import numpy as np 
-    # [~, nSat] = size(LLI_current_phase);
-    # LLI_slip_periods = cell(1, nSat);
+    from detectCycleSlips import getFirstLastEstimates
     
-    _, nSat = LLI_current_phase.shape
-    LLI_slip_periods = {}
+    ## -- Get epochs where LLI indicate slip, for all satellites. Column 0 is not a satellite
+    LLI_slips = np.isin(LLI_current_phase[:, 1:], [1, 2, 3, 5, 6, 7]) #001, 010, 011, 101, 110, 111
     
-    ## -- Itterrate through all satellites in current GNSS system
-    for sat in range(0,nSat-1):
-       ## LLI_current_sat = LLI_current_phase(:, sat);
-       LLI_current_sat = LLI_current_phase[:, sat+1] # Sat +1 her kanskje????
-       
-       ## Get epochs where LLI indicate slip, for current satellite
-       # LLI_slips = find(ismember(LLI_current_sat, [1, 2, 3, 5, 6, 7])); #001, 010, 011, 101, 110, 111
-       LLI_slips = np.array(ismember2([1, 2, 3, 5, 6, 7], LLI_current_sat)).reshape(len(ismember2([1, 2, 3, 5, 6, 7], LLI_current_sat)),1) 
-       
-       
-       # if there are slips
-       # if ~isempty(LLI_slips)
-       if not len(LLI_slips) == 0:
-           ## dummy is logical. It will be 1 at indices where the following
-           ## slip epoch is NOT the epoch following the current slip epoch.
-           ## These will therefor be the indices where slip periods end.
-           ## The last slip end is not detected this way and is inserted manually
-           
-           # dummy = diff(LLI_slips)~=1;
-           # slip_period_ends = [LLI_slips(dummy); LLI_slips(end)];
-           # n_slip_periods = sum(dummy) +1 ;
-            
-           dummy = np.diff(LLI_slips) !=1 * 1
-           slip_period_ends = np.concatenate((LLI_slips[dummy], LLI_slips[-1]))
-           n_slip_periods = np.sum(dummy) + 1 
-            
-           # current_slip_periods = zeros(n_slip_periods,2); 
-           current_slip_periods = np.zeros([n_slip_periods,2])
-           ## store slip ends
-           # current_slip_periods(:,2) = slip_period_ends;
-           current_slip_periods[:,1] = slip_period_ends
-           # store first slip start manually
-           # current_slip_periods(1,1) = LLI_slips(1);
-           current_slip_periods[0,0] = LLI_slips[0]
-           
-           ## Insert remaining slip period starts
-           # for k = 2:n_slip_periods
-           #    current_slip_periods(k, 1) = LLI_slips(find(LLI_slips == current_slip_periods(k-1, 2)) + 1); 
-           # end
-           for k in range(1,n_slip_periods):
-               indx = next(x for x, val in enumerate(LLI_slips) if abs(val) ==  current_slip_periods[k-1, 1])
-               current_slip_periods[k, 0] = LLI_slips[indx + 1]
-             
-           
-       else:
-           current_slip_periods = []
-     
-       # LLI_slip_periods{sat} = current_slip_periods;
-       LLI_slip_periods[sat] = current_slip_periods
-
+    ## -- All slips of a satellite are one slip period, from the first to the last slip
+    first_slip, last_slip = getFirstLastEstimates(LLI_slips)
+    LLI_slip_periods = {}
+    for sat in range(0, LLI_slips.shape[1]):
+        if first_slip[sat] < 0:
+            LLI_slip_periods[sat] = []
+        else:
+            LLI_slip_periods[sat] = np.array([[first_slip[sat], last_slip[sat]]], dtype=float)
 
     return LLI_slip_periods
 
@@ -0,0 +1,148 @@
+import numpy as np
+
+## -- PRN numbers of RINEX satellite numbers have two digits
+MAX_PRN = 99
+
+## -- Max number of PRN in constellation of each GNSS system
+MAX_CONSTELLATION_PRN = {'G': 36, 'R': 36, 'E': 36, 'C': 60}
+
+
+def newPRN2ColumnMap():
+    """
+    Returns an empty PRN-to-column map. The map is an int array with one
+    element for each possible PRN number, where element PRN is the column of
+    that satellite in the observation arrays. 0 means that the satellite has
+    no column (yet). Column 0 is never given to a satellite.
+    """
+    return np.zeros(MAX_PRN + 1, dtype=int)
+
+
+def assignPRNColumns(PRN2col, PRNs):
+    """
+    Function that returns the columns of the satellites PRNs. Satellites
+    without a column are given the next unused columns, and PRN2col is
+    updated in place. PRN 0 is always given column 0.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    PRN2col:              PRN-to-column map, see newPRN2ColumnMap
+
+    PRNs:                 array of PRN numbers
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    cols:                 array with the column of each of PRNs
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    PRNs = np.asarray(PRNs, dtype=int)
+    new_PRNs = np.unique(PRNs[(PRN2col[PRNs] == 0) & (PRNs > 0)])
+    if len(new_PRNs) > 0:
+        PRN2col[new_PRNs] = PRN2col.max() + 1 + np.arange(len(new_PRNs))
+    return PRN2col[PRNs]
+
+
+def growSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, nColumns, readLLI, readSS):
+    """
+    Function that makes sure that the arrays of GNSS system curr_sys have at
+    least nColumns columns. The number of columns is at least doubled when the
+    arrays are grown, so that they are grown only a few times while reading.
+    The dicts are updated in place.
+    """
+    current_nColumns = GNSS_SVs[curr_sys].shape[1]
+    if nColumns <= current_nColumns:
+        return
+    nColumns = max(nColumns, 2*current_nColumns)
+
+    def grow(array):
+        shape = list(array.shape)
+        shape[1] = nColumns - current_nColumns
+        return np.concatenate((array, np.zeros(shape, dtype=array.dtype)), axis=1)
+
+    GNSS_obs[curr_sys] = grow(GNSS_obs[curr_sys])
+    GNSS_SVs[curr_sys] = grow(GNSS_SVs[curr_sys])
+    if readLLI:
+        GNSS_LLI[curr_sys] = grow(GNSS_LLI[curr_sys])
+    if readSS:
+        GNSS_SS[curr_sys] = grow(GNSS_SS[curr_sys])
+
+
+def sortSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, PRN2col, nepochs, readLLI, readSS):
+    """
+    Function that removes unused epochs and columns from the arrays of GNSS
+    system curr_sys, and orders the columns of the satellites by PRN number.
+    Column 0 is kept. GNSS_SVs keeps one column more than the max number of
+    satellites of one epoch. The dicts and PRN2col are updated in place, and
+    the arrays are copied only once.
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    PRNs:                 sorted array of the PRN numbers with a column
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    PRNs = np.flatnonzero(PRN2col)
+    columns = np.append(0, PRN2col[PRNs])
+    PRN2col[PRNs] = np.arange(1, len(PRNs) + 1)
+
+    GNSS_obs[curr_sys] = GNSS_obs[curr_sys][0:nepochs, columns]
+    if readLLI:
+        GNSS_LLI[curr_sys] = GNSS_LLI[curr_sys][0:nepochs, columns]
+    if readSS:
+        GNSS_SS[curr_sys] = GNSS_SS[curr_sys][0:nepochs, columns]
+    max_nSats = int(GNSS_SVs[curr_sys][0:nepochs, 0].max()) if nepochs > 0 else 0
+    GNSS_SVs[curr_sys] = GNSS_SVs[curr_sys][0:nepochs, 0:max(max_nSats, len(PRNs)) + 1].copy()
+    return PRNs
+
+
+def getObservedPRNs(GNSS_SVs):
+    """
+    Returns sorted array of the PRN numbers in GNSS_SVs of one GNSS system,
+    ie. the satellites with observations in at least one epoch.
+    """
+    if GNSS_SVs.shape[0] == 0 or GNSS_SVs.shape[1] < 2:
+        return np.zeros(0, dtype=int)
+    PRNs = np.unique(GNSS_SVs[:, 1:]).astype(int)
+    return PRNs[PRNs > 0]
+
+
+def getMaxSat(curr_sys, PRNs):
+    """
+    Returns max PRN number of GNSS system curr_sys, ie. the max number of PRN
+    in the constellation, or the highest PRN of PRNs if that is higher.
+    """
+    max_sat = MAX_CONSTELLATION_PRN.get(curr_sys, 0)
+    if len(PRNs) > 0:
+        max_sat = max(max_sat, int(np.max(PRNs)))
+    return max_sat
+
+
+def getPRN2ColumnMap(GNSS_SVs, max_sat=None):
+    """
+    Function that returns the PRN-to-column map of the observation arrays of
+    one GNSS system, as read by readRinexObs with denseObs = 1. The columns of
+    the observation arrays are the satellites of GNSS_SVs in order of PRN
+    number, starting at column 1.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    GNSS_SVs:             matrix [nepochs, nCols] with number of satellites
+                          with observations, and their PRN numbers, for
+                          each epoch. As returned by readRinexObs
+
+    max_sat:              max PRN number of GNSS system. Default: highest
+                          PRN in GNSS_SVs (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    PRN2col:              array [max_sat+1]. PRN2col[PRN] is the column of
+                          satellite PRN. Satellites without observations
+                          have column 0, which contains no observations
+
+    PRNs:                 sorted array of PRN numbers with observations
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    PRNs = getObservedPRNs(GNSS_SVs)
+    if max_sat is None:
+        max_sat = PRNs[-1] if len(PRNs) > 0 else 0
+    PRN2col = np.zeros(max(int(max_sat), PRNs[-1] if len(PRNs) > 0 else 0) + 1, dtype=int)
+    PRN2col[PRNs] = np.arange(1, len(PRNs) + 1)
+    return PRN2col, PRNs
@@ -2,31 +2,91 @@ import numpy as np
 from datetime import date
 from numpy import fix
 from tqdm import tqdm
-from Geodetic_functions import date2gpstime
-import time,os, re
+from Geodetic_functions import date2gpstime, dates2gpstime
+from prnColumnMap import newPRN2ColumnMap, assignPRNColumns, growSatColumns, sortSatColumns, getPRN2ColumnMap, getObservedPRNs, getMaxSat
+from rinexObsIndex import getRinexObsIndex, findEpochsInTimeWindow
+from rinexObsMmap import rinexReadObsBlocksMmap304, rinexReadObsBlocksMmap211
+from rinexObsParallel import rinexReadObsBlocksParallel304
+from rinexCompression import openRinexFile, rinexFileBuffer, getRinexFileSize, isRinexBuffer, readRinexSource, \
+    getRinexSourceName, getRinexSourceSize
+from rinexObsHatanaka import isCompactRinex, rinexReadObsBlocksHatanaka
+from rinexObsSession import mergeRinexObs
+import time, re
 global tFirstObs
 
 def readRinexObs(filename, readSS=None, readLLI=None, includeAllGNSSsystems=None,includeAllObsCodes=None, \
-                                      desiredGNSSsystems=None, desiredObsCodes=None, desiredObsBands=None):
+                                      desiredGNSSsystems=None, desiredObsCodes=None, desiredObsBands=None, denseObs=None, \
+                                      tStart=None, tEnd=None, useMmap=None, nWorkers=None, obsCodePairsOnly=None):
     """
     Function that chooses which function to use based on header info.
+    tStart, tEnd, nWorkers and obsCodePairsOnly are only supported for RINEX 3 
+    observation files.
+    Files compressed by gzip (.gz), bzip2 (.bz2) or Unix compress (.Z) are 
+    decompressed while they are read, see rinexCompression.py. Compact RINEX
+    (Hatanaka) files, ex. .crx or .crx.gz, are decoded while they are read,
+    see rinexObsHatanaka.py
+    
+    filename can also be a list of observation files of one session, ex. 
+    hourly files of one station, in order of time. The files are read one
+    at a time and merged into one continuous set of arrays, see 
+    mergeRinexObs in rinexObsSession.py. The files must have the same GNSS 
+    systems, observation codes, observation interval and GLONASS channels. 
+    Overlapping epochs are only kept once. tStart and tEnd are applied to 
+    the merged session, for both RINEX 2 and 3 files.
+    
+    filename, or the files of a session, can also be the content of a RINEX 
+    observation file in memory, bytes or memoryview, or a binary file-like 
+    object, ex. a payload received from a queue. The content is read once,
+    and never written to a temporary file, see readRinexSource in 
+    rinexCompression.py. The epoch index is then built in memory and not 
+    stored.
     """
     
-    fid = open(filename,'r') 
-    if os.stat(filename).st_size == 0:
+    if isinstance(filename, (list, tuple)):
+        ## -- Session of several observation files
+        filename = [readRinexSource(file) for file in filename]
+        results = []
+        for file in filename:
+            result = readRinexObs(file, readSS, readLLI, includeAllGNSSsystems, includeAllObsCodes, desiredGNSSsystems, \
+                                  desiredObsCodes, desiredObsBands, 1, None, None, useMmap, nWorkers, obsCodePairsOnly)
+            if result is None or result[-1] == 0:
+                print('ERROR(readRinexObs): The observation file %s of the session could not be read' % getRinexSourceName(file))
+                return
+            results.append(result)
+        result = mergeRinexObs(results, [getRinexSourceName(file) for file in filename], tStart, tEnd)
+        if result is None:
+            return
+        result = list(result)
+        if not denseObs:
+            GNSS_obs, GNSS_LLI, GNSS_SS = result[0:3]
+            ## -- LLI and SS not read are NaN
+            readLLI = int(any([isinstance(GNSS_LLI[sys], np.ndarray) for sys in GNSS_obs]))
+            readSS = int(any([isinstance(GNSS_SS[sys], np.ndarray) for sys in GNSS_obs]))
+            result[0:3] = denseObs2EpochDicts(GNSS_obs, GNSS_LLI, GNSS_SS, result[3], result[5], readLLI, readSS)
+        return tuple(result)
+    
+    filename = readRinexSource(filename)
+    if getRinexSourceSize(filename) == 0:
         raise ValueError('ERROR: This file seems to be empty')
-    line = fid.readline().rstrip()
+    with openRinexFile(filename) as fid:
+        line = fid.readline().rstrip()
+        ## -- Compact RINEX files start with two lines of their own
+        if 'CRINEX VERS' in line:
+            fid.readline()
+            line = fid.readline().rstrip()
     rinexVersion = line[0:9].strip()
     if '2' in rinexVersion.split('.')[0]:
+        if tStart is not None or tEnd is not None:
+            print('WARNING(readRinexObs): tStart and tEnd are only supported for RINEX 3 observation files. All epochs will be read')
         GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs, GNSSsystems,\
             obsCodes, approxPosition, max_sat, tInterval, markerName, rinexVersion, recType, timeSystem, leapSec, gnssType,\
-            rinexProgr, rinexDate, antDelta, tFirstObs, tLastObs, clockOffsetsON, GLO_Slot2ChannelMap, success=  readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=None,includeAllObsCodes=None, \
-                            desiredGNSSsystems=None, desiredObsCodes=None, desiredObsBands=None) ## WHEN A SOUTION IS FOUND ON desiredGNSSsystems, =None must be removed. 
+            rinexProgr, rinexDate, antDelta, tFirstObs, tLastObs, clockOffsetsON, GLO_Slot2ChannelMap, success=  readRinexObs211(filename, readSS=readSS, readLLI=readLLI, includeAllGNSSsystems=includeAllGNSSsystems,includeAllObsCodes=includeAllObsCodes, \
+                            desiredGNSSsystems=desiredGNSSsystems, desiredObsCodes=desiredObsCodes, desiredObsBands=desiredObsBands, denseObs=denseObs, useMmap=useMmap)
     else:
        GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs, GNSSsystems,\
            obsCodes, approxPosition, max_sat, tInterval, markerName, rinexVersion, recType, timeSystem, leapSec, gnssType,\
            rinexProgr, rinexDate, antDelta, tFirstObs, tLastObs, clockOffsetsON, GLO_Slot2ChannelMap, success =  readRinexObs304(filename, readSS, readLLI, includeAllGNSSsystems,includeAllObsCodes, \
-                            desiredGNSSsystems, desiredObsCodes, desiredObsBands)
+                            desiredGNSSsystems, desiredObsCodes, desiredObsBands, denseObs, tStart, tEnd, useMmap, nWorkers, obsCodePairsOnly)
                
     return GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs, GNSSsystems,\
         obsCodes, approxPosition, max_sat, tInterval, markerName, rinexVersion, recType, timeSystem, leapSec, gnssType,\
@@ -35,14 +95,14 @@ def readRinexObs(filename, readSS=None, readLLI=None, includeAllGNSSsystems=None
         
 
 def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=None,includeAllObsCodes=None, \
-                    desiredGNSSsystems=None, desiredObsCodes=None, desiredObsBands=None):
+                    desiredGNSSsystems=None, desiredObsCodes=None, desiredObsBands=None, denseObs=None, \
+                    tStart=None, tEnd=None, useMmap=None, nWorkers=None, obsCodePairsOnly=None):
     """
     Program/function to read GNSS observations in RINEX 3.04 observation files
-    The main core of the program is 4 functions:
+    The main core of the program is 3 functions:
                                   rinexReadObsFileHeader304
                                   rinexReadObsBlockHead304
                                   rinexReadObsBlock304
-                                  rinexFindNEpochs304
                                   
                                   
     To export every parameter use this code:
@@ -58,7 +118,13 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
     INPUTS 
     
     filename:                 path and name of RINEX 3.04 observation file,
-                              string
+                              string, or content of the file in memory, bytes,
+                              memoryview or binary file-like object, see 
+                              readRinexSource. Compact RINEX (Hatanaka) files are 
+                              decoded one epoch at a time, see 
+                              rinexObsHatanaka.py. useMmap and nWorkers are 
+                              then not used, and all epochs before tStart 
+                              are decoded
     
     readSS:                   Boolean, 0 or 1. 
                               1 = read "Signal Strength" Indicators
@@ -87,34 +153,88 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
     
     desiredObsBands:          array of desired obs Bands to be included,
                               ex [1, 5]
+    
+    denseObs:                 Boolean, 0 or 1.
+                              1 = return GNSS_obs, GNSS_LLI and GNSS_SS as one 
+                                  3D array per GNSS system
+                              0 = return GNSS_obs, GNSS_LLI and GNSS_SS as a dict
+                                  of epoch matrices per GNSS system (default)
+    
+    tStart:                   start of time window to read, 
+                              [YYYY, MM, DD, hh, mm, ss.sssssss]. Only epochs
+                              at or after tStart are read. None = from first 
+                              epoch (optional)
+    
+    tEnd:                     end of time window to read, 
+                              [YYYY, MM, DD, hh, mm, ss.sssssss]. Only epochs
+                              at or before tEnd are read. None = to last 
+                              epoch (optional)
+                              
+                              If tStart or tEnd is given an epoch index is 
+                              used to seek directly to the first epoch of the
+                              time window. The index is stored next to the
+                              observation file, see rinexObsIndex.py
+    
+    useMmap:                  Boolean, 0 or 1.
+                              1 = decode the observation blocks directly from 
+                                  the memory mapped file, see rinexObsMmap.py. 
+                                  Recommended for large files.
+                              0 = read the observation blocks line by line (default)
+    
+    nWorkers:                 number of processes used to decode the observation
+                              blocks. If larger than 1, the file is split into
+                              chunks of epochs that are decoded in parallel
+                              from the memory mapped file, see rinexObsParallel.py. 
+                              Uses the epoch index. Default 1
+    
+    obsCodePairsOnly:         Boolean, 0 or 1.
+                              1 = of the observation types selected by the 
+                                  arguments above, read only code and phase 
+                                  observations that can be used in code-phase
+                                  linear combinations, see getObsCodePairs. 
+                                  "Loss-Of-Lock Indicators" are only read for
+                                  the phase observations, and are 0 for the
+                                  code observations
+                              0 = read all selected observation types (default)
     --------------------------------------------------------------------------------------------------------------------------
     OUTPUTS
     
-    GNSS_obs:                 cell containing a matrix for each GNSS system.
-                              Each matrix is a 3D matrix containing all 
-                              observation of current GNSS system for all epochs. 
+    GNSS_obs:                 dict containing observations for each GNSS system.
                               Order of obsType index is same order as in 
-                              obsCodes cell
-    
-                              GNSS_obs{GNSSsystemIndex}(PRN, obsType, epoch)
-                                              GNSSsystemIndex: double,
-                                              1,2,...,numGNSSsystems
-                                              PRN: double
-                                              ObsType: double: 1,2,...,numObsTypes
-                                              epoch: double
-    
-    GNSS_LLI:                 cell containing a matrix for each GNSS system
-                              Each matrix stores loss of lock indicators for
-                              each epoch for that GNSS system
-    
-    GNSS_SS:                  cell containing a matrix for each GNSS system
-                              Each matrix stores signal strength indicators 
-                              for each epoch for that GNSS system
+                              obsCodes dict.
+                              
+                              denseObs = 1: one 3D array [nepochs, nSats+1, numObsTypes]
+                              per GNSS system, with one column for each of 
+                              the nSats satellites with observations, in 
+                              order of PRN. Column 0 is unused. The column of
+                              each PRN is given by getPRN2ColumnMap(GNSS_SVs[GNSSsystem])
+                              GNSS_obs[GNSSsystem][epoch, col, obsType]
+                                              GNSSsystem: str, ex. 'G'
+                                              epoch: int: 0,1,...,nepochs-1
+                                              col: int: PRN2col[PRN]
+                                              ObsType: int: 0,1,...,numObsTypes-1
+                              
+                              denseObs = 0: dict of 2D arrays [max_sat+1, numObsTypes],
+                              one for each epoch. Row 0 is unused
+                              GNSS_obs[GNSSsystem][epoch][PRN, obsType]
+                                              epoch: int: 1,2,...,nepochs
+    
+    GNSS_LLI:                 dict containing loss of lock indicators for each 
+                              GNSS system. Same layout as GNSS_obs. np.nan if 
+                              readLLI = 0 and denseObs = 1. Stored as int8, 
+                              with -1 where the indicator is blank and 0 where 
+                              there is no observation
+    
+    GNSS_SS:                  dict containing signal strength indicators for 
+                              each GNSS system. Same layout as GNSS_obs. np.nan if 
+                              readSS = 0 and denseObs = 1. Stored as int8, 
+                              with -1 where the indicator is blank and 0 where 
+                              there is no observation
     
     GNSS_SVs:                 cell containing a matrix for each GNSS system.
                               Each matrix contains number of satellites with 
                               obsevations for each epoch, and PRN for those 
-                              satellites
+                              satellites. denseObs = 0: [nepochs, max_sat+1]
     
                               GNSS_SVs{GNSSsystemIndex}(epoch, j)  
                                               j=1: number of observed satellites
@@ -145,7 +265,9 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
                               observation file header. [X, Y, Z]
     
     max_sat:                  array conataining max PRN number for each GNSS
-                              system. Follows same order as GNSSsystems
+                              system, ie. max PRN of the constellation, or the
+                              highest PRN with observations if that is higher.
+                              Follows same order as GNSSsystems
     
     tInterval:                observations interval; seconds. 
     
@@ -211,11 +333,11 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
                               0 otherwise
     --------------------------------------------------------------------------------------------------------------------------
     
-    ADVICE: The function rinexFindNEpochs() calculates the amount of observation epochs in
-    advance. This calculation will be incredibly more effective if TIME OF
-    LAST OBS is included in the header of the observation file. It is
-    strongly advized to manually add this information to the header if it is 
-    not included by default.  
+    NOTE: The observation file is read only once. The number of epochs, and 
+    TIME OF LAST OBS and INTERVAL if missing in the header, are found while 
+    reading the observations. Memory is allocated for the amount of epochs 
+    given by TIME OF FIRST OBS, TIME OF LAST OBS and INTERVAL in the header, 
+    and is doubled whenever the file turns out to contain more epochs.
     --------------------------------------------------------------------------------------------------------------------------
     
     According to RINEX 3.04 the observation type codes are:
@@ -288,6 +410,17 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
         desiredObsCodes = ['C','L','S','D']       
     if desiredObsBands is None:
         desiredObsBands = list(np.arange(1,10))
+    if denseObs is None:
+        denseObs = 0
+    if useMmap is None:
+        useMmap = 0
+    if nWorkers is None:
+        nWorkers = 1
+    if obsCodePairsOnly is None:
+        obsCodePairsOnly = 0
+    
+    ## -- Content of file-like objects is read into memory
+    filename = readRinexSource(filename)
     
     ## Get the start time
     t = time.process_time()
@@ -320,18 +453,6 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
     
     ### --- Dict for storing data
     GNSS_obs = {}
-    GPS = {} 
-    GLONASS = {}
-    Galileo = {}
-    BeiDou = {}
-    GPS_LLI = {} 
-    GLONASS_LLI = {}
-    Galileo_LLI = {}
-    BeiDou_LLI = {}
-    GPS_SS = {} 
-    GLONASS_SS = {}
-    Galileo_SS = {}
-    BeiDou_SS = {}
      
     ## -- Test if readSS is boolean
     if readSS!=1 and readSS!=0:
@@ -346,27 +467,63 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
         success = 0
         return
     
-    max_GPS_PRN     = 36 # Max number of GPS PRN in constellation
-    max_GLONASS_PRN = 36 # Max number of GLONASS PRN in constellation
-    max_Galileo_PRN = 36 # Max number of Galileo PRN in constellation
-    max_Beidou_PRN  = 60 # Max number of BeiDou PRN in constellation
+    ## -- Test if denseObs is boolean
+    if denseObs!=1 and denseObs!=0:
+        print('INPUT ERROR(readRinexObs304): The input argument denseObs must be either 1 or 0')
+        success = 0
+        return
+    
+    ## -- Test if useMmap is boolean
+    if useMmap!=1 and useMmap!=0:
+        print('INPUT ERROR(readRinexObs304): The input argument useMmap must be either 1 or 0')
+        success = 0
+        return
     
     ## -- Read header of observation file
     [success, rinexVersion, gnssType, markerName, recType, antDelta,\
     GNSSsystems,numOfObsCodes, obsCodes, obsCodeIndex,tFirstObs, tLastObs, tInterval, \
     timeSystem, _, clockOffsetsON, rinexProgr, rinexDate,leapSec, approxPosition, GLO_Slot2ChannelMap, _, fid] = \
-    rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCodes,desiredGNSSsystems, desiredObsCodes, desiredObsBands)
+    rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCodes,desiredGNSSsystems, desiredObsCodes, desiredObsBands, \
+                              obsCodePairsOnly)
     
     if success==0:
         return
     
-    ## -- Compute number of epochs with observations
-    nepochs, tLastObs, tInterval, success =\
-        rinexFindNEpochs304(filename, tFirstObs, tLastObs, tInterval) #computes number of epochs in observation file
-    
-    if success==0:
-        pass
-        return    
+    ## -- Observation types to read "Loss-Of-Lock Indicators" of. None = all
+    LLIcodeIndex = getLLIcodeIndex(GNSSsystems, obsCodes) if obsCodePairsOnly else None
+    
+    ## -- Differenced observations of compact RINEX files can only be decoded in order
+    compactRinex = isCompactRinex(filename)
+    if compactRinex and nWorkers > 1:
+        print('INFO(readRinexObs304): Compact RINEX files are decoded in one process. nWorkers is not used')
+        nWorkers = 1
+    
+    ## -- Number of epochs to allocate for. The file is read only once, so the
+    ## -- buffers are grown while reading if the file contains more epochs
+    tLastObs_in_header = not np.all(np.isnan(tLastObs))
+    tInterval_in_header = not np.isnan(tInterval)
+    max_epochs = np.inf
+    body_offset = None
+    if (tStart is not None or tEnd is not None or nWorkers > 1) and not compactRinex:
+        ## -- Use epoch index to seek to first epoch in time window
+        rinexObsIndex = getRinexObsIndex(filename)
+        epochs_in_window = findEpochsInTimeWindow(rinexObsIndex, tStart, tEnd)
+        if len(epochs_in_window) == 0:
+            print('ERROR(readRinexObs304): There are no observation epochs between tStart and tEnd')
+            success = 0
+            return
+        body_offset = int(rinexObsIndex['offset'][epochs_in_window[0]])
+        fid.seek(body_offset)
+        tFirstObs = rinexObsIndex['time'][epochs_in_window[0]].reshape(6,1)
+        tLastObs = rinexObsIndex['time'][epochs_in_window[-1]].reshape(6,1)
+        tLastObs_in_header = 1
+        nepochs = len(epochs_in_window)
+        max_epochs = nepochs
+    elif tLastObs_in_header and tInterval_in_header and tInterval > 0:
+        nepochs = int(np.floor(time_difference(tFirstObs[:,0], tLastObs[:,0])/tInterval)) + 1
+        nepochs = max(nepochs, 1)
+    else:
+        nepochs = 1024
     
     ## --Number of GNSS systems
     nGNSSsystems = len(GNSSsystems)
@@ -374,34 +531,26 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
     ## Declare data cells, arrays and matrices
     GNSS_SVs = {}
     max_sat  =  np.zeros([nGNSSsystems,1])
-    t_week = []
-    t_tow = []
+    epoch_dates = np.zeros([nepochs,6]) # time stamp of each epoch
     
     GNSSsystems_full_names =  [""]*nGNSSsystems
     ##  -- Making dict for storin LLI and SS
     GNSS_LLI = {}
     GNSS_SS = {}
+    PRN2col = {} # PRN-to-column map of each GNSS system
 
 
-    ## -- Create array for max_sat. Initialize cell elements in cell arrays
+    ## -- Initialize cell elements in cell arrays
     for k in np.arange(0,nGNSSsystems):
        if GNSSsystems[k+1] == 'G':
-           max_sat[k] = max_GPS_PRN
-           GNSS_SVs['G'] = np.zeros([nepochs,int(max_sat[k] + 1)])
            GNSSsystems_full_names[k] = "GPS"
        elif GNSSsystems[k+1] == 'R':
-           max_sat[k] = max_GLONASS_PRN
-           GNSS_SVs['R'] = np.zeros([nepochs,int(max_sat[k] + 1)])
            GNSSsystems_full_names[k] = "GLONASS"
         
        elif GNSSsystems[k+1] == 'E':
-           max_sat[k] = max_Galileo_PRN
-           GNSS_SVs['E'] = np.zeros([nepochs,int(max_sat[k]) + 1])
            GNSSsystems_full_names[k] = "Galileo"
     
        elif GNSSsystems[k+1] == 'C':
-           max_sat[k] = max_Beidou_PRN
-           GNSS_SVs['C'] = np.zeros([nepochs,int(max_sat[k]) + 1])
            GNSSsystems_full_names[k] = "BeiDou"
        else:
            print('ERROR(readRinexObs304): Only following GNSS systems are compatible with this program: GPS, GLONASS, Galileo, Beidou. %s is not valid' % GNSSsystems[k])
@@ -409,16 +558,20 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
            
        
        curr_sys = GNSSsystems[k+1]
-       GNSS_obs[curr_sys] = np.zeros([int(max_sat[k]), numOfObsCodes[k], nepochs])
+       ## -- Preallocate [epoch, satellite column, obsType] arrays. Satellites are given
+       ## -- columns as they are found, and the arrays are grown. Column 0 is unused
+       PRN2col[curr_sys] = newPRN2ColumnMap()
+       GNSS_SVs[curr_sys] = np.zeros([nepochs, 1])
+       GNSS_obs[curr_sys] = np.zeros([nepochs, 1, numOfObsCodes[k]])
        
        # Preallocation LLI and SS
        if readLLI:
-           GNSS_LLI[curr_sys] = np.zeros([nGNSSsystems,1])
+           GNSS_LLI[curr_sys] = np.zeros([nepochs, 1, numOfObsCodes[k]], dtype=np.int8)
        else:
            GNSS_LLI[curr_sys] = np.nan
            
        if readSS:
-           GNSS_SS[curr_sys] = np.zeros([nGNSSsystems,1])
+           GNSS_SS[curr_sys] = np.zeros([nepochs, 1, numOfObsCodes[k]], dtype=np.int8)
        else:
            GNSS_SS[curr_sys] = np.nan;
     
@@ -426,12 +579,43 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
     GNSS_names = dict(zip(['G', 'R', 'E', 'C'],['GPS','GLONASS','Galileo','Beidou']))
     current_epoch      = 0
     
-    ## -- Initialize progress bar
-    n_update_break = int(np.floor(nepochs/10)) #number of epoch before updating progressbar
+    ## -- Initialize progress bar. Progress is given by position in file, if the size of
+    ## -- the decompressed file is known
+    file_size = getRinexFileSize(filename)
+    n_update_break = max(int(np.floor(nepochs/10)), 1) #number of epoch before updating progressbar
     bar_format = '{desc}: {percentage:3.0f}%|{bar}| ({n_fmt}/{total_fmt})'
     # with tqdm(total=100,desc ="Rinex observations are being read" , position=0, leave=True) as pbar:
     with tqdm(total=100,desc ="Rinex observations are being read" , position=0, leave=True, bar_format=bar_format) as pbar:
-        while 1:
+        if compactRinex:
+            ## -- Decode differenced observation blocks of compact RINEX file epoch by epoch
+            fid.close()
+            success, current_epoch, epoch_dates = rinexReadObsBlocksHatanaka(filename, tStart, tEnd, GNSSsystems, numOfObsCodes, \
+                                                    obsCodeIndex, readSS, readLLI, GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col, LLIcodeIndex)
+            if (tStart is not None or tEnd is not None) and current_epoch == 0:
+                print('ERROR(readRinexObs304): There are no observation epochs between tStart and tEnd')
+                success = 0
+                return
+            if tStart is not None or tEnd is not None:
+                tFirstObs = epoch_dates[0].reshape(6,1)
+                tLastObs = epoch_dates[-1].reshape(6,1)
+                tLastObs_in_header = 1
+        elif nWorkers > 1:
+            ## -- Decode observation blocks from memory mapped file in parallel processes
+            fid.close()
+            success, current_epoch, epoch_dates = rinexReadObsBlocksParallel304(filename, rinexObsIndex, epochs_in_window, nWorkers, GNSSsystems, \
+                                                    numOfObsCodes, obsCodeIndex, readSS, readLLI, GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col, \
+                                                    LLIcodeIndex)
+        elif useMmap:
+            ## -- Decode all observation blocks from memory mapped file
+            fid.close()
+            success, current_epoch, epoch_dates = rinexReadObsBlocksMmap304(filename, body_offset, max_epochs, GNSSsystems, numOfObsCodes, \
+                                                    obsCodeIndex, readSS, readLLI, GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col, \
+                                                    LLIcodeIndex=LLIcodeIndex)
+        if compactRinex or nWorkers > 1 or useMmap:
+            nepochs = len(GNSS_SVs[GNSSsystems[1]])
+        
+        ## -- Read observation blocks one at a time
+        while not compactRinex and not useMmap and nWorkers == 1 and current_epoch < max_epochs:
            ## Read Obs Block Header
            success, _, _, date, numSV, eof = rinexReadObsBlockHead304(fid)
            
@@ -439,130 +623,90 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
               break          
         
            ## -- Read current block of observations
-           success, Obs,SVlist, numSV, LLI, SS, eof = rinexReadObsBlock304(fid, numSV, numOfObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI)
+           success, Obs,SVlist, numSV, LLI, SS, eof = rinexReadObsBlock304(fid, numSV, numOfObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI, LLIcodeIndex)
         
            if success ==0 or eof==1:
               break
            
            current_epoch = current_epoch + 1
+           
+           ## -- Double the size of the buffers if they are full
+           if current_epoch > nepochs:
+               for curr_sys in GNSS_obs:
+                   GNSS_obs[curr_sys] = np.concatenate((GNSS_obs[curr_sys], np.zeros_like(GNSS_obs[curr_sys])), axis=0)
+                   GNSS_SVs[curr_sys] = np.concatenate((GNSS_SVs[curr_sys], np.zeros_like(GNSS_SVs[curr_sys])), axis=0)
+                   if readLLI:
+                       GNSS_LLI[curr_sys] = np.concatenate((GNSS_LLI[curr_sys], np.zeros_like(GNSS_LLI[curr_sys])), axis=0)
+                   if readSS:
+                       GNSS_SS[curr_sys] = np.concatenate((GNSS_SS[curr_sys], np.zeros_like(GNSS_SS[curr_sys])), axis=0)
+               epoch_dates = np.concatenate((epoch_dates, np.zeros_like(epoch_dates)), axis=0)
+               nepochs = 2*nepochs
         
            ## -- Update progress bar every n_update_break epochs
-           if np.mod(current_epoch, n_update_break) == 0:
-                pbar.update(10)
+           if np.mod(current_epoch, n_update_break) == 0 and file_size > 0:
+                pbar.update(min(int(100*fid.tell()/file_size), 100) - pbar.n)
 
                 
         
-           ## Convert date to GPS-week and "time-of-week"
-           week, tow = date2gpstime(int(date[0]), int(date[1]), int(date[2]), int(date[3]), int(date[4]), int(date[5]))
-          
-           ## Store GPS-week and "time-of-week" of current epoch
-           t_week.append(week)
-           t_tow.append(tow)
-           time_epochs = np.column_stack((t_week,t_tow))
-           ## Number of satellites with observations in this epoch, for each GNSS system
-           nGNSS_sat_current_epoch = np.zeros([nGNSSsystems,1])
-          
-           ## Initialize dummy variables
-           GNSS_obs_dum = {}
-           GNSS_LLI_dum = {}
-           GNSS_SS_dum  = {}
+           ## -- Store time stamp of current epoch. Converted to GPS-week and "time-of-week" after reading
+           epoch_dates[current_epoch-1, :] = date[0:6]
+           
+           ## -- Store obs, LLI and SS of all satellites of epoch, one GNSS system at a time
+           SV_systems = [SV[0] for SV in SVlist]
            for k in np.arange(0,nGNSSsystems):
-               ## -- Initialize arrays of dummy variables
-               GNSS_obs_dum[k+1] = np.zeros([int(max_sat[k]) +1, numOfObsCodes[k]]) # added +1 12.11.2022 to get PRN36 sats
-               GNSS_LLI_dum[k+1] = np.zeros([int(max_sat[k]) +1, numOfObsCodes[k]])  # added +1 12.11.2022 to get PRN36 sats
-               GNSS_SS_dum[k+1]  = np.zeros([int(max_sat[k]) +1, numOfObsCodes[k]]) # added +1 12.11.2022 to get PRN36 sats
-        
-           ## -- Iterate through satellites of epoch and store obs, LLI and SS
-           for sat in np.arange(0,numSV):
-               ## -- Get index of current GNSS system
-               curr_sys = SVlist[sat][0]
-               GNSSsystemIndex = [i for i in GNSSsystems if GNSSsystems[i]==curr_sys][0]
-              
-               ## --Increment amount of satellites this epoch for this GNSS system
-               nGNSS_sat_current_epoch[GNSSsystemIndex-1] = nGNSS_sat_current_epoch[GNSSsystemIndex-1] + 1
-              
-               ## --Get just PRN number
-               SV = int(SVlist[sat][1:3])
-              
-               # Number of obs types for current satellite
-               nObsTypes_current_sat = numOfObsCodes[GNSSsystemIndex-1]
-              
-               ## -- Store observations, LLI, and SS of current satellite this epoch        
-               GNSS_obs_dum[GNSSsystemIndex][SV][0:nObsTypes_current_sat] = Obs[sat,0:nObsTypes_current_sat] # removed -1 due to lack of C5X obs
-        
-              
+               curr_sys = GNSSsystems[k+1]
+               ## -- Rows of Obs belonging to current GNSS system, and their PRN numbers
+               sat_rows = [sat for sat in range(0, numSV) if SV_systems[sat] == curr_sys]
+               PRNs = [int(SVlist[sat][1:3]) for sat in sat_rows]
+               nObsTypes_current_sys = int(numOfObsCodes[k])
+               
+               ## -- Columns of the satellites. Arrays are grown if new satellites are found
+               cols = assignPRNColumns(PRN2col[curr_sys], PRNs)
+               growSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, max(PRN2col[curr_sys].max(), len(PRNs)) + 1, readLLI, readSS)
+               
+               GNSS_obs[curr_sys][current_epoch-1, cols, 0:nObsTypes_current_sys] = Obs[sat_rows, 0:nObsTypes_current_sys]
                if readLLI:
-                  GNSS_LLI_dum[GNSSsystemIndex][SV][0:nObsTypes_current_sat] = LLI[sat, 0:nObsTypes_current_sat] # fjernet "-1" 13.11.2022 siste koloonnen ble ikke med pga -1
+                  GNSS_LLI[curr_sys][current_epoch-1, cols, 0:nObsTypes_current_sys] = LLI[sat_rows, 0:nObsTypes_current_sys]
                if readSS:
-                  GNSS_SS_dum[GNSSsystemIndex][SV][0:nObsTypes_current_sat] = SS[sat, 0:nObsTypes_current_sat] # fjernet "-1" 13.11.2022
-              
+                  GNSS_SS[curr_sys][current_epoch-1, cols, 0:nObsTypes_current_sys] = SS[sat_rows, 0:nObsTypes_current_sys]
+               
+               ## --Set number of satellites with obs, and their PRN numbers, for each GNSS system this epoch
+               GNSS_SVs[curr_sys][current_epoch-1, 0]  = len(PRNs)
+               GNSS_SVs[curr_sys][current_epoch-1, 1:len(PRNs)+1] = PRNs
         
-               ## -- Store PRN number of current sat to PRNs of this epoch
-               GNSS_SVs[curr_sys][current_epoch-1, int(nGNSS_sat_current_epoch[GNSSsystemIndex-1])] = SV 
+        pbar.update(100 - pbar.n)
+    
+        ## -- Remove unused part of buffers, and order satellite columns by PRN.
+        ## -- max_sat is max PRN of the constellation, or the highest PRN with observations
+        for k in np.arange(0,nGNSSsystems):
+            curr_sys = GNSSsystems[k+1]
+            PRNs = sortSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, PRN2col[curr_sys], current_epoch, readLLI, readSS)
+            max_sat[k] = getMaxSat(curr_sys, PRNs)
+        nepochs = current_epoch
+        epoch_dates = epoch_dates[0:nepochs]
         
-    
+        ## -- Convert time stamps of all epochs to GPS-week and "time-of-week". Seconds are truncated to integers
+        if nepochs > 0:
+            t_week, t_tow = dates2gpstime(np.column_stack((epoch_dates[:,0:5], np.fix(epoch_dates[:,5]))))
+            time_epochs = np.column_stack((t_week,t_tow))
         
-           for k in np.arange(0,nGNSSsystems):
-               curr_sys = GNSSsystems[k+1]
-               ## --Set number of satellites with obs for each GNSS system this epoch
-               GNSS_SVs[curr_sys][current_epoch-1, 0]  = nGNSS_sat_current_epoch[k]
-
-               if curr_sys == 'G':
-                   GPS[current_epoch] = GNSS_obs_dum[k+1]
-               elif curr_sys == 'R':
-                   GLONASS[current_epoch] = GNSS_obs_dum[k+1]
-               elif curr_sys == 'E':
-                   Galileo[current_epoch] = GNSS_obs_dum[k+1]
-                   Galileo_LLI[current_epoch]  =GNSS_LLI_dum[k+1]
-               elif curr_sys == 'C':
-                   BeiDou[current_epoch] = GNSS_obs_dum[k+1]
-                   BeiDou_LLI[current_epoch]  =GNSS_LLI_dum[k+1]
-                   
-               
-               if readLLI and curr_sys == 'G':
-                   GPS_LLI[current_epoch]  =GNSS_LLI_dum[k+1]
-               elif readLLI and curr_sys == 'R':
-                   GLONASS_LLI[current_epoch] = GNSS_LLI_dum[k+1]
-               elif readLLI and curr_sys == 'E':
-                   Galileo_LLI[current_epoch]  = GNSS_LLI_dum[k+1]                   
-               elif readLLI and curr_sys == 'C':
-                   BeiDou_LLI[current_epoch]  = GNSS_LLI_dum[k+1] 
-               
-               if readSS and curr_sys =='G':
-                   GPS_SS[current_epoch] = GNSS_SS_dum[k+1]
-               elif readSS and curr_sys =='R':
-                   GLONASS_SS[current_epoch] = GNSS_SS_dum[k+1]
-               elif readSS and curr_sys =='E':
-                   Galileo_SS[current_epoch] = GNSS_SS_dum[k+1]
-               elif readSS and curr_sys =='C':
-                   BeiDou_SS[current_epoch]  = GNSS_SS_dum[k+1]                      
-
-         
-    
-        ## -- Storing observation in dictionary       
-        GNSS_obs['G'] = GPS 
-        GNSS_obs['R'] = GLONASS
-        GNSS_obs['E'] = Galileo
-        GNSS_obs['C'] = BeiDou
-        ## -- Storing "loss of lock indicaors"  in dict
-        GNSS_LLI['G'] = GPS_LLI
-        GNSS_LLI['R'] = GLONASS_LLI
-        GNSS_LLI['E'] = Galileo_LLI
-        GNSS_LLI['C'] = BeiDou_LLI
-        ## -- Storing  SS in dict
-        GNSS_SS['G'] = GPS_SS
-        GNSS_SS['R'] = GLONASS_SS
-        GNSS_SS['E'] = Galileo_SS
-        GNSS_SS['C'] = BeiDou_SS
+        ## -- Find observation interval from the two first epochs if not in header
+        if nepochs > 1 and not tInterval_in_header:
+            t_week, t_tow = dates2gpstime(epoch_dates[0:2])
+            tInterval = (t_week[1] - t_week[0])*604800 + t_tow[1] - t_tow[0]
         
-        del_sys = list(GNSS_obs.keys())
-        for sys in del_sys: # Deleting systems with no observations
-            if not GNSS_obs[sys]:
-                del GNSS_obs[sys]
+        ## -- Set TIME OF LAST OBS from last epoch read if not in header
+        if tLastObs_in_header:
+            tLastObs = tLastObs.astype(int)
+        elif nepochs > 0:
+            tLastObs = epoch_dates[-1].reshape(6,1).astype(int)
+            print('INFO(readRinexObs304): The header of the rinex observation file does not contain TIME OF LAST OBS.\n' \
+                'It has been set to the time of the last epoch read')
+        
+        if not denseObs:
+            ## -- Storing observations, LLI and SS in dicts with one matrix per epoch
+            GNSS_obs, GNSS_LLI, GNSS_SS = denseObs2EpochDicts(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, current_epoch, readLLI, readSS)
         
-        if current_epoch!= nepochs and success == 1:
-            print('ERROR(readRinexObs304): The amount of epochs calculated in advance(nepochs = %d) does not equal number og epochs prossesed(current_epoch = %d).\nCheck that header information concerning TIME OF FIRST OBS and TIME OF LAST OBS is correct.\n' %(nepochs, current_epoch))
-             
         messages = {}  
         if success == 1:
            messages[0]= 'INFO(readRinexObs304): The following GNSS systems have been read into the data:'          
@@ -618,159 +762,61 @@ def readRinexObs304(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
         
         
 
-def rinexFindNEpochs304(filename, tFirstObs, tLastObs, tInterval):
+def denseObs2EpochDicts(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, nepochs, readLLI, readSS):
     """
-    Function that computes number of epochs in Rinex 3.xx observation file.
+    Function that converts observations, LLI and SS from arrays 
+    [epoch, satellite column, obsType] for each GNSS system to dicts with one
+    matrix [PRN, obsType] per epoch, ie. the layout returned when denseObs = 0.
+    Row index of the matrices is PRN, from 0 to max_sat, ie. max PRN of the
+    constellation or the highest PRN with observations if that is higher.
+    GNSS_SVs is widened to max_sat+1 columns in place. Systems with no
+    observations are deleted from GNSS_obs.
     --------------------------------------------------------------------------------------------------------------------------
     INPUTS
-   
-    filename:         RINEX observation filename
-   
-    tFirstObs:        time stamp of the first observation record in the RINEX
-                      observations file; column vector 
-                      [YYYY; MM; DD; hh; mm; ss.sssssss]; 
-   
-    tLastObs:         time stamp of the last observation record in the RINEX
-                      observations file; column vector
-                      [YYYY; MM; DD; hh; mm; ss.sssssss]. If this information
-                      was not available in rinex observation header the
-                      default value is Nan. In this case the variable is
-                      determined in this function
-   
-    tInterval:        observations interval; seconds. If this information
-                      was not available in rinex observation header the
-                      default value is Nan. In this case the variable is
-                      determined in this function.
-    --------------------------------------------------------------------------------------------------------------------------
-    OUTPUTS:
-    -------
-    
-    nepochs:          number of epochs in Rinex observation file with
-                      observations
-   
-    tLastObs:         time stamp of the last observation record in the RINEX
-                      observations file; column vector
-                      [YYYY, MM, DD, hh, mm, ss.sssssss]. If this information
-                      was not available in rinex observation header the
-                      default value is Nan. In this case the variable is
-                      determined in this function
-   
-    tInterval:        observations interval; seconds. If this information
-                      was not available in rinex observation header the
-                      default value is Nan.
-   
-    success:                  Boolean. 1 if the function seems to be successful, 
-                              0 otherwise
+
+    GNSS_obs, GNSS_LLI,
+    GNSS_SS:              dicts with an array [nepochs, nSats+1, nObsCodes] 
+                          for each GNSS system, as returned when denseObs = 1
+
+    GNSS_SVs:             dict with a matrix [nepochs, nCols] for each GNSS
+                          system, giving the satellite of each column
+
+    nepochs:              number of epochs
+
+    readLLI, readSS:      Boolean, 0 or 1. 0 = LLI or SS were not read
     --------------------------------------------------------------------------------------------------------------------------
-   
-    ADVICE: The function rinexFindNEpochs() calculates the amount of observation epochs in
-    advance. This calculation will be incredibly more effective if TIME OF
-    LAST OBS is included in the header of the observation file. It is
-    strongly advized to manually add this information to the header if it is 
-    not included by default. 
+    OUTPUTS
+
+    GNSS_obs, GNSS_LLI,
+    GNSS_SS:              dicts with a dict {epoch: matrix} for each GNSS system.
+                          LLI and SS not read are empty dicts
     --------------------------------------------------------------------------------------------------------------------------
     """
-    # #  Testing input arguments
-    success = 1
-    nepochs = 0
-    
-    ## --Test if filename is valid format
-    if type(filename) is not str:
-        raise TypeError('INPUT ERROR(rinexFindNEpoch): The input argument filename'\
-            'is of type %s. Must be of type string' % type(filename))
-    
-    # #  Test if filename is valid format
-    # if ~isa(tFirstObs,'double')||length(tFirstObs)~=6
-    #     sprintf(['INPUT ERROR(rinexFindNEpoch): The input argument tFirstObs',...
-    #         ' is of type # s and has length # d.\n Must be of type double with length 6'],...
-    #         class(tFirstObs), length(tFirstObs))
-    #     success = 0;
-    #     return
-    # end
-    
-    # #  Test if filename is valid format
-    # if (~isa(tLastObs,'double') && length(tLastObs)~=6) && ~any(isnan(tLastObs))
-    #     sprintf(['INPUT ERROR(rinexFindNEpoch): The input argument tLastObs',...
-    #         ' is of type # s and has length # d.\n Must be of type double with length 6, or Nan'],...
-    #         class(tLastObs), length(tLastObs))
-    #     success = 0;
-    #     return
-    # end
-        
-    
+    for sys in ['G', 'R', 'E', 'C']:
+        if sys in GNSS_obs:
+            ## -- Rows of PRN without observations are taken from the unused column 0
+            max_sat = getMaxSat(sys, getObservedPRNs(GNSS_SVs[sys]))
+            PRN2col, _ = getPRN2ColumnMap(GNSS_SVs[sys], max_sat)
+            GNSS_obs[sys] = {ep+1: GNSS_obs[sys][ep][PRN2col] for ep in range(0, nepochs)}
+            ## -- GNSS_SVs has max_sat+1 columns, as the matrices of each epoch
+            nSVcols = GNSS_SVs[sys].shape[1]
+            if nSVcols < max_sat + 1:
+                GNSS_SVs[sys] = np.concatenate((GNSS_SVs[sys], np.zeros([GNSS_SVs[sys].shape[0], max_sat + 1 - nSVcols], \
+                                                dtype=GNSS_SVs[sys].dtype)), axis=1)
+        if readLLI and sys in GNSS_obs:
+            GNSS_LLI[sys] = {ep+1: GNSS_LLI[sys][ep][PRN2col] for ep in range(0, nepochs)}
+        else:
+            GNSS_LLI[sys] = {}
+        if readSS and sys in GNSS_obs:
+            GNSS_SS[sys] = {ep+1: GNSS_SS[sys][ep][PRN2col] for ep in range(0, nepochs)}
+        else:
+            GNSS_SS[sys] = {}
     
-    ## --Open observation file
-    fid = open(filename, 'rt')
-    seconds_in_a_week = 604800
-    #  tLastObs is in header
-    if ~np.all(np.isnan(tLastObs)):  # endret 07.12.2022 
-        #  tInterval is not in header
-        if np.isnan(tInterval):
-            tInterval_found = 0
-            first_epoch_found = 0
-            #  calculate tInterval
-            while not tInterval_found: #  calculate tInterval
-                line = fid.readline().rstrip()
-                #  start of new epoch
-                if '>' in line:
-                    if not first_epoch_found: #  first epoch
-                        first_epoch_time = line[1::]
-                        first_epoch_time = [float(el) for el in line[1::].split(" ") if el != ""]
-                        first_epoch_time = first_epoch_time[:6]
-                        first_epoch_found = 1;
-                    else: #  seconds epoch
-                        second_epoch_time = line[1::]
-                        second_epoch_time = [float(el) for el in line[1::].split(" ") if el != ""]
-                        second_epoch_time = second_epoch_time[:6]                    
-                        tInterval = second_epoch_time[5]-first_epoch_time[5]
-                        tInterval_found = 1;
-       
-        fid.close(); fid = open(filename, 'rt')
-        tFirstObs = tFirstObs.astype(int) 
-        tLastObs = tLastObs.astype(int) 
-        rinex_lines = fid.readlines()
-        epoch_line = [line for line in rinex_lines if '>' in line] # list with all the line thats defines a epoch
-        nepochs = len(epoch_line)    
-    #  if tLastObs is not in header. Function counts number of epochs manually 
-    else:  
-    ## New code for finding last
-        print('INFO(rinexFindEpochs304): The header of the rinex observation file does not contain TIME OF LAST OBS.\n' \
-            'This will be calculated, but consider editing rinex header to include TIME OF LAST HEADER')
-            
-        fid.close(); fid = open(filename, 'rt')
-        rinex_lines = fid.readlines()
-        epoch_lines = [line for line in rinex_lines if '>' in line] # list with all the line thats defines a epoch
-        nepochs = len(epoch_lines)
-        ## Computing the tInterval if not present in the header
-        if np.isnan(tInterval):
-            first_epoch_line  = epoch_lines[0][1::]
-            second_epoch_line = epoch_lines[1][1::]
-            first_epoch_time  = [float(el) for el in first_epoch_line[1::].split(" ") if el != ""]
-            second_epoch_time = [float(el) for el in second_epoch_line[1::].split(" ") if el != ""]
-            tInterval = second_epoch_time[5]-first_epoch_time[5]
-            
-        line = epoch_lines[-1]
-        line = line[1:60]     #  deletes 'TIME OF LAST OBS'
-        line_ = [el for el in line.split(" ") if el != ""]
-        for k in np.arange(0,6):
-            tok = line_.pop(0)     
-            if k ==0:
-                yyyy = int(tok)
-            elif k ==1:
-                mm = int(tok)
-            elif k ==2:
-                dd = int(tok)
-            elif k ==3:
-                hh = int(tok)
-            elif k ==4:
-                mnt = int(tok)
-            elif k ==5:
-                ss = float(tok)
-    
-        tLastObs = np.array([[yyyy],[mm],[dd],[hh],[mnt],[ss]]).astype(int) 
-        print('INFO(rinexFindNEpochs304): TIME OF LAST OBS has been found and amount of epochs have been computed')
-        fid.close()
-    return int(nepochs), tLastObs, tInterval, success
+    del_sys = list(GNSS_obs.keys())
+    for sys in del_sys: # Deleting systems with no observations
+        if not GNSS_obs[sys]:
+            del GNSS_obs[sys]
+    return GNSS_obs, GNSS_LLI, GNSS_SS
 
 
 def date2gpstime(year,month,day,hour,minute,seconds):
@@ -788,7 +834,67 @@ def date2gpstime(year,month,day,hour,minute,seconds):
     
     return week, tow
 
-def rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCodes,desiredGNSSsystems,desiredObsCodes, desiredObsBands):
+
+def getObsCodePairs(obsCodes, obsCodeIndex):
+    """
+    Function that selects the observation codes of one GNSS system that can
+    be used in the code-phase linear combinations of GNSS_MultipathAnalysis.
+    A code observation, ex. "C1C", is used with the phase observation of
+    same code, "L1C", and with a code and phase pair of another carrier band.
+    Only code and phase pairs on carrier bands where another band also has
+    a pair are kept. All other obsCodes, ex. phase observations without a
+    code observation, "S" and "D" obsCodes, are left out.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    obsCodes:             list of obsCodes of the GNSS system, ex. ["C1C", "L1C", "S1C"]
+
+    obsCodeIndex:         list with the index in the RINEX file of each obsCode
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    obsCodes:             list of the obsCodes kept, in the same order
+
+    obsCodeIndex:         list with the index in the RINEX file of each obsCode kept
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    ## -- Code observations that have a phase observation of same code
+    pairs = [code for code in obsCodes if code[0] == 'C' and 'L' + code[1:] in obsCodes]
+    bands = set([code[1] for code in pairs])
+    if len(bands) < 2:
+        return [], []
+    keep = [k for k, code in enumerate(obsCodes) if code in pairs or code[0] == 'L' and 'C' + code[1:] in pairs]
+    return [obsCodes[k] for k in keep], [obsCodeIndex[k] for k in keep]
+
+
+def getLLIcodeIndex(GNSSsystems, obsCodes):
+    """
+    Function that finds the phase observations of each GNSS system. "Loss of
+    lock indicators" are only used for phase observations, so the readers
+    can leave out the indicators of the other observations.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    GNSSsystems:          dict containing codes of GNSS systems, ex. {1: 'G', 2: 'R'}
+
+    obsCodes:             dict of obsCodes of each GNSS system, as returned
+                          by rinexReadObsFileHeader304
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    LLIcodeIndex:         dict with the indices of the phase observations
+                          of each GNSS system, in the order of obsCodes
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    LLIcodeIndex = {}
+    for k in GNSSsystems:
+        codes = obsCodes[k].get(GNSSsystems[k], [])
+        LLIcodeIndex[k] = [j for j, code in enumerate(codes) if code[0] == 'L']
+    return LLIcodeIndex
+
+
+def rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCodes,desiredGNSSsystems,desiredObsCodes, desiredObsBands, \
+                              obsCodePairsOnly=None):
     """
     Extracts relevant data from the header of a RINEX 3.xx GNSS observations 
     file. Excludes undesired GNSS systems, obsevation codes and/or frequency
@@ -798,7 +904,9 @@ def rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCode
     INPUTS:
     ------
     
-    filename:                     RINEX observation filename and path
+    filename:                     RINEX observation filename and path, or
+                                  content of the file in memory, see 
+                                  readRinexSource in rinexCompression.py
 
     includeAllGNSSsystems:        Boolean, 0 or 1. 
                                       1 = include alle GNSS systems
@@ -820,6 +928,14 @@ def rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCode
     desiredObsBands:              array of desired obs Bands to be included, 
                                   ex [1, 5]
 
+    obsCodePairsOnly:             Boolean, 0 or 1. 
+                                      1 = of the included obsCodes, include 
+                                          only code and phase obsCodes that
+                                          can be used in code-phase linear
+                                          combinations, see getObsCodePairs
+                                      0 = include all obsCodes selected by
+                                          the arguments above (default)
+
     NOTE: If both includeAllGNSSsystems and includeAllobsCodes Boolean are 1
           then the last three input arguments are optional to include and may
           be left blank without en error.
@@ -1001,11 +1117,15 @@ def rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCode
     rinexVersion = np.nan                  
     recType = np.nan                       
     GLO_Slot2ChannelMap = np.nan       
+    
+    if obsCodePairsOnly is None:
+        obsCodePairsOnly = 0
      
     ## -------Testing input arguments  
     # Test if filename is valid format
-    if type(filename) != str:
-        print('INPUT ERROR(rinexReadsObsHeader304): The input argument filename is of type %s.\n Must be of type string or char' %(type(filename)))
+    filename = readRinexSource(filename)
+    if type(filename) != str and not isRinexBuffer(filename):
+        print('INPUT ERROR(rinexReadsObsHeader304): The input argument filename is of type %s.\n Must be of type string, bytes or a file-like object' %(type(filename)))
         success = 0
         fid     = 0
         return success
@@ -1076,13 +1196,18 @@ def rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCode
      # end
 
     ## -- Open rinex observation file
-    fid = open(filename,'r') 
-    if os.stat(filename).st_size == 0:
+    fid = openRinexFile(filename,'r') 
+    if getRinexSourceSize(filename) == 0:
         raise ValueError('ERROR: This file seems to be empty')
          
     while 1: # Gobbling the header
         numHeaderLines = numHeaderLines + 1;
         line = fid.readline().rstrip()
+        
+        ## -- Compact RINEX files start with two lines of their own
+        if numHeaderLines == 1 and 'CRINEX VERS' in line:
+            fid.readline()
+            line = fid.readline().rstrip()
           
         if 'END OF HEADER' in line:
             break
@@ -1176,6 +1301,11 @@ def rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCode
                         line = line[0:60]     # deletes 'SYS / # / OBS TYPES'
                         line_ = [el for el in line.split(" ") if el != ""]
                         
+                ## -- Keep only code and phase obsCodes that can form linear combinations
+                if obsCodePairsOnly:
+                    obsCode_list, desiredObsCodeIndex = getObsCodePairs(obsCode_list, desiredObsCodeIndex)
+                    GNSSSystemObsCodes[Sys] = obsCode_list
+                
                 numOfObsCodes.append(len(GNSSSystemObsCodes[Sys]))
                 obsCodes[numGNSSsystems] = GNSSSystemObsCodes
                 obsCodeIndex[numGNSSsystems] = desiredObsCodeIndex # Store indices of desired obsCodes
@@ -1349,7 +1479,7 @@ def rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCode
     
 
 
-def rinexReadObsBlock304(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI):
+def rinexReadObsBlock304(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI, LLIcodeIndex=None):
     """
     Reads all the observations from a RINEX observation block.
     
@@ -1391,6 +1521,12 @@ def rinexReadObsBlock304(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
     readLLI:                  Boolean, 0 or 1. 
                               1 = read "Loss-Of-Lock Indicators"
                               0 = do not read "Loss-Of-Lock Indicators"
+
+    LLIcodeIndex:             dict with the indices of the observation types,
+                              in the order of obsCodeIndex, to read "Loss-Of-Lock
+                              Indicators" of for each GNSS system, see 
+                              getLLIcodeIndex. The indicators of other 
+                              observation types are left 0. None = all (optional)
     --------------------------------------------------------------------------------------------------------------------------
     OUTPUTS:
     --------    
@@ -1423,7 +1559,7 @@ def rinexReadObsBlock304(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
                           types that are associated with what collumn will
                           vary between GNSS systems. SVlist will give
                           overview of what GNSS system each row is connected
-                          to
+                          to. int8, -1 if indicator is blank
     
     SS:                   matrix [numSV x max_nObs] that stores all 
                           "signal strength" indicators of this observation block. 
@@ -1432,7 +1568,7 @@ def rinexReadObsBlock304(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
                           types that are associated with what collumn will
                           vary between GNSS systems. SVlist will give
                           overview of what GNSS system each row is connected
-                          to
+                          to. int8, -1 if indicator is blank
     
     eof:                  end-of-file flag; 1 if end-of-file was reached, 
                           0 otherwise
@@ -1484,89 +1620,65 @@ def rinexReadObsBlock304(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
     # Highest number of obs codes of any GNSS system
     max_n_obs_Types = max(nObsCodes)
     
-    # Initialize variables
-    Obs = np.empty([numSV, max_n_obs_Types]) 
-    SVlist = [np.nan]*numSV
-    if readLLI:
-       LLI = np.empty([numSV, max_n_obs_Types]) 
-    
-    if readSS:
-       SS  = np.empty([numSV, max_n_obs_Types]) 
-                  
-    # number of satellites excluded so far
-    removed_sat = 0                                 
-    desiredGNSSsystems = list(GNSSsystems.values())
-    # Gobble up observation block
+    ## -- Gobble up observation block, one line per satellite
+    lines = []
     for sat in np.arange(0,numSV):
        line = fid.readline().rstrip()   
        if not line:
            return
-      
-       SV = line[0:3].strip() # Satellite code, ex. 'G11' or 'E03'
-       if SV[0] not in desiredGNSSsystems:
-           removed_sat +=1
-       else:
-           ## Index of current GNSS system
-           GNSSsystemIndex = [i for i in GNSSsystems if GNSSsystems[i]==SV[0]][0] 
-           SVlist[sat - removed_sat] = SV # Store SV of current row
-           n_obs_current_system = nObsCodes[GNSSsystemIndex-1]
-           for obs_num in np.arange(0, n_obs_current_system):
-               obsIndex = obsCodeIndex[GNSSsystemIndex][obs_num]
-               charPos = 4+(obsIndex)*16
-               ## check that the current observation of the current GNSS system
-               ## is not on the list of obs types to be excluded
-               ## stringlength of next obs. 
-               obsLen = min(14, len(line) - charPos)
-               # read next obs
-               newObs = line[charPos:charPos+obsLen].strip()
-               # If observation missing, set to 0
-               if newObs != '':
-                   newObs = float(newObs)
-               else:
-                   newObs = 0;
-               # Store new obs
-               Obs[sat - removed_sat, obs_num] = newObs 
-                
-               if readLLI:
-               # read LLI of current obs (if present)
-                   if charPos+13<len(line): ## endret til < (kun mindre enn) 13.11
-                       newLLI = line[charPos+13] # loss of lock indicator ### endret fra 14 til 13 den 13.11.2022
-                   else:
-                       newLLI = ' '
-                
-                   if newLLI.isspace():
-                       newLLI = -999
-                   else:
-                       newLLI = int(newLLI)
-                    # Store LLI
-                   LLI[sat - removed_sat, obs_num] = newLLI        
-                
-        
-               if readSS:
-                   # read SS of current obs (if present)
-                   if charPos+14<len(line): ## endret til < (kun mindre enn) 13.11
-                       newSS = line[charPos+14] # signal strength endret fra 15 til 14 den 13.11.2022
-                   else:
-                       newSS = ' ';
-                    
-                
-                    # if no SS set to -999
-                   if newSS.isspace():
-                       newSS = -999;
-                   else:
-                       newSS = int(newSS)
+       lines.append(line)
     
-                    #Store SS
-                   SS[sat - removed_sat, obs_num]  = newSS         
-     
+    ## -- Exclude satellites of GNSS systems that are not desired
+    desiredGNSSsystems = list(GNSSsystems.values())
+    lines = [line for line in lines if line[0] in desiredGNSSsystems]
+    removed_sat = numSV - len(lines)
+    numSV = numSV - removed_sat
+    SVlist = [line[0:3].strip() for line in lines] # Satellite code, ex. 'G11' or 'E03'
     
+    # Initialize variables
+    Obs = np.zeros([numSV, max_n_obs_Types]) 
+    if readLLI:
+       LLI = np.zeros([numSV, max_n_obs_Types], dtype=np.int8) 
+    if readSS:
+       SS  = np.zeros([numSV, max_n_obs_Types], dtype=np.int8) 
+    
+    if numSV == 0:
+        return success, Obs,SVlist, numSV, LLI, SS, eof
+    
+    ## -- Pad lines to fixed width and make byte matrix [numSV x lineWidth]
+    max_obsIndex = max([max(obsCodeIndex[i]) for i in obsCodeIndex if len(obsCodeIndex[i]) > 0] + [0])
+    lineWidth = 4 + (max_obsIndex + 1)*16
+    block = ''.join([line[:lineWidth].ljust(lineWidth) for line in lines]).encode('latin-1', errors='replace')
+    block = np.frombuffer(block, dtype=np.uint8).reshape(numSV, lineWidth)
+    
+    sys_codes = block[:,0]
+    for GNSSsystemIndex in GNSSsystems:
+        ## -- Rows of current GNSS system in block
+        sat_rows = np.nonzero(sys_codes == ord(GNSSsystems[GNSSsystemIndex]))[0]
+        n_obs_current_system = nObsCodes[GNSSsystemIndex-1]
+        if len(sat_rows) == 0 or n_obs_current_system == 0:
+            continue
+        charPos = 4 + np.array(obsCodeIndex[GNSSsystemIndex][0:n_obs_current_system])*16
+        
+        ## -- Observations: 14 characters from charPos. If observation missing, set to 0
+        obs_chars = block[sat_rows[:,None,None], charPos[None,:,None] + np.arange(14)[None,None,:]]
+        obs_missing = np.all(obs_chars == ord(' '), axis=2)
+        obs_strings = np.ascontiguousarray(obs_chars).view('S14')[:,:,0]
+        newObs = np.zeros([len(sat_rows), n_obs_current_system])
+        newObs[~obs_missing] = obs_strings[~obs_missing].astype(float)
+        Obs[sat_rows, 0:n_obs_current_system] = newObs
+        
+        ## -- LLI is character charPos+13 and SS is character charPos+14. If missing, set to -1
+        if readLLI:
+            LLIcols = np.arange(n_obs_current_system) if LLIcodeIndex is None else np.array(LLIcodeIndex[GNSSsystemIndex], dtype=int)
+            newLLI = block[sat_rows[:,None], charPos[LLIcols][None,:] + 13].astype(np.int8) - ord('0')
+            newLLI[newLLI == ord(' ') - ord('0')] = -1
+            LLI[sat_rows[:,None], LLIcols[None,:]] = newLLI
+        if readSS:
+            newSS = block[sat_rows[:,None], charPos[None,:] + 14].astype(np.int8) - ord('0')
+            newSS[newSS == ord(' ') - ord('0')] = -1
+            SS[sat_rows, 0:n_obs_current_system] = newSS
     
-    ## -- Update number og satellites after satellites have been excluded
-    numSV = numSV - removed_sat
-    ## --Remove empty arrays
-    SVlist = list(filter(None,SVlist))
-    idx_keep = len(Obs) -1 -removed_sat + 1 # removing sats
-    Obs = Obs[:idx_keep,:]
     return success, Obs,SVlist, numSV, LLI, SS, eof
 
 
@@ -1650,7 +1762,7 @@ def rinexReadObsBlockHead304(fid):
         print(msg)
         for count in np.arange(0,linejump+1):
             line = fid.readline().rstrip()
-        epochflag = int(line[30])
+        epochflag = int(line[31])
            
     # Gets the number of used satellites in obs epoch
     numSV = int(line[32:35])      
@@ -1677,7 +1789,7 @@ def rinexReadObsBlockHead304(fid):
 # ------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=None,includeAllObsCodes=None, \
-                    desiredGNSSsystems=None, desiredObsCodes=None, desiredObsBands=None):
+                    desiredGNSSsystems=None, desiredObsCodes=None, desiredObsBands=None, denseObs=None, useMmap=None):
     """
     Program/function to read GNSS observations in RINEX V.2 observation files
     The main core of the program is 4 functions:
@@ -1700,7 +1812,10 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
     INPUTS 
     
     filename:                 path and name of RINEX V.2 observation file,
-                              string
+                              string, or content of the file in memory, see 
+                              readRinexObs304. Compact RINEX (Hatanaka) files are 
+                              decoded one epoch at a time, see 
+                              rinexObsHatanaka.py. useMmap is then not used
     
     readSS:                   Boolean, 0 or 1. 
                               1 = read "Signal Strength" Indicators
@@ -1724,39 +1839,65 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
                               OBS: Must be string array, NOT char vector
     
     desiredObsTypes:          array of strings containing desired ObsTypes to be
-                              included, ex. ["C", "L", "S", "D"]
+                              included, ex. ["C", "L", "S", "D"]. P codes are
+                              included with "C"
                               OBS: Must be string array, NOT char vector
     
     desiredObsBands:          array of desired obs Bands to be included,
                               ex [1, 5]
+    
+    denseObs:                 Boolean, 0 or 1.
+                              1 = return GNSS_obs, GNSS_LLI and GNSS_SS as one 
+                                  3D array per GNSS system
+                              0 = return GNSS_obs, GNSS_LLI and GNSS_SS as a dict
+                                  of epoch matrices per GNSS system (default)
+    
+    useMmap:                  Boolean, 0 or 1.
+                              1 = decode the observation blocks directly from 
+                                  the memory mapped file, including wrapped 
+                                  satellite lists and observation lines, see 
+                                  rinexReadObsBlocksMmap211. Recommended for 
+                                  large files.
+                              0 = read the observation blocks line by line (default)
     --------------------------------------------------------------------------------------------------------------------------
     OUTPUTS
     
-    GNSS_obs:                 cell containing a matrix for each GNSS system.
-                              Each matrix is a 3D matrix containing all 
-                              observation of current GNSS system for all epochs. 
+    GNSS_obs:                 dict containing observations for each GNSS system.
                               Order of obsType index is same order as in 
-                              obsCodes cell
-    
-                              GNSS_obs{GNSSsystemIndex}(PRN, obsType, epoch)
-                                              GNSSsystemIndex: double,
-                                              1,2,...,numGNSSsystems
-                                              PRN: double
-                                              ObsType: double: 1,2,...,numObsTypes
-                                              epoch: double
-    
-    GNSS_LLI:                 cell containing a matrix for each GNSS system
-                              Each matrix stores loss of lock indicators for
-                              each epoch for that GNSS system
-    
-    GNSS_SS:                  cell containing a matrix for each GNSS system
-                              Each matrix stores signal strength indicators 
-                              for each epoch for that GNSS system
+                              obsCodes dict.
+                              
+                              denseObs = 1: one 3D array [nepochs, nSats+1, numObsTypes]
+                              per GNSS system, with one column for each of 
+                              the nSats satellites with observations, in 
+                              order of PRN. Column 0 is unused. The column of
+                              each PRN is given by getPRN2ColumnMap(GNSS_SVs[GNSSsystem])
+                              GNSS_obs[GNSSsystem][epoch, col, obsType]
+                                              GNSSsystem: str, ex. 'G'
+                                              epoch: int: 0,1,...,nepochs-1
+                                              col: int: PRN2col[PRN]
+                                              ObsType: int: 0,1,...,numObsTypes-1
+                              
+                              denseObs = 0: dict of 2D arrays [max_sat+1, numObsTypes],
+                              one for each epoch. Row 0 is unused
+                              GNSS_obs[GNSSsystem][epoch][PRN, obsType]
+                                              epoch: int: 1,2,...,nepochs
+    
+    GNSS_LLI:                 dict containing loss of lock indicators for each 
+                              GNSS system. Same layout as GNSS_obs. np.nan if 
+                              readLLI = 0 and denseObs = 1. Stored as int8, 
+                              with -1 where the indicator is blank and 0 where 
+                              there is no observation
+    
+    GNSS_SS:                  dict containing signal strength indicators for 
+                              each GNSS system. Same layout as GNSS_obs. np.nan if 
+                              readSS = 0 and denseObs = 1. Stored as int8, 
+                              with -1 where the indicator is blank and 0 where 
+                              there is no observation
     
     GNSS_SVs:                 cell containing a matrix for each GNSS system.
                               Each matrix contains number of satellites with 
                               obsevations for each epoch, and PRN for those 
-                              satellites
+                              satellites. denseObs = 0: [nepochs, max_sat+1]
     
                               GNSS_SVs{GNSSsystemIndex}(epoch, j)  
                                               j=1: number of observed satellites
@@ -1787,7 +1928,9 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
                               observation file header. [X, Y, Z]
     
     max_sat:                  array conataining max PRN number for each GNSS
-                              system. Follows same order as GNSSsystems
+                              system, ie. max PRN of the constellation, or the
+                              highest PRN with observations if that is higher.
+                              Follows same order as GNSSsystems
     
     tInterval:                observations interval; seconds. 
     
@@ -1930,6 +2073,13 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
         desiredObsCodes = ['C','L','S','D']       
     if desiredObsBands is None:
         desiredObsBands = list(np.arange(1,10))
+    if denseObs is None:
+        denseObs = 0
+    if useMmap is None:
+        useMmap = 0
+    
+    ## -- Content of file-like objects is read into memory
+    filename = readRinexSource(filename)
     
     ## Get the start time
     t = time.process_time()
@@ -1962,18 +2112,6 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
     
     ### --- Dict for storing data
     GNSS_obs = {}
-    GPS = {} 
-    GLONASS = {}
-    Galileo = {}
-    BeiDou = {}
-    GPS_LLI = {} 
-    GLONASS_LLI = {}
-    Galileo_LLI = {}
-    BeiDou_LLI = {}
-    GPS_SS = {} 
-    GLONASS_SS = {}
-    Galileo_SS = {}
-    BeiDou_SS = {}
      
     ## -- Test if readSS is boolean
     if readSS!=1 and readSS!=0:
@@ -1988,22 +2126,44 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
         success = 0
         return
     
-    max_GPS_PRN     = 36 # Max number of GPS PRN in constellation
-    max_GLONASS_PRN = 36 # Max number of GLONASS PRN in constellation
-    max_Galileo_PRN = 36 # Max number of Galileo PRN in constellation
-    max_Beidou_PRN  = 60 # Max number of BeiDou PRN in constellation
+    ## -- Test if denseObs is boolean
+    if denseObs!=1 and denseObs!=0:
+        print('INPUT ERROR(readRinexObs211): The input argument denseObs must be either 1 or 0')
+        success = 0
+        return
+    
+    ## -- Test if useMmap is boolean
+    if useMmap!=1 and useMmap!=0:
+        print('INPUT ERROR(readRinexObs211): The input argument useMmap must be either 1 or 0')
+        success = 0
+        return
     
     ## -- Read header of observation file
     [success, rinexVersion, gnssType, markerName, recType, antDelta,\
     GNSSsystems,numOfObsCodes, obsCodes, obsCodeIndex,tFirstObs, tLastObs, tInterval, \
-    timeSystem, _, clockOffsetsON, rinexProgr, rinexDate,leapSec, approxPosition, GLO_Slot2ChannelMap, _, fid] = \
+    timeSystem, _, clockOffsetsON, rinexProgr, rinexDate,leapSec, approxPosition, GLO_Slot2ChannelMap, _, fid, nObsTypes] = \
     rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCodes,desiredGNSSsystems, desiredObsCodes, desiredObsBands)
     
     if success==0:
         return
     
+    ## -- Number of lines with observations of each satellite
+    nObsLines = max(int(np.ceil(nObsTypes/5)), 1)
+    
     ## -- Compute number of epochs with observations
-    nepochs, tLastObs, tInterval, success = rinexFindNEpochs211(filename, tFirstObs, tLastObs, tInterval) #computes number of epochs in observation file
+    tLastObs_in_header = not np.all(np.isnan(tLastObs))
+    tInterval_in_header = not np.isnan(tInterval)
+    compactRinex = isCompactRinex(filename)
+    if useMmap or compactRinex:
+        ## -- Number of epochs to allocate for. The buffers are grown while decoding
+        ## -- if the file contains more epochs
+        if tLastObs_in_header and tInterval_in_header and tInterval > 0:
+            nepochs = int(np.floor(time_difference(tFirstObs[:,0], tLastObs[:,0])/tInterval)) + 1
+            nepochs = max(nepochs, 1)
+        else:
+            nepochs = 1024
+    else:
+        nepochs, tLastObs, tInterval, success = rinexFindNEpochs211(filename, tFirstObs, tLastObs, tInterval) #computes number of epochs in observation file
     
     if success==0:
         return    
@@ -2014,34 +2174,26 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
     ## Declare data cells, arrays and matrices
     GNSS_SVs = {}
     max_sat  =  np.zeros([nGNSSsystems,1])
-    t_week = []
-    t_tow = []
+    epoch_dates = np.zeros([nepochs,6]) # time stamp of each epoch
     
     GNSSsystems_full_names =  [""]*nGNSSsystems
     ##  -- Making dict for storin LLI and SS
     GNSS_LLI = {}
     GNSS_SS = {}
+    PRN2col = {} # PRN-to-column map of each GNSS system
 
 
-    ## -- Create array for max_sat. Initialize cell elements in cell arrays
+    ## -- Initialize cell elements in cell arrays
     for k in np.arange(0,nGNSSsystems):
        if GNSSsystems[k+1] == 'G':
-           max_sat[k] = max_GPS_PRN
-           GNSS_SVs['G'] = np.zeros([nepochs,int(max_sat[k] + 1)])
            GNSSsystems_full_names[k] = "GPS"
        elif GNSSsystems[k+1] == 'R':
-           max_sat[k] = max_GLONASS_PRN
-           GNSS_SVs['R'] = np.zeros([nepochs,int(max_sat[k] + 1)])
            GNSSsystems_full_names[k] = "GLONASS"
         
        elif GNSSsystems[k+1] == 'E':
-           max_sat[k] = max_Galileo_PRN
-           GNSS_SVs['E'] = np.zeros([nepochs,int(max_sat[k]) + 1])
            GNSSsystems_full_names[k] = "Galileo"
     
        elif GNSSsystems[k+1] == 'C':
-           max_sat[k] = max_Beidou_PRN
-           GNSS_SVs['C'] = np.zeros([nepochs,int(max_sat[k]) + 1])
            GNSSsystems_full_names[k] = "BeiDou"
        else:
            print('ERROR(readRinexObs211): Only following GNSS systems are compatible with this program: GPS, GLONASS, Galileo, Beidou. %s is not valid' % GNSSsystems[k])
@@ -2049,16 +2201,20 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
            
        
        curr_sys = GNSSsystems[k+1]
-       GNSS_obs[curr_sys] = np.zeros([int(max_sat[k]), numOfObsCodes[k], nepochs])
+       ## -- Preallocate [epoch, satellite column, obsType] arrays. Satellites are given
+       ## -- columns as they are found, and the arrays are grown. Column 0 is unused
+       PRN2col[curr_sys] = newPRN2ColumnMap()
+       GNSS_SVs[curr_sys] = np.zeros([nepochs, 1])
+       GNSS_obs[curr_sys] = np.zeros([nepochs, 1, numOfObsCodes[k]])
        
        # Preallocation LLI and SS
        if readLLI:
-           GNSS_LLI[curr_sys] = np.zeros([nGNSSsystems,1])
+           GNSS_LLI[curr_sys] = np.zeros([nepochs, 1, numOfObsCodes[k]], dtype=np.int8)
        else:
            GNSS_LLI[curr_sys] = np.nan
            
        if readSS:
-           GNSS_SS[curr_sys] = np.zeros([nGNSSsystems,1])
+           GNSS_SS[curr_sys] = np.zeros([nepochs, 1, numOfObsCodes[k]], dtype=np.int8)
        else:
            GNSS_SS[curr_sys] = np.nan;
     
@@ -2071,7 +2227,22 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
     bar_format = '{desc}: {percentage:3.0f}%|{bar}| ({n_fmt}/{total_fmt})'
 
     with tqdm(total=100,desc ="Rinex observations are being read" , position=0, leave=True, bar_format=bar_format) as pbar:
-        while 1:
+        if compactRinex:
+            ## -- Decode differenced observation blocks of compact RINEX file epoch by epoch
+            fid.close()
+            success, current_epoch, epoch_dates = rinexReadObsBlocksHatanaka(filename, None, None, GNSSsystems, numOfObsCodes, \
+                                                    obsCodeIndex, readSS, readLLI, GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col)
+            nepochs = current_epoch
+            pbar.update(100)
+        elif useMmap:
+            ## -- Decode all observation blocks from memory mapped file
+            fid.close()
+            success, current_epoch, epoch_dates = rinexReadObsBlocksMmap211(filename, GNSSsystems, numOfObsCodes, obsCodeIndex, \
+                                                    readSS, readLLI, GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col)
+            nepochs = current_epoch
+            pbar.update(100)
+        
+        while not compactRinex and not useMmap:
            ## Read Obs Block Header
            success, _, _, date, numSV,SVlist_, eof = rinexReadObsBlockHead211(fid)
            
@@ -2079,7 +2250,7 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
               break          
         
            ## -- Read current block of observations
-           success, Obs,SVlist, numSV, LLI, SS, eof = rinexReadObsBlock211(fid, numSV, numOfObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI, SVlist_)
+           success, Obs,SVlist, numSV, LLI, SS, eof = rinexReadObsBlock211(fid, numSV, numOfObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI, SVlist_, nObsLines)
         
            if success ==0 or eof==1:
               break
@@ -2092,28 +2263,13 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
 
                 
         
-           ## Convert date to GPS-week and "time-of-week"
+           ## -- Store time stamp of current epoch. Converted to GPS-week and "time-of-week" after reading
            date[0] = float(str(tFirstObs[0][0])[0:2] + str(int(date[0])))  # change from 20 to 2020 to get tow, week correct
-           week, tow = date2gpstime(int(date[0]), int(date[1]), int(date[2]), int(date[3]), int(date[4]), int(date[5]))
-          
-           ## Store GPS-week and "time-of-week" of current epoch
-           t_week.append(week)
-           t_tow.append(tow)
-           time_epochs = np.column_stack((t_week,t_tow))
+           epoch_dates[current_epoch-1, :] = date[0:6]
            
            ## Number of satellites with observations in this epoch, for each GNSS system
            nGNSS_sat_current_epoch = np.zeros([nGNSSsystems,1])
           
-           ## Initialize dummy variables
-           GNSS_obs_dum = {}
-           GNSS_LLI_dum = {}
-           GNSS_SS_dum  = {}
-           for k in np.arange(0,nGNSSsystems):
-               ## -- Initialize arrays of dummy variables
-               GNSS_obs_dum[k+1] = np.zeros([int(max_sat[k]) +1, numOfObsCodes[k]]) # added +1 12.11.2022 to get PRN36 sats
-               GNSS_LLI_dum[k+1] = np.zeros([int(max_sat[k]) +1, numOfObsCodes[k]])  # added +1 12.11.2022 to get PRN36 sats
-               GNSS_SS_dum[k+1]  = np.zeros([int(max_sat[k]) +1, numOfObsCodes[k]]) # added +1 12.11.2022 to get PRN36 sats
-        
            ## -- Iterate through satellites of epoch and store obs, LLI and SS
            for sat in np.arange(0,numSV):
                ## -- Get index of current GNSS system             
@@ -2129,14 +2285,18 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
                # Number of obs types for current satellite
                nObsTypes_current_sat = numOfObsCodes[GNSSsystemIndex-1]
               
+               ## -- Column of current satellite. Arrays are grown if it is a new satellite
+               col = assignPRNColumns(PRN2col[curr_sys], [SV])[0]
+               growSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, max(PRN2col[curr_sys].max(), int(nGNSS_sat_current_epoch[GNSSsystemIndex-1])) + 1, readLLI, readSS)
+              
                ## -- Store observations, LLI, and SS of current satellite this epoch        
-               GNSS_obs_dum[GNSSsystemIndex][SV][0:nObsTypes_current_sat] = Obs[sat,0:nObsTypes_current_sat] # removed -1 due to lack of C5X obs
+               GNSS_obs[curr_sys][current_epoch-1, col, 0:nObsTypes_current_sat] = Obs[sat,0:nObsTypes_current_sat] # removed -1 due to lack of C5X obs
         
               
                if readLLI:
-                  GNSS_LLI_dum[GNSSsystemIndex][SV][0:nObsTypes_current_sat] = LLI[sat, 0:nObsTypes_current_sat] # fjernet "-1" 13.11.2022 siste koloonnen ble ikke med pga -1
+                  GNSS_LLI[curr_sys][current_epoch-1, col, 0:nObsTypes_current_sat] = LLI[sat, 0:nObsTypes_current_sat] # fjernet "-1" 13.11.2022 siste koloonnen ble ikke med pga -1
                if readSS:
-                  GNSS_SS_dum[GNSSsystemIndex][SV][0:nObsTypes_current_sat] = SS[sat, 0:nObsTypes_current_sat] # fjernet "-1" 13.11.2022
+                  GNSS_SS[curr_sys][current_epoch-1, col, 0:nObsTypes_current_sat] = SS[sat, 0:nObsTypes_current_sat] # fjernet "-1" 13.11.2022
               
         
                ## -- Store PRN number of current sat to PRNs of this epoch
@@ -2149,58 +2309,34 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
                ## --Set number of satellites with obs for each GNSS system this epoch
                GNSS_SVs[curr_sys][current_epoch-1, 0]  = nGNSS_sat_current_epoch[k]
 
-               if curr_sys == 'G':
-                   GPS[current_epoch] = GNSS_obs_dum[k+1]
-               elif curr_sys == 'R':
-                   GLONASS[current_epoch] = GNSS_obs_dum[k+1]
-               elif curr_sys == 'E':
-                   Galileo[current_epoch] = GNSS_obs_dum[k+1]
-                   Galileo_LLI[current_epoch]  =GNSS_LLI_dum[k+1]
-               elif curr_sys == 'C':
-                   BeiDou[current_epoch] = GNSS_obs_dum[k+1]
-                   BeiDou_LLI[current_epoch]  =GNSS_LLI_dum[k+1]
-                   
-               
-               if readLLI and curr_sys == 'G':
-                   GPS_LLI[current_epoch]  =GNSS_LLI_dum[k+1]
-               elif readLLI and curr_sys == 'R':
-                   GLONASS_LLI[current_epoch] = GNSS_LLI_dum[k+1]
-               elif readLLI and curr_sys == 'E':
-                   Galileo_LLI[current_epoch]  = GNSS_LLI_dum[k+1]                   
-               elif readLLI and curr_sys == 'C':
-                   BeiDou_LLI[current_epoch]  = GNSS_LLI_dum[k+1] 
-               
-               if readSS and curr_sys =='G':
-                   GPS_SS[current_epoch] = GNSS_SS_dum[k+1]
-               elif readSS and curr_sys =='R':
-                   GLONASS_SS[current_epoch] = GNSS_SS_dum[k+1]
-               elif readSS and curr_sys =='E':
-                   Galileo_SS[current_epoch] = GNSS_SS_dum[k+1]
-               elif readSS and curr_sys =='C':
-                   BeiDou_SS[current_epoch]  = GNSS_SS_dum[k+1]                      
-
-         
+        ## -- Order satellite columns by PRN. max_sat is max PRN of the constellation, or the highest PRN with observations
+        for k in np.arange(0,nGNSSsystems):
+            curr_sys = GNSSsystems[k+1]
+            PRNs = sortSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, PRN2col[curr_sys], nepochs, readLLI, readSS)
+            max_sat[k] = getMaxSat(curr_sys, PRNs)
     
-        ## -- Storing observation in dictionary       
-        GNSS_obs['G'] = GPS 
-        GNSS_obs['R'] = GLONASS
-        GNSS_obs['E'] = Galileo
-        GNSS_obs['C'] = BeiDou
-        ## -- Storing "loss of lock indicaors"  in dict
-        GNSS_LLI['G'] = GPS_LLI
-        GNSS_LLI['R'] = GLONASS_LLI
-        GNSS_LLI['E'] = Galileo_LLI
-        GNSS_LLI['C'] = BeiDou_LLI
-        ## -- Storing  SS in dict
-        GNSS_SS['G'] = GPS_SS
-        GNSS_SS['R'] = GLONASS_SS
-        GNSS_SS['E'] = Galileo_SS
-        GNSS_SS['C'] = BeiDou_SS
+        ## -- Convert time stamps of all epochs to GPS-week and "time-of-week". Seconds are truncated to integers
+        if current_epoch > 0:
+            t_week, t_tow = dates2gpstime(np.column_stack((epoch_dates[0:current_epoch,0:5], np.fix(epoch_dates[0:current_epoch,5]))))
+            time_epochs = np.column_stack((t_week,t_tow))
         
-        del_sys = list(GNSS_obs.keys())
-        for sys in del_sys: # Deleting systems with no observations
-            if not GNSS_obs[sys]:
-                del GNSS_obs[sys]
+        if useMmap or compactRinex:
+            ## -- Find observation interval from the two first epochs if not in header
+            if current_epoch > 1 and not tInterval_in_header:
+                t_week, t_tow = dates2gpstime(epoch_dates[0:2])
+                tInterval = (t_week[1] - t_week[0])*604800 + t_tow[1] - t_tow[0]
+            ## -- Set TIME OF LAST OBS from last epoch read if not in header. TIME OF LAST OBS is int, as
+            ## -- returned by rinexFindNEpochs211
+            if tLastObs_in_header:
+                tLastObs = tLastObs.astype(int)
+            elif current_epoch > 0:
+                tLastObs = epoch_dates[current_epoch-1].reshape(6,1).astype(int)
+                print('INFO(readRinexObs211): The header of the rinex observation file does not contain TIME OF LAST OBS.\n' \
+                    'It has been set to the time of the last epoch read')
+    
+        if not denseObs:
+            ## -- Storing observations, LLI and SS in dicts with one matrix per epoch
+            GNSS_obs, GNSS_LLI, GNSS_SS = denseObs2EpochDicts(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, current_epoch, readLLI, readSS)
         
         if current_epoch!= nepochs and success == 1:
             print('ERROR(readRinexObs211): The amount of epochs calculated in advance(nepochs = %d) does not equal number og epochs prossesed(current_epoch = %d).\nCheck that header information concerning TIME OF FIRST OBS and TIME OF LAST OBS is correct.\n' %(nepochs, current_epoch))
@@ -2266,7 +2402,8 @@ def rinexFindNEpochs211(filename, tFirstObs, tLastObs, tInterval):
     --------------------------------------------------------------------------------------------------------------------------
     INPUTS
    
-    filename:         RINEX observation filename
+    filename:         RINEX observation filename, or content of the file
+                      in memory, see readRinexSource in rinexCompression.py
    
     tFirstObs:        time stamp of the first observation record in the RINEX
                       observations file; column vector 
@@ -2317,13 +2454,14 @@ def rinexFindNEpochs211(filename, tFirstObs, tLastObs, tInterval):
     nepochs = 0
     
     ## --Test if filename is valid format
-    if type(filename) is not str:
+    filename = readRinexSource(filename)
+    if type(filename) is not str and not isRinexBuffer(filename):
         raise TypeError('INPUT ERROR(rinexFindNEpoch): The input argument filename'\
-            'is of type %s. Must be of type string' % type(filename))
+            'is of type %s. Must be of type string, bytes or a file-like object' % type(filename))
           
   
     ## --Open observation file
-    fid = open(filename, 'rt')
+    fid = openRinexFile(filename, 'rt')
     seconds_in_a_week = 604800
     #  tLastObs is in header
     if ~np.all(np.isnan(tLastObs)):  # endret 07.12.2022 
@@ -2349,7 +2487,8 @@ def rinexFindNEpochs211(filename, tFirstObs, tLastObs, tInterval):
                         tInterval_found = 1
        
         # fid.close(); fid = open(filename, 'rt')
-        file = open(filename, 'rt')
+        fid.seek(0)
+        file = fid
         tFirstObs = tFirstObs.astype(int) 
         tLastObs = tLastObs.astype(int) 
         rinex_lines = file.readlines()
@@ -2387,7 +2526,8 @@ def rinexFindNEpochs211(filename, tFirstObs, tLastObs, tInterval):
             
         # nepochs = time_difference(tFirstObs, tLastObs)/tInterval
         # fid.close(); fid = open(filename, 'rt')
-        file = open(filename, 'rt')
+        fid.seek(0)
+        file = fid
         rinex_lines = file.readlines()
         idx_start = [i for i, line in enumerate(rinex_lines) if line.strip() == "END OF HEADER"][0]
         rinex_lines = rinex_lines[idx_start::]
@@ -2403,28 +2543,18 @@ def find_match_in_file(file_path, pattern):
     """
     Function that reads in a file backwards and looks for pattern from the
     bottom and up. Is used for finding tLastObs when not defined in header.
-    Uses binary mode to save processing time. 
+    Uses a memory mapped buffer to save processing time. 
     """
-    with open(file_path, "rb") as f:
-        # Go to the end of the file
-        f.seek(0, 2)
-        file_size = f.tell()
-        # Read the file backwards
-        while file_size > 0:
-            # Read a chunk of the file
-            chunk_size = min(1024, file_size)
-            f.seek(file_size - chunk_size)
-            chunk = f.read(chunk_size)
-            # Split the chunk into lines
-            lines = chunk.split(b"\n")
-            # Process the lines in reverse order
-            for line in reversed(lines):
-                line = line.decode("utf-8").rstrip()
-                match = re.match(pattern, line)
-                if match:
-                    return match.groups()
-            # Repeat until the entire file has been processed
-            file_size -= chunk_size
+    with rinexFileBuffer(file_path) as mm:
+        # Read the lines of the file backwards
+        line_end = len(mm)
+        while line_end >= 0:
+            line_start = mm.rfind(b"\n", 0, line_end) + 1
+            line = mm[line_start:line_end].decode("utf-8").rstrip()
+            match = re.match(pattern, line)
+            if match:
+                return match.groups()
+            line_end = line_start - 1
     # No match was found
     return None
 
@@ -2435,7 +2565,7 @@ def find_first_two_epochs(file_path, pattern):
     Function that extracts the two first epochs for
     RINEX obs file to compute tInterval when not defined.
     """
-    with open(file_path, 'r') as file:
+    with openRinexFile(file_path, 'r') as file:
         found_header = False
         count = 0
         matches = []
@@ -2457,7 +2587,7 @@ def find_first_two_epochs(file_path, pattern):
 
 
 def find_nepochs(file_path, pattern):
-    with open(file_path, 'r') as file:
+    with openRinexFile(file_path, 'r') as file:
         contents = file.read()
         return len(re.findall(pattern, contents))
     
@@ -2479,7 +2609,9 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
     INPUTS:
     ------
     
-    filename:                     RINEX observation filename and path
+    filename:                     RINEX observation filename and path, or
+                                  content of the file in memory, see 
+                                  readRinexSource in rinexCompression.py
 
     includeAllGNSSsystems:        Boolean, 0 or 1. 
                                       1 = include alle GNSS systems
@@ -2596,6 +2728,11 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
 
     fid:                          Matlab file identifier of a Rinex 
                                   observations text file
+
+    nObsTypes:                    total number of observation types in file,
+                                  including the undesired ones. Gives the 
+                                  number of lines with observations of each
+                                  satellite
     --------------------------------------------------------------------------------------------------------------------------
     
     According to RINEX V.2 these codes are:
@@ -2682,24 +2819,34 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
     rinexVersion = np.nan                  
     recType = np.nan                       
     GLO_Slot2ChannelMap = np.nan       
+    obsCode_list = []                   
+    desiredObsCodeIndex = []            
+    nObsTypes = 0                       
+    prnObsSystems = []                  
      
     ## -------Testing input arguments  
     # Test if filename is valid format
-    if type(filename) != str:
-        print('INPUT ERROR(rinexReadsObsHeader211): The input argument filename is of type %s.\n Must be of type string or char' %(type(filename)))
+    filename = readRinexSource(filename)
+    if type(filename) != str and not isRinexBuffer(filename):
+        print('INPUT ERROR(rinexReadsObsHeader211): The input argument filename is of type %s.\n Must be of type string, bytes or a file-like object' %(type(filename)))
         success = 0
         fid     = 0
         return success
      
 
     ## -- Open rinex observation file
-    fid = open(filename,'r') 
-    if os.stat(filename).st_size == 0:
+    fid = openRinexFile(filename,'r') 
+    if getRinexSourceSize(filename) == 0:
         raise ValueError('ERROR: This file seems to be empty')
          
     while 1: # Gobbling the header
         numHeaderLines = numHeaderLines + 1;
         line = fid.readline().rstrip()
+        
+        ## -- Compact RINEX files start with two lines of their own
+        if numHeaderLines == 1 and 'CRINEX VERS' in line:
+            fid.readline()
+            line = fid.readline().rstrip()
           
         if 'END OF HEADER' in line:
             break
@@ -2732,11 +2879,6 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
             if gnssType == ' ':
                 gnssType = 'G'
             
-            if gnssType == 'M':
-                GNSSsystems[1] = 'G'
-                GNSSsystems[2] = 'R'
-                numGNSSsystems = 2
-                
         if 'PGM / RUN BY / DATE' in line:
             rinexProgr = line[0:20] # rinex program
             rinexDate = line[40:60] # rinex date
@@ -2766,8 +2908,6 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
             nObs = int(line_.pop(0)) # assingning nObs to variable and removing it from the list
             undesiredobsCodeIndex = []
             desiredObsCodeIndex = []               
-            ## is Sys amoung desired GNSS systems            
-            GNSSSystemObsCodes = {}  # Reset cell of obsCodes for this GNSS system
             obsCode_list = []
             for k in np.arange(0,nObs):
                 obsCode = line_.pop(0)
@@ -2779,13 +2919,12 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
                     fid.close()
                     return success
                 
-                ## is obsCode amoung desired obscodes and frequency bands
-                if includeAllObsCodes or obsCode[0] in desiredObsCodes and int(obsCode[1]) in desiredObsBands:
+                ## is obsCode amoung desired obscodes and frequency bands. P codes are 
+                ## pseudoranges, and are included when C codes are desired
+                obsType = 'C' if obsCode[0] == 'P' else obsCode[0]
+                if includeAllObsCodes or (obsCode[0] in desiredObsCodes or obsType in desiredObsCodes) and int(obsCode[1]) in desiredObsBands:
                      ## store obsCode if amoung desire obsCodes
                     obsCode_list.append(obsCode) 
-                    GNSSSystemObsCodes['G'] =  obsCode_list
-                    GNSSSystemObsCodes['R'] =  obsCode_list
-                    
                     desiredObsCodeIndex.append(k)
                 else:
                     # store index of discareded obsCode
@@ -2799,40 +2938,23 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
                 #     line = line[0:60]     # deletes 'SYS / # / OBS TYPES'
                 #     line_ = [el for el in line.split(" ") if el != ""]
                     
-            numOfObsCodes.append(len(GNSSSystemObsCodes['G']))
-            numOfObsCodes.append(len(GNSSSystemObsCodes['R']))
-            obsCodes[1] = GNSSSystemObsCodes
-            obsCodes[2] = GNSSSystemObsCodes
-            # obsCodes[numGNSSsystems] = GNSSSystemObsCodes
-            obsCodeIndex[numGNSSsystems] = desiredObsCodeIndex # Store indices of desired obsCodes
+            ## -- Observation types are the same for all GNSS systems, and are stored for 
+            ## -- each of the systems to read after the header has been read
+            nObsTypes = nObs
  
          
         if 'PRN / # OF OBS' in line:
-            system_list = []
             while 'PRN / # OF OBS' in line:
-                line = line[0:60]     # deletes 'SYS / # / OBS TYPES'
-                line_ = [el for el in line.split(" ") if el != ""]
-                Sys = line_.pop(0)[0] # assingning nObs to variable and removing it from the list
-                if Sys not in ["G","R","E","C"]: # added this line 29.01.2023 to fix bug where Only one system and several lines with Obscodes in rinex file
-                    continue
-                if (includeAllGNSSsystems and Sys in ["G", "R", "E", "C"] or Sys in desiredGNSSsystems):
-                    # numGNSSsystems  = numGNSSsystems + 1 # increment number of GNSS systems
-                    system_list  = [Sys] + [s for s in system_list if s not in [Sys]]
-                    numGNSSsystems  = len(system_list)
-                    
-                    if Sys not in GNSSsystems.values():
-                        GNSSsystems[numGNSSsystems] = str(Sys) # Store current GNSS system
-                    else:
-                        pass
-                    # GNSSsystems[numGNSSsystems] = str(Sys) # Store current GNSS system  
-                    GNSSSystemObsCodes[Sys] =  obsCode_list
-                    numOfObsCodes.append(len(GNSSSystemObsCodes[Sys]))
-                    obsCodes[numGNSSsystems] = GNSSSystemObsCodes
-                    obsCodeIndex[numGNSSsystems] = desiredObsCodeIndex # Store indices of desired obsCodes
-                    GNSSSystemObsCodes[Sys] =  obsCode_list
+                ## -- GNSS system of satellite. Continuation lines have no satellite, 
+                ## -- and blank system identifier is GPS
+                SV = line[3:6]
+                Sys = 'G' if SV[0] == ' ' and SV[1:].strip() != '' else SV[0]
+                if Sys in ["G","R","E","C"] and Sys not in prnObsSystems:
+                    prnObsSystems.append(Sys)
                 numHeaderLines = numHeaderLines + 1;
                 line = fid.readline().rstrip()
-                line_ = [el for el in line.split(" ") if el != ""]
+            if 'END OF HEADER' in line:
+                break
 
         
          
@@ -2975,6 +3097,27 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
            
        
      # End of Gobbling Header Loop   
+    
+    ## -- GNSS systems to read. Mixed files are read as GPS and GLONASS, in 
+    ## -- addition to any other systems listed in PRN / # OF OBS. The observation
+    ## -- types of RINEX 2 are the same for all GNSS systems
+    if gnssType == 'M':
+        fileSystems = ['G', 'R'] + [Sys for Sys in prnObsSystems if Sys not in ['G', 'R']]
+    else:
+        fileSystems = [gnssType]
+    for Sys in fileSystems:
+        if includeAllGNSSsystems and Sys in ["G", "R", "E", "C"] or Sys in desiredGNSSsystems:
+            numGNSSsystems = numGNSSsystems + 1
+            GNSSsystems[numGNSSsystems] = Sys
+            obsCodes[numGNSSsystems] = {Sys: obsCode_list}
+            numOfObsCodes.append(len(obsCode_list))
+            obsCodeIndex[numGNSSsystems] = desiredObsCodeIndex # Store indices of desired obsCodes
+    
+    if numGNSSsystems == 0:
+        print('ERROR(rinexReadObsFileHeader211): None of the desired GNSS systems are in the RINEX observation file')
+        success = 0
+        fid.close()
+    
     for k in np.arange(1,numGNSSsystems+1):    
         # Give info if any of GNSS systems had zero of desired obscodes.
         if numOfObsCodes[k-1] == 0 or sum(tFirstObs) == 0:
@@ -2995,11 +3138,11 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
     
     return success, rinexVersion, gnssType, markerName, recType, antDelta, GNSSsystems, numOfObsCodes, \
     obsCodes, obsCodeIndex,tFirstObs, tLastObs, tInterval,timeSystem, numHeaderLines, clockOffsetsON, \
-    rinexProgr, rinexDate,leapSec, approxPosition, GLO_Slot2ChannelMap, eof, fid
+    rinexProgr, rinexDate,leapSec, approxPosition, GLO_Slot2ChannelMap, eof, fid, nObsTypes
     
 
 
-def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI, SVlist):
+def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI, SVlist, nObsLines=None):
     """
     Reads all the observations from a RINEX observation block.
     
@@ -3041,6 +3184,14 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
     readLLI:                  Boolean, 0 or 1. 
                               1 = read "Loss-Of-Lock Indicators"
                               0 = do not read "Loss-Of-Lock Indicators"
+    
+    SVlist:                   list of the satellites of the block, as read 
+                              by rinexReadObsBlockHead211
+    
+    nObsLines:                number of lines with observations of each 
+                              satellite, ie. total number of observation 
+                              types in file divided by 5, rounded up. 
+                              Default: 2 if nObsCodes > 5, 1 otherwise
     --------------------------------------------------------------------------------------------------------------------------
     OUTPUTS:
     --------    
@@ -3061,6 +3212,7 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
                           identification code of each line of observation 
                           block. ex. "G21". numSV is total number of 
                           satellites minus amount of satellites removed.
+                          Only satellites of GNSSsystems are included
     
     numSV:                numSV, unlike the input of same name, is the total 
                           number of satellites minus amount of satellites 
@@ -3073,7 +3225,7 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
                           types that are associated with what collumn will
                           vary between GNSS systems. SVlist will give
                           overview of what GNSS system each row is connected
-                          to
+                          to. int8, -1 if indicator is blank
     
     SS:                   matrix [numSV x max_nObs] that stores all 
                           "signal strength" indicators of this observation block. 
@@ -3082,7 +3234,7 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
                           types that are associated with what collumn will
                           vary between GNSS systems. SVlist will give
                           overview of what GNSS system each row is connected
-                          to
+                          to. int8, -1 if indicator is blank
     
     eof:                  end-of-file flag; 1 if end-of-file was reached, 
                           0 otherwise
@@ -3119,19 +3271,15 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
     max_n_obs_Types = nObsCodes
     # Initialize variables
     Obs = np.empty([numSV, max_n_obs_Types]) 
-    if nObsCodes > 5:
-        factor = 2
-        nLines = factor*numSV
-    else:
-        factor = 1
-        nLines = factor*numSV
+    if nObsLines is None:
+        nObsLines = 2 if nObsCodes > 5 else 1
         
     # SVlist = [np.nan]*numSV
     if readLLI:
-       LLI = np.empty([numSV, max_n_obs_Types]) 
+       LLI = np.empty([numSV, max_n_obs_Types], dtype=np.int8) 
     
     if readSS:
-       SS  = np.empty([numSV, max_n_obs_Types]) 
+       SS  = np.empty([numSV, max_n_obs_Types], dtype=np.int8) 
                   
     # number of satellites excluded so far
     removed_sat = 0                                 
@@ -3152,9 +3300,6 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
             pattern3 = re.compile(r'[A-Z][0-9]{2}')
             sat_list = re.findall(pattern3, sat_overview)
             for s in sat_list:
-                sys = s[0]
-                if sys not in desiredGNSSsystems:
-                    continue
                 # PRN = s[1::]
                 # SVlist[sys].append(PRN)
                 SVlist.append(s)
@@ -3167,21 +3312,22 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
         #     pass
         # SV = line[0:3].strip() # Satellite code, ex. 'G11' or 'E03'
         SV = SVlist[sat]
+        ## -- Observation lines of current satellite. Observation type obsIndex
+        ## -- is on line obsIndex//5
+        sat_lines = [line] + [fid.readline().rstrip() for _ in np.arange(1, nObsLines)]
         if SV[0] not in desiredGNSSsystems:
+            ## -- Undesired satellites are skipped without decoding their observations
             removed_sat +=1
         else:
             ## Index of current GNSS system
             GNSSsystemIndex = [i for i in GNSSsystems if GNSSsystems[i]==SV[0]][0] 
             n_obs_current_system = nObsCodes
-            nNew_line = 1 # counter to keep track in new line of same satellite
             for obs_num in np.arange(0, n_obs_current_system):
                 # obsIndex = obsCodeIndex[GNSSsystemIndex][obs_num]
                 obsIndex = obsCodeIndex[obs_num]
+                line = sat_lines[obsIndex//5]
                 # charPos = 4+(obsIndex)*16
-                if obsIndex < 5:
-                    charPos = 1+(obsIndex)*16
-                else: 
-                    charPos = 1+(obsIndex-5)*16
+                charPos = 1+(obsIndex % 5)*16
                     
                 ## check that the current observation of the current GNSS system
                 ## is not on the list of obs types to be excluded
@@ -3204,7 +3350,7 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
                     else:
                         newLLI = ' '                
                     if newLLI.isspace():
-                        newLLI = -999
+                        newLLI = -1
                     else:
                         newLLI = int(newLLI)
                      # Store LLI
@@ -3216,29 +3362,20 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
                         newSS = line[charPos+14] # signal strength endret fra 15 til 14 den 13.11.2022
                     else:
                         newSS = ' ';                   
-                    # if no SS set to -999
+                    # if no SS set to -1
                     if newSS.isspace():
-                        newSS = -999;
+                        newSS = -1;
                     else:
                         newSS = int(newSS)
     
                      #Store SS
                     SS[sat - removed_sat, obs_num]  = newSS    
-                    
-                    # if np.mod(obs_num+1, 5) == 0 and nObsCodes > 5 and factor*sat < factor*numSV:
-                    if np.mod(obs_num+1, 5) == 0 and nObsCodes>5 and nNew_line < factor:
-                        nNew_line += 1
-                        line = fid.readline().rstrip()
-                        # pattern5 = r'\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+([\d.]+)\s+(\d+)\s+([A-Z\dG]+)'
-                        # if re.match(pattern5,line):
-                        #     break
-                    # elif factor*sat == factor*numSV:
-                    #     break
     
     ## -- Update number og satellites after satellites have been excluded
     numSV = numSV - removed_sat
     ## --Remove empty arrays
     # SVlist = list(filter(None,SVlist))
+    SVlist = [SV for SV in SVlist if SV[0] in desiredGNSSsystems]
     idx_keep = len(Obs) -1 -removed_sat + 1 # removing sats
     Obs = Obs[:idx_keep,:]
     return success, Obs, SVlist, numSV, LLI, SS, eof
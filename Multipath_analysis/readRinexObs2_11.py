@@ -52,7 +52,8 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
                               OBS: Must be string array, NOT char vector
     
     desiredObsTypes:          array of strings containing desired ObsTypes to be
-                              included, ex. ["C", "L", "S", "D"]
+                              included, ex. ["C", "L", "S", "D"]. P codes are
+                              included with "C"
                               OBS: Must be string array, NOT char vector
     
     desiredObsBands:          array of desired obs Bands to be included,
@@ -324,12 +325,15 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
     ## -- Read header of observation file
     [success, rinexVersion, gnssType, markerName, recType, antDelta,\
     GNSSsystems,numOfObsCodes, obsCodes, obsCodeIndex,tFirstObs, tLastObs, tInterval, \
-    timeSystem, _, clockOffsetsON, rinexProgr, rinexDate,leapSec, approxPosition, GLO_Slot2ChannelMap, _, fid] = \
+    timeSystem, _, clockOffsetsON, rinexProgr, rinexDate,leapSec, approxPosition, GLO_Slot2ChannelMap, _, fid, nObsTypes] = \
     rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCodes,desiredGNSSsystems, desiredObsCodes, desiredObsBands)
 
     if success==0:
         return
     
+    ## -- Number of lines with observations of each satellite
+    nObsLines = max(int(np.ceil(nObsTypes/5)), 1)
+    
     ## -- Compute number of epochs with observations
     nepochs, tLastObs, tInterval, success = rinexFindNEpochs211(filename, tFirstObs, tLastObs, tInterval) #computes number of epochs in observation file
     
@@ -407,7 +411,7 @@ def readRinexObs211(filename, readSS=None, readLLI=None, includeAllGNSSsystems=N
               break          
         
            ## -- Read current block of observations
-           success, Obs,SVlist, numSV, LLI, SS, eof = rinexReadObsBlock211(fid, numSV, numOfObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI, SVlist_)
+           success, Obs,SVlist, numSV, LLI, SS, eof = rinexReadObsBlock211(fid, numSV, numOfObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI, SVlist_, nObsLines)
         
            if success ==0 or eof==1:
               break
@@ -924,6 +928,11 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
 
     fid:                          Matlab file identifier of a Rinex 
                                   observations text file
+
+    nObsTypes:                    total number of observation types in file,
+                                  including the undesired ones. Gives the 
+                                  number of lines with observations of each
+                                  satellite
     --------------------------------------------------------------------------------------------------------------------------
     
     According to RINEX V.2 these codes are:
@@ -1010,6 +1019,10 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
     rinexVersion = np.nan                  
     recType = np.nan                       
     GLO_Slot2ChannelMap = np.nan       
+    obsCode_list = []                   
+    desiredObsCodeIndex = []            
+    nObsTypes = 0                       
+    prnObsSystems = []                  
      
     ## -------Testing input arguments  
     # Test if filename is valid format
@@ -1060,11 +1073,6 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
             if gnssType == ' ':
                 gnssType = 'G'
             
-            if gnssType == 'M':
-                GNSSsystems[1] = 'G'
-                GNSSsystems[2] = 'R'
-                numGNSSsystems = 2
-                
         if 'PGM / RUN BY / DATE' in line:
             rinexProgr = line[0:20] # rinex program
             rinexDate = line[40:60] # rinex date
@@ -1094,8 +1102,6 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
             nObs = int(line_.pop(0)) # assingning nObs to variable and removing it from the list
             undesiredobsCodeIndex = []
             desiredObsCodeIndex = []               
-            ## is Sys amoung desired GNSS systems            
-            GNSSSystemObsCodes = {}  # Reset cell of obsCodes for this GNSS system
             obsCode_list = []
             for k in np.arange(0,nObs):
                 obsCode = line_.pop(0)
@@ -1107,13 +1113,12 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
                     fid.close()
                     return success
                 
-                ## is obsCode amoung desired obscodes and frequency bands
-                if includeAllObsCodes or obsCode[0] in desiredObsCodes and int(obsCode[1]) in desiredObsBands:
+                ## is obsCode amoung desired obscodes and frequency bands. P codes are 
+                ## pseudoranges, and are included when C codes are desired
+                obsType = 'C' if obsCode[0] == 'P' else obsCode[0]
+                if includeAllObsCodes or (obsCode[0] in desiredObsCodes or obsType in desiredObsCodes) and int(obsCode[1]) in desiredObsBands:
                      ## store obsCode if amoung desire obsCodes
                     obsCode_list.append(obsCode) 
-                    GNSSSystemObsCodes['G'] =  obsCode_list
-                    GNSSSystemObsCodes['R'] =  obsCode_list
-                    
                     desiredObsCodeIndex.append(k)
                 else:
                     # store index of discareded obsCode
@@ -1127,40 +1132,23 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
                 #     line = line[0:60]     # deletes 'SYS / # / OBS TYPES'
                 #     line_ = [el for el in line.split(" ") if el != ""]
                     
-            numOfObsCodes.append(len(GNSSSystemObsCodes['G']))
-            numOfObsCodes.append(len(GNSSSystemObsCodes['R']))
-            obsCodes[1] = GNSSSystemObsCodes
-            obsCodes[2] = GNSSSystemObsCodes
-            # obsCodes[numGNSSsystems] = GNSSSystemObsCodes
-            obsCodeIndex[numGNSSsystems] = desiredObsCodeIndex # Store indices of desired obsCodes
+            ## -- Observation types are the same for all GNSS systems, and are stored for 
+            ## -- each of the systems to read after the header has been read
+            nObsTypes = nObs
  
          
         if 'PRN / # OF OBS' in line:
-            system_list = []
             while 'PRN / # OF OBS' in line:
-                line = line[0:60]     # deletes 'SYS / # / OBS TYPES'
-                line_ = [el for el in line.split(" ") if el != ""]
-                Sys = line_.pop(0)[0] # assingning nObs to variable and removing it from the list
-                if Sys not in ["G","R","E","C"]: # added this line 29.01.2023 to fix bug where Only one system and several lines with Obscodes in rinex file
-                    continue
-                if (includeAllGNSSsystems and Sys in ["G", "R", "E", "C"] or Sys in desiredGNSSsystems):
-                    # numGNSSsystems  = numGNSSsystems + 1 # increment number of GNSS systems
-                    system_list  = [Sys] + [s for s in system_list if s not in [Sys]]
-                    numGNSSsystems  = len(system_list)
-                    
-                    if Sys not in GNSSsystems.values():
-                        GNSSsystems[numGNSSsystems] = str(Sys) # Store current GNSS system
-                    else:
-                        pass
-                    # GNSSsystems[numGNSSsystems] = str(Sys) # Store current GNSS system  
-                    GNSSSystemObsCodes[Sys] =  obsCode_list
-                    numOfObsCodes.append(len(GNSSSystemObsCodes[Sys]))
-                    obsCodes[numGNSSsystems] = GNSSSystemObsCodes
-                    obsCodeIndex[numGNSSsystems] = desiredObsCodeIndex # Store indices of desired obsCodes
-                    GNSSSystemObsCodes[Sys] =  obsCode_list
+                ## -- GNSS system of satellite. Continuation lines have no satellite, 
+                ## -- and blank system identifier is GPS
+                SV = line[3:6]
+                Sys = 'G' if SV[0] == ' ' and SV[1:].strip() != '' else SV[0]
+                if Sys in ["G","R","E","C"] and Sys not in prnObsSystems:
+                    prnObsSystems.append(Sys)
                 numHeaderLines = numHeaderLines + 1;
                 line = fid.readline().rstrip()
-                line_ = [el for el in line.split(" ") if el != ""]
+            if 'END OF HEADER' in line:
+                break
 
         
          
@@ -1303,6 +1291,27 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
            
        
      # End of Gobbling Header Loop   
+    
+    ## -- GNSS systems to read. Mixed files are read as GPS and GLONASS, in 
+    ## -- addition to any other systems listed in PRN / # OF OBS. The observation
+    ## -- types of RINEX 2 are the same for all GNSS systems
+    if gnssType == 'M':
+        fileSystems = ['G', 'R'] + [Sys for Sys in prnObsSystems if Sys not in ['G', 'R']]
+    else:
+        fileSystems = [gnssType]
+    for Sys in fileSystems:
+        if includeAllGNSSsystems and Sys in ["G", "R", "E", "C"] or Sys in desiredGNSSsystems:
+            numGNSSsystems = numGNSSsystems + 1
+            GNSSsystems[numGNSSsystems] = Sys
+            obsCodes[numGNSSsystems] = {Sys: obsCode_list}
+            numOfObsCodes.append(len(obsCode_list))
+            obsCodeIndex[numGNSSsystems] = desiredObsCodeIndex # Store indices of desired obsCodes
+    
+    if numGNSSsystems == 0:
+        print('ERROR(rinexReadObsFileHeader211): None of the desired GNSS systems are in the RINEX observation file')
+        success = 0
+        fid.close()
+    
     for k in np.arange(1,numGNSSsystems+1):    
         # Give info if any of GNSS systems had zero of desired obscodes.
         if numOfObsCodes[k-1] == 0 or sum(tFirstObs) == 0:
@@ -1324,11 +1333,11 @@ def rinexReadObsFileHeader211(filename, includeAllGNSSsystems, includeAllObsCode
     
     return success, rinexVersion, gnssType, markerName, recType, antDelta, GNSSsystems, numOfObsCodes, \
     obsCodes, obsCodeIndex,tFirstObs, tLastObs, tInterval,timeSystem, numHeaderLines, clockOffsetsON, \
-    rinexProgr, rinexDate,leapSec, approxPosition, GLO_Slot2ChannelMap, eof, fid
+    rinexProgr, rinexDate,leapSec, approxPosition, GLO_Slot2ChannelMap, eof, fid, nObsTypes
     
 
 
-def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI, SVlist):
+def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI, SVlist, nObsLines=None):
     """
     Reads all the observations from a RINEX observation block.
     
@@ -1370,6 +1379,14 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
     readLLI:                  Boolean, 0 or 1. 
                               1 = read "Loss-Of-Lock Indicators"
                               0 = do not read "Loss-Of-Lock Indicators"
+    
+    SVlist:                   list of the satellites of the block, as read 
+                              by rinexReadObsBlockHead211
+    
+    nObsLines:                number of lines with observations of each 
+                              satellite, ie. total number of observation 
+                              types in file divided by 5, rounded up. 
+                              Default: 2 if nObsCodes > 5, 1 otherwise
     --------------------------------------------------------------------------------------------------------------------------
     OUTPUTS:
     --------    
@@ -1390,6 +1407,7 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
                           identification code of each line of observation 
                           block. ex. "G21". numSV is total number of 
                           satellites minus amount of satellites removed.
+                          Only satellites of GNSSsystems are included
     
     numSV:                numSV, unlike the input of same name, is the total 
                           number of satellites minus amount of satellites 
@@ -1448,12 +1466,8 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
     max_n_obs_Types = nObsCodes
     # Initialize variables
     Obs = np.empty([numSV, max_n_obs_Types]) 
-    if nObsCodes > 5:
-        factor = 2
-        nLines = factor*numSV
-    else:
-        factor = 1
-        nLines = factor*numSV
+    if nObsLines is None:
+        nObsLines = 2 if nObsCodes > 5 else 1
         
     # SVlist = [np.nan]*numSV
     if readLLI:
@@ -1481,9 +1495,6 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
             pattern3 = re.compile(r'[A-Z][0-9]{2}')
             sat_list = re.findall(pattern3, sat_overview)
             for s in sat_list:
-                sys = s[0]
-                if sys not in desiredGNSSsystems:
-                    continue
                 # PRN = s[1::]
                 # SVlist[sys].append(PRN)
                 SVlist.append(s)
@@ -1496,21 +1507,22 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
         #     pass
         # SV = line[0:3].strip() # Satellite code, ex. 'G11' or 'E03'
         SV = SVlist[sat]
+        ## -- Observation lines of current satellite. Observation type obsIndex
+        ## -- is on line obsIndex//5
+        sat_lines = [line] + [fid.readline().rstrip() for _ in np.arange(1, nObsLines)]
         if SV[0] not in desiredGNSSsystems:
+            ## -- Undesired satellites are skipped without decoding their observations
             removed_sat +=1
         else:
             ## Index of current GNSS system
             GNSSsystemIndex = [i for i in GNSSsystems if GNSSsystems[i]==SV[0]][0] 
             n_obs_current_system = nObsCodes
-            nNew_line = 1 # counter to keep track in new line of same satellite
             for obs_num in np.arange(0, n_obs_current_system):
                 # obsIndex = obsCodeIndex[GNSSsystemIndex][obs_num]
                 obsIndex = obsCodeIndex[obs_num]
+                line = sat_lines[obsIndex//5]
                 # charPos = 4+(obsIndex)*16
-                if obsIndex < 5:
-                    charPos = 1+(obsIndex)*16
-                else: 
-                    charPos = 1+(obsIndex-5)*16
+                charPos = 1+(obsIndex % 5)*16
                     
                 ## check that the current observation of the current GNSS system
                 ## is not on the list of obs types to be excluded
@@ -1553,21 +1565,12 @@ def rinexReadObsBlock211(fid, numSV, nObsCodes, GNSSsystems, obsCodeIndex, readS
     
                      #Store SS
                     SS[sat - removed_sat, obs_num]  = newSS    
-                    
-                    # if np.mod(obs_num+1, 5) == 0 and nObsCodes > 5 and factor*sat < factor*numSV:
-                    if np.mod(obs_num+1, 5) == 0 and nObsCodes>5 and nNew_line < factor:
-                        nNew_line += 1
-                        line = fid.readline().rstrip()
-                        # pattern5 = r'\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+([\d.]+)\s+(\d+)\s+([A-Z\dG]+)'
-                        # if re.match(pattern5,line):
-                        #     break
-                    # elif factor*sat == factor*numSV:
-                    #     break
     
     ## -- Update number og satellites after satellites have been excluded
     numSV = numSV - removed_sat
     ## --Remove empty arrays
     # SVlist = list(filter(None,SVlist))
+    SVlist = [SV for SV in SVlist if SV[0] in desiredGNSSsystems]
     idx_keep = len(Obs) -1 -removed_sat + 1 # removing sats
     Obs = Obs[:idx_keep,:]
     return success, Obs, SVlist, numSV, LLI, SS, eof
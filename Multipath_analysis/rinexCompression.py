@@ -0,0 +1,304 @@
+import bz2
+import contextlib
+import gzip
+import io
+import mmap
+import os
+
+## -- Magic bytes at start of compressed files
+COMPRESSION_MAGIC = {b'\x1f\x8b': 'gzip', b'\x1f\x9d': 'compress', b'BZh': 'bzip2'}
+
+
+def isRinexBuffer(source):
+    """
+    Returns True if source is the content of a RINEX file in memory, ie.
+    bytes, bytearray or memoryview, and False if it is a filename.
+    """
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+
+def readRinexSource(source):
+    """
+    Returns a RINEX file source that can be opened more than once by the
+    readers: a filename, or the content of the file in memory. File-like
+    objects, ex. a payload received from a queue or an open file, are read
+    into memory. Text is encoded as latin-1. A memoryview of a whole bytes
+    object is replaced by the bytes object, other memoryviews are copied.
+    Filenames, bytes and bytearrays are returned as they are.
+
+    Ex.
+        GNSS_obs, *_ = readRinexObs(io.BytesIO(payload))
+    """
+    if hasattr(source, 'read'):
+        source = source.read()
+        if isinstance(source, str):
+            source = source.encode('latin-1')
+    if isinstance(source, memoryview):
+        if isinstance(source.obj, bytes) and source.contiguous and source.nbytes == len(source.obj):
+            source = source.obj
+        else:
+            source = source.tobytes()
+    return source
+
+
+def getRinexSourceName(source):
+    """
+    Returns the name of a RINEX file source for messages. The filename, or
+    'in-memory RINEX file' for content in memory.
+    """
+    if isRinexBuffer(source):
+        return 'in-memory RINEX file'
+    return source
+
+
+def getRinexSourceSize(source):
+    """
+    Returns the size in bytes of a RINEX file source, as stored, ie. the
+    compressed size of compressed files.
+    """
+    if isRinexBuffer(source):
+        return len(source)
+    return os.path.getsize(source)
+
+
+def getRinexCompression(filename):
+    """
+    Returns the compression of file filename, found from the magic bytes at
+    the start of the file. 'gzip' (.gz), 'bzip2' (.bz2), 'compress' (.Z, Unix
+    compress) or None if the file is not compressed. The file extension is
+    not used. filename can also be the content of the file in memory.
+    """
+    if isRinexBuffer(filename):
+        magic = bytes(filename[0:3])
+    else:
+        with open(filename, 'rb') as fid:
+            magic = fid.read(3)
+    for prefix, compression in COMPRESSION_MAGIC.items():
+        if magic.startswith(prefix):
+            return compression
+    return None
+
+
+def openRinexFile(filename, mode='r'):
+    """
+    Opens a RINEX file for reading, as open(filename, mode). Compressed files
+    are decompressed as a stream while they are read, with no temporary file.
+    The file objects of compressed files are seekable, but seeking backwards
+    restarts decompression from the start of the file.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename:             path of RINEX file, compressed or not, or the
+                          content of the file in memory, see isRinexBuffer
+
+    mode:                 'r' or 'rt' for text, 'rb' for bytes. Default 'r'
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    fid:                  file object
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    if mode not in ['r', 'rt', 'rb']:
+        raise ValueError('ERROR(openRinexFile): mode must be r, rt or rb, not %s' % mode)
+    compression = getRinexCompression(filename)
+    if isRinexBuffer(filename):
+        ## -- Content in memory is read as an in-memory file
+        filename = io.BytesIO(filename)
+    elif compression is None:
+        return open(filename, mode)
+    if compression is None:
+        fid = filename
+    elif compression == 'gzip':
+        fid = gzip.open(filename, 'rb')
+    elif compression == 'bzip2':
+        fid = bz2.open(filename, 'rb')
+    else:
+        fid = io.BufferedReader(LZWFile(filename), buffer_size=1024**2)
+    if mode == 'rb':
+        return fid
+    return io.TextIOWrapper(fid)
+
+
+@contextlib.contextmanager
+def rinexFileBuffer(filename):
+    """
+    Context manager giving the content of a RINEX file as a read-only buffer,
+    for decoding the file with array operations. Uncompressed files are
+    memory mapped. Compressed files are decompressed into memory. Content
+    already in memory is used as it is.
+
+    Ex.
+        with rinexFileBuffer(filename) as mm:
+            end_of_header = mm.find(b'END OF HEADER')
+    """
+    if getRinexCompression(filename) is not None:
+        with openRinexFile(filename, 'rb') as fid:
+            data = fid.read()
+        yield data
+    elif isRinexBuffer(filename):
+        yield filename
+    elif os.path.getsize(filename) == 0:
+        ## -- Empty files can not be memory mapped
+        yield b''
+    else:
+        with open(filename, 'rb') as fid, mmap.mmap(fid.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def getRinexFileSize(filename):
+    """
+    Returns the size in bytes of the content of a RINEX file. For gzip files
+    the size is read from the end of the file, modulo 4 GB. 0 if the size is
+    not known without decompressing the file (bzip2 and compress).
+    """
+    compression = getRinexCompression(filename)
+    if compression is None:
+        return getRinexSourceSize(filename)
+    if compression == 'gzip':
+        if isRinexBuffer(filename):
+            return int.from_bytes(bytes(filename[-4:]), 'little')
+        with open(filename, 'rb') as fid:
+            fid.seek(-4, os.SEEK_END)
+            return int.from_bytes(fid.read(4), 'little')
+    return 0
+
+
+class LZWFile(io.RawIOBase):
+    """
+    Read-only file object giving the decompressed content of a file
+    compressed by Unix compress (.Z), decompressed while it is read.
+    filename can also be a binary file object.
+
+    The LZW codes are 9 to maxBits bits wide, stored with least significant
+    bit first. Codes are written in groups of 8, and a group is n bytes for
+    n bit codes. When the code width increases, or the table is cleared by
+    code 256 (block mode), the rest of the current group is unused.
+    """
+
+    def __init__(self, filename):
+        super().__init__()
+        self._fid = filename if hasattr(filename, 'read') else open(filename, 'rb')
+        self._name = getattr(self._fid, 'name', 'in-memory file')
+        self._rewind()
+
+    def _rewind(self):
+        self._fid.seek(0)
+        header = self._fid.read(3)
+        if len(header) < 3 or header[0:2] != b'\x1f\x9d':
+            raise OSError('ERROR(LZWFile): %s is not a compress (.Z) file' % self._name)
+        self._maxBits = header[2] & 0x1f
+        self._blockMode = header[2] & 0x80
+        if self._maxBits < 9 or self._maxBits > 16:
+            raise OSError('ERROR(LZWFile): Max code width of %d bits is not supported' % self._maxBits)
+        self._table = [bytes([code]) for code in range(256)] + [b'']*(2**self._maxBits - 256)
+        self._bits = 9
+        self._mask = 0x1ff
+        self._maxCode = 0x1ff # code width is increased when table reaches maxCode
+        self._end = 256 if self._blockMode else 255 # last code of table
+        self._prev = None  # previous code, None before first code
+        self._input = b''  # compressed bytes not yet decoded, from start of group
+        self._output = b'' # decompressed bytes not yet read
+        self._outputPos = 0
+        self._pos = 0      # position in decompressed content
+        self._eof = False
+
+    def _decode(self, final):
+        """
+        Decodes all whole groups of codes in self._input. If final, the last
+        group may have less than 8 codes.
+        """
+        data = self._input
+        table = self._table
+        bits, mask, maxCode, end, prev = self._bits, self._mask, self._maxCode, self._end, self._prev
+        tableSize = len(table)
+        out = []
+        i = 0
+        while i < len(data):
+            nbytes = bits
+            if len(data) - i < nbytes:
+                if not final:
+                    break
+                nbytes = len(data) - i
+            group = int.from_bytes(data[i:i+nbytes], 'little')
+            next_i = i + nbytes
+            for k in range(nbytes*8//bits):
+                if end >= maxCode:
+                    ## -- Table is full at current width. Wider codes start at next group.
+                    ## -- At max width the table is never full, as in compress
+                    bits = bits + 1
+                    mask = 2*mask + 1
+                    maxCode = tableSize if bits == self._maxBits else mask
+                    if k == 0:
+                        next_i = i
+                    break
+                code = (group >> (k*bits)) & mask
+                if code == 256 and self._blockMode:
+                    ## -- Clear table. Next code is a literal, and the entry added
+                    ## -- after it is 256, which is never used
+                    bits = 9
+                    mask = 0x1ff
+                    maxCode = 0x1ff
+                    end = 255
+                    break
+                if prev is None:
+                    if code > 255:
+                        raise OSError('ERROR(LZWFile): Invalid first code in %s' % self._name)
+                    out.append(table[code])
+                    prev = code
+                    continue
+                if code <= end:
+                    entry = table[code]
+                elif code == end + 1:
+                    entry = table[prev] + table[prev][0:1]
+                else:
+                    raise OSError('ERROR(LZWFile): Invalid code in %s' % self._name)
+                out.append(entry)
+                if end + 1 < tableSize:
+                    end = end + 1
+                    table[end] = table[prev] + entry[0:1]
+                prev = code
+            i = next_i
+        self._input = data[i:]
+        self._bits, self._mask, self._maxCode, self._end, self._prev = bits, mask, maxCode, end, prev
+        return b''.join(out)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._outputPos == len(self._output) and not self._eof:
+            data = self._fid.read(1024**2)
+            self._input = self._input + data
+            self._output = self._decode(final=len(data) == 0)
+            self._outputPos = 0
+            self._eof = len(data) == 0
+        n = min(len(buffer), len(self._output) - self._outputPos)
+        buffer[0:n] = self._output[self._outputPos:self._outputPos+n]
+        self._outputPos = self._outputPos + n
+        self._pos = self._pos + n
+        return n
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset = self._pos + offset
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation('ERROR(LZWFile): Can only seek from start or current position')
+        if offset < self._pos:
+            self._rewind()
+        buffer = bytearray(1024**2)
+        while self._pos < offset:
+            n = self.readinto(memoryview(buffer)[0:min(len(buffer), offset - self._pos)])
+            if n == 0:
+                break
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._fid.close()
+        super().close()
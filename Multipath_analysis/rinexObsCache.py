@@ -0,0 +1,259 @@
+import os, json, hashlib, tempfile
+import numpy as np
+from readRinexObs import readRinexObs, denseObs2EpochDicts
+from rinexCompression import isRinexBuffer, readRinexSource, getRinexSourceName
+
+## -- Increase when the content of the cache files changes, so old files are not used
+CACHE_FORMAT_VERSION = 6
+
+
+def readRinexObsCached(filename, readSS=None, readLLI=None, includeAllGNSSsystems=None,includeAllObsCodes=None, \
+                       desiredGNSSsystems=None, desiredObsCodes=None, desiredObsBands=None, denseObs=None, \
+                       tStart=None, tEnd=None, useMmap=None, nWorkers=None, cacheDir=None, maxCacheSize=None, \
+                       obsCodePairsOnly=None):
+    """
+    Function that reads a RINEX observation file with readRinexObs, and
+    stores the decoded observations, LLI, SS, satellite lists, epoch times
+    and header information in a cache file in binary NumPy format (.npz).
+    The next time the same file is read with the same reader options, the
+    result is loaded from the cache file instead of parsing the text.
+
+    The cache files are named by a SHA-256 hash of the content of the
+    observation file, or of all files of a session, and of the reader options. A renamed or copied file
+    therefore still gives a cache hit, while a changed file never does.
+    When the total size of the cache files exceeds maxCacheSize, the least
+    recently used files are deleted.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename, readSS, readLLI,
+    includeAllGNSSsystems,
+    includeAllObsCodes,
+    desiredGNSSsystems,
+    desiredObsCodes,
+    desiredObsBands, denseObs,
+    tStart, tEnd, useMmap,
+    nWorkers:                 as in readRinexObs. useMmap and nWorkers do not
+                              change the result and are not part of the key
+
+    cacheDir:                 directory of cache files.
+                              Default: ~/.cache/GNSS_Multipath_Analysis (optional)
+
+    maxCacheSize:             max total size of cache files in bytes.
+                              Default: 2 GB (optional)
+
+    obsCodePairsOnly:         as in readRinexObs (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    Same as readRinexObs
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    if cacheDir is None:
+        cacheDir = os.path.join(os.path.expanduser('~'), '.cache', 'GNSS_Multipath_Analysis')
+    if maxCacheSize is None:
+        maxCacheSize = 2*1024**3
+    if denseObs is None:
+        denseObs = 0
+    ## -- Content of file-like objects is read into memory, as it is both hashed and read
+    if isinstance(filename, (list, tuple)):
+        filename = [readRinexSource(name) for name in filename]
+    else:
+        filename = readRinexSource(filename)
+
+    readerOptions = {'readSS': readSS, 'readLLI': readLLI, 'includeAllGNSSsystems': includeAllGNSSsystems, \
+                     'includeAllObsCodes': includeAllObsCodes, 'desiredGNSSsystems': desiredGNSSsystems, \
+                     'desiredObsCodes': desiredObsCodes, 'desiredObsBands': desiredObsBands, \
+                     'tStart': tStart, 'tEnd': tEnd, 'obsCodePairsOnly': obsCodePairsOnly}
+    cacheFilename = os.path.join(cacheDir, getRinexObsCacheKey(filename, readerOptions) + '.npz')
+
+    ## -- Load from cache if possible
+    if os.path.isfile(cacheFilename):
+        try:
+            result = loadRinexObsCache(cacheFilename, denseObs)
+            os.utime(cacheFilename) # mark as recently used
+            names = filename if isinstance(filename, list) else [filename]
+            print('INFO(readRinexObsCached): Observations of %s were loaded from cache file %s' % (', '.join(os.path.basename(getRinexSourceName(name)) for name in names), cacheFilename))
+            return result
+        except (OSError, ValueError, KeyError, EOFError, TypeError):
+            print('WARNING(readRinexObsCached): Could not read cache file %s. The observation file will be read' % cacheFilename)
+
+    ## -- Read observation file. Arrays are cached, and converted afterwards if denseObs = 0
+    result = readRinexObs(filename, readSS, readLLI, includeAllGNSSsystems, includeAllObsCodes, desiredGNSSsystems, \
+                          desiredObsCodes, desiredObsBands, 1, tStart, tEnd, useMmap, nWorkers, obsCodePairsOnly)
+    if result is None:
+        return result
+    result = list(result)
+    success = result[-1]
+    if success == 1:
+        saveRinexObsCache(result, cacheFilename)
+        evictRinexObsCache(cacheDir, maxCacheSize, keep=cacheFilename)
+
+    if not denseObs:
+        GNSS_obs, GNSS_LLI, GNSS_SS = result[0:3]
+        ## -- LLI and SS not read are NaN
+        readLLI = int(any([isinstance(GNSS_LLI[sys], np.ndarray) for sys in GNSS_obs]))
+        readSS = int(any([isinstance(GNSS_SS[sys], np.ndarray) for sys in GNSS_obs]))
+        result[0:3] = denseObs2EpochDicts(GNSS_obs, GNSS_LLI, GNSS_SS, result[3], result[5], readLLI, readSS)
+    return tuple(result)
+
+
+def getRinexObsCacheKey(filename, readerOptions):
+    """
+    Function that returns the cache key of an observation file, the hex
+    digest of a SHA-256 hash of the file content, the reader options and
+    the cache format version. filename can be a list of the files of a
+    session, in which case the content of all files, in order, is hashed.
+    Content of files in memory is hashed directly.
+    """
+    file_hash = hashlib.sha256()
+    for name in (filename if isinstance(filename, (list, tuple)) else [filename]):
+        if isRinexBuffer(name):
+            file_hash.update(hashlib.sha256(name).digest())
+            continue
+        with open(name, 'rb') as fid:
+            content_hash = hashlib.sha256()
+            for block in iter(lambda: fid.read(16*1024**2), b''):
+                content_hash.update(block)
+        file_hash.update(content_hash.digest())
+
+    ## -- numpy scalars and arrays are stored as Python numbers and lists
+    options = json.dumps(readerOptions, sort_keys=True, default=lambda obj: obj.tolist() if hasattr(obj, 'tolist') else str(obj))
+    key = hashlib.sha256()
+    key.update(file_hash.digest())
+    key.update(options.encode())
+    key.update(str(CACHE_FORMAT_VERSION).encode())
+    return key.hexdigest()
+
+
+def saveRinexObsCache(result, cacheFilename):
+    """
+    Function that stores the output of readRinexObs, with denseObs = 1, in
+    a cache file. Arrays are stored as separate elements of the .npz file,
+    header information as one JSON element, see encodeCacheHeader. Nothing
+    is pickled, so loading a cache file never runs code from it. The file is
+    written to a temporary file first, so a file that is being written is
+    never read. Failing to write the file only gives a warning.
+    """
+    GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs = result[0:6]
+    arrays = {'time_epochs': np.asarray(time_epochs), 'nepochs': np.int64(nepochs)}
+    for sys in GNSS_obs:
+        arrays['obs_' + sys] = GNSS_obs[sys]
+        arrays['SVs_' + sys] = GNSS_SVs[sys]
+        ## -- LLI and SS not read are NaN
+        if isinstance(GNSS_LLI[sys], np.ndarray):
+            arrays['LLI_' + sys] = GNSS_LLI[sys]
+        if isinstance(GNSS_SS[sys], np.ndarray):
+            arrays['SS_' + sys] = GNSS_SS[sys]
+
+    tmpFilename = None
+    try:
+        headerArrays = {}
+        arrays['header'] = np.array(json.dumps(encodeCacheHeader(list(result[6:]), headerArrays)))
+        arrays.update(headerArrays)
+        os.makedirs(os.path.dirname(cacheFilename), exist_ok=True)
+        fd, tmpFilename = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(cacheFilename))
+        with os.fdopen(fd, 'wb') as fid:
+            np.savez(fid, **arrays)
+        os.replace(tmpFilename, cacheFilename)
+    except (OSError, TypeError):
+        print('WARNING(saveRinexObsCache): Could not write cache file %s' % cacheFilename)
+        if tmpFilename is not None and os.path.isfile(tmpFilename):
+            os.remove(tmpFilename)
+
+
+def loadRinexObsCache(cacheFilename, denseObs):
+    """
+    Function that loads a cache file written by saveRinexObsCache and
+    returns it as the output of readRinexObs.
+    """
+    with np.load(cacheFilename, allow_pickle=False) as data:
+        header = decodeCacheHeader(json.loads(str(data['header'])), data)
+        nepochs = int(data['nepochs'])
+        time_epochs = data['time_epochs']
+        systems = [key[4:] for key in data.files if key.startswith('obs_')]
+        GNSS_obs = {sys: data['obs_' + sys] for sys in systems}
+        GNSS_SVs = {sys: data['SVs_' + sys] for sys in systems}
+        GNSS_LLI = {sys: data['LLI_' + sys] if 'LLI_' + sys in data.files else np.nan for sys in systems}
+        GNSS_SS  = {sys: data['SS_' + sys] if 'SS_' + sys in data.files else np.nan for sys in systems}
+        readLLI = int(any(['LLI_' + sys in data.files for sys in systems]))
+        readSS = int(any(['SS_' + sys in data.files for sys in systems]))
+
+    if not denseObs:
+        GNSS_obs, GNSS_LLI, GNSS_SS = denseObs2EpochDicts(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, nepochs, readLLI, readSS)
+    return tuple([GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs] + header)
+
+
+def encodeCacheHeader(value, headerArrays):
+    """
+    Function that encodes the header information of readRinexObs as JSON
+    values that keep their types. Dicts, which have integer keys, lists,
+    tuples and NumPy scalars are tagged with their type. Arrays are added to
+    headerArrays, to be stored as elements of the .npz file, and are
+    referred to by name.
+    """
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            raise TypeError('Arrays of objects can not be stored in a cache file')
+        name = 'header_%d' % len(headerArrays)
+        headerArrays[name] = value
+        return {'array': name}
+    if isinstance(value, dict):
+        return {'dict': [[encodeCacheHeader(key, headerArrays), encodeCacheHeader(item, headerArrays)] for key, item in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return {type(value).__name__: [encodeCacheHeader(item, headerArrays) for item in value]}
+    if isinstance(value, np.generic):
+        return {'numpy': value.dtype.str, 'value': value.item()}
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    raise TypeError('%s can not be stored in a cache file' % type(value).__name__)
+
+
+def decodeCacheHeader(value, data):
+    """
+    Function that decodes header information encoded by encodeCacheHeader.
+    data is the loaded .npz file with the arrays. Raises ValueError for
+    values that were not written by encodeCacheHeader.
+    """
+    if not isinstance(value, dict):
+        return value
+    if 'array' in value:
+        return data[value['array']]
+    if 'dict' in value:
+        return {decodeCacheHeader(key, data): decodeCacheHeader(item, data) for key, item in value['dict']}
+    if 'list' in value:
+        return [decodeCacheHeader(item, data) for item in value['list']]
+    if 'tuple' in value:
+        return tuple(decodeCacheHeader(item, data) for item in value['tuple'])
+    if 'numpy' in value:
+        return np.dtype(value['numpy']).type(value['value'])
+    raise ValueError('Unknown header value in cache file')
+
+
+def evictRinexObsCache(cacheDir, maxCacheSize, keep=None):
+    """
+    Function that deletes the least recently used cache files until the
+    total size of the cache files is at most maxCacheSize. The file keep,
+    normally the file just written, is never deleted.
+    """
+    cacheFiles = []
+    for name in os.listdir(cacheDir):
+        if name.endswith('.npz'):
+            path = os.path.join(cacheDir, name)
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                continue
+            cacheFiles.append((file_stat.st_mtime_ns, file_stat.st_size, path))
+
+    totalSize = sum([size for _, size, _ in cacheFiles])
+    for _, size, path in sorted(cacheFiles):
+        if totalSize <= maxCacheSize:
+            break
+        if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+            totalSize = totalSize - size
+        except OSError:
+            print('WARNING(evictRinexObsCache): Could not delete cache file %s' % path)
@@ -0,0 +1,297 @@
+import io, os
+import numpy as np
+from Geodetic_functions import dates2gpstime
+from prnColumnMap import newPRN2ColumnMap, assignPRNColumns, growSatColumns, sortSatColumns, getMaxSat
+from readRinexObs import rinexReadObsFileHeader304, rinexReadObsBlockHead304, rinexReadObsBlock304, denseObs2EpochDicts
+from rinexCompression import getRinexCompression
+from rinexObsHatanaka import isCompactRinex
+
+
+def openRinexObsFollow(filename, readSS=None, readLLI=None, includeAllGNSSsystems=None, includeAllObsCodes=None, \
+                       desiredGNSSsystems=None, desiredObsCodes=None, desiredObsBands=None):
+    """
+    Function that starts following a RINEX 3.xx observation file that is
+    being appended to, ex. by the logger of a monitoring station. The header
+    is read, and all complete epochs in the file are read by
+    pollRinexObsFollow. Call pollRinexObsFollow again to read only the epochs
+    appended since the last call, and getRinexObsFollowData to get the
+    observations of all epochs read so far.
+
+    Example:
+        follow = openRinexObsFollow(filename)
+        while True:
+            time.sleep(60)
+            if pollRinexObsFollow(follow) > 0:
+                GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs, *_ = getRinexObsFollowData(follow)
+
+    Only uncompressed files can be followed.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename, readSS, readLLI,
+    includeAllGNSSsystems,
+    includeAllObsCodes,
+    desiredGNSSsystems,
+    desiredObsCodes,
+    desiredObsBands:          as in readRinexObs304
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    follow:                   dict with the state of the followed file: the
+                              header information, the byte offset of the
+                              first epoch not read yet, and the observation
+                              buffers. None if the file can not be followed
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    ## -- Setting None arguments
+    if readSS is None:
+        readSS = 1
+    if readLLI is None:
+        readLLI = 1
+    if includeAllGNSSsystems is None:
+        includeAllGNSSsystems = 1
+    if includeAllObsCodes is None:
+        includeAllObsCodes = 1
+    if desiredGNSSsystems is None:
+        desiredGNSSsystems = ['G','R','E','C']
+    if desiredObsCodes is None:
+        desiredObsCodes = ['C','L','S','D']
+    if desiredObsBands is None:
+        desiredObsBands = list(np.arange(1,10))
+
+    if getRinexCompression(filename) is not None or isCompactRinex(filename):
+        print('ERROR(openRinexObsFollow): Only uncompressed RINEX 3 observation files can be followed')
+        return None
+    with open(filename, 'rb') as fid:
+        rinexVersion = fid.readline()[0:9].strip()
+    if rinexVersion[0:1] != b'3':
+        print('ERROR(openRinexObsFollow): Only RINEX 3 observation files can be followed')
+        return None
+
+    ## -- Read header of observation file
+    header = rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCodes, desiredGNSSsystems, desiredObsCodes, desiredObsBands)
+    if header is None or header[0] == 0:
+        return None
+    header[-1].close()
+    [_, rinexVersion, gnssType, markerName, recType, antDelta, GNSSsystems, numOfObsCodes, obsCodes, obsCodeIndex, \
+     tFirstObs, tLastObs, tInterval, timeSystem, _, clockOffsetsON, rinexProgr, rinexDate, leapSec, approxPosition, \
+     GLO_Slot2ChannelMap, _, _] = header
+
+    for k in GNSSsystems:
+        if GNSSsystems[k] not in ['G', 'R', 'E', 'C']:
+            print('ERROR(openRinexObsFollow): Only following GNSS systems are compatible with this program: GPS, GLONASS, Galileo, Beidou. %s is not valid' % GNSSsystems[k])
+            return None
+
+    ## -- Byte offset of first line after END OF HEADER
+    with open(filename, 'rb') as fid:
+        for line in fid:
+            if b'END OF HEADER' in line:
+                break
+        offset = fid.tell()
+
+    ## -- Buffers are doubled in size when they are full
+    capacity = 1024
+    GNSS_obs = {}
+    GNSS_LLI = {}
+    GNSS_SS = {}
+    GNSS_SVs = {}
+    PRN2col = {}
+    for k in np.arange(0, len(GNSSsystems)):
+        curr_sys = GNSSsystems[k+1]
+        PRN2col[curr_sys] = newPRN2ColumnMap()
+        GNSS_SVs[curr_sys] = np.zeros([capacity, 1])
+        GNSS_obs[curr_sys] = np.zeros([capacity, 1, numOfObsCodes[k]])
+        GNSS_LLI[curr_sys] = np.zeros([capacity, 1, numOfObsCodes[k]], dtype=np.int8) if readLLI else np.nan
+        GNSS_SS[curr_sys] = np.zeros([capacity, 1, numOfObsCodes[k]], dtype=np.int8) if readSS else np.nan
+
+    follow = {'filename': filename, 'offset': offset, 'nepochs': 0, 'epoch_dates': np.zeros([capacity, 6]),
+              'readSS': readSS, 'readLLI': readLLI, 'GNSSsystems': GNSSsystems, 'numOfObsCodes': numOfObsCodes,
+              'obsCodes': obsCodes, 'obsCodeIndex': obsCodeIndex, 'tInterval': tInterval,
+              'GNSS_obs': GNSS_obs, 'GNSS_LLI': GNSS_LLI, 'GNSS_SS': GNSS_SS, 'GNSS_SVs': GNSS_SVs, 'PRN2col': PRN2col,
+              'header': [approxPosition, markerName, rinexVersion, recType, timeSystem, leapSec, gnssType,
+                         rinexProgr, rinexDate, antDelta, tFirstObs, tLastObs, clockOffsetsON, GLO_Slot2ChannelMap]}
+    pollRinexObsFollow(follow)
+    return follow
+
+
+def findCompleteEpochs304(data):
+    """
+    Function that finds the complete observation epochs at the start of data,
+    the bytes of a RINEX 3.xx observation file from the start of an
+    observation block. An epoch is complete when its epoch line and the lines
+    of all its satellites, ending with a line feed, are in data. Blocks with
+    event flags > 1 are counted with the epoch following them.
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    nepochs:              number of complete observation epochs
+
+    nbytes:               length in bytes of the complete epochs
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    nepochs = 0
+    nbytes = 0
+    lines = data.split(b'\n')[:-1] # last element is not a complete line
+    line_ends = np.cumsum([len(line) + 1 for line in lines])
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        try:
+            if line[0:1] != b'>':
+                raise ValueError
+            epochFlag = int(line[31:32])
+            numLines = int(line[32:35])
+        except ValueError:
+            print('WARNING(findCompleteEpochs304): Invalid epoch line, %d bytes after last complete epoch: %s' \
+                  % (sum(len(line) + 1 for line in lines[0:i]) - nbytes, line.decode(errors='replace').rstrip()))
+            break
+        if i + 1 + numLines > len(lines):
+            break
+        i = i + 1 + numLines
+        if epochFlag <= 1:
+            nepochs = nepochs + 1
+            nbytes = int(line_ends[i-1])
+    return nepochs, nbytes
+
+
+def pollRinexObsFollow(follow):
+    """
+    Function that reads the complete epochs appended to a followed RINEX
+    observation file since the last call. The epochs are decoded by
+    rinexReadObsBlockHead304 and rinexReadObsBlock304 and appended to the
+    buffers of follow, and the byte offset is moved past them. An epoch that
+    is only partly written is read by a later call.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    follow:               dict from openRinexObsFollow. Updated in place
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    nNewEpochs:           number of epochs read
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    filename = follow['filename']
+    if os.path.getsize(filename) < follow['offset']:
+        print('WARNING(pollRinexObsFollow): %s is shorter than the part already read. It may have been replaced, and is not read' % filename)
+        return 0
+    with open(filename, 'rb') as fid:
+        fid.seek(follow['offset'])
+        data = fid.read()
+    nNewEpochs, nbytes = findCompleteEpochs304(data)
+    if nNewEpochs == 0:
+        return 0
+
+    GNSSsystems = follow['GNSSsystems']
+    numOfObsCodes = follow['numOfObsCodes']
+    readLLI = follow['readLLI']
+    readSS = follow['readSS']
+    GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs = follow['GNSS_obs'], follow['GNSS_LLI'], follow['GNSS_SS'], follow['GNSS_SVs']
+    PRN2col = follow['PRN2col']
+    fid = io.StringIO(data[0:nbytes].decode(errors='replace'))
+    for _ in range(0, nNewEpochs):
+        ## Read Obs Block Header
+        success, _, _, date, numSV, eof = rinexReadObsBlockHead304(fid)
+        if success == 0 or eof == 1:
+            break
+
+        ## -- Read current block of observations
+        success, Obs, SVlist, numSV, LLI, SS, eof = rinexReadObsBlock304(fid, numSV, numOfObsCodes, GNSSsystems, follow['obsCodeIndex'], readSS, readLLI)
+        if success == 0:
+            break
+        current_epoch = follow['nepochs'] + 1
+
+        ## -- Double the size of the buffers if they are full
+        if current_epoch > len(follow['epoch_dates']):
+            for curr_sys in GNSS_obs:
+                GNSS_obs[curr_sys] = np.concatenate((GNSS_obs[curr_sys], np.zeros_like(GNSS_obs[curr_sys])), axis=0)
+                GNSS_SVs[curr_sys] = np.concatenate((GNSS_SVs[curr_sys], np.zeros_like(GNSS_SVs[curr_sys])), axis=0)
+                if readLLI:
+                    GNSS_LLI[curr_sys] = np.concatenate((GNSS_LLI[curr_sys], np.zeros_like(GNSS_LLI[curr_sys])), axis=0)
+                if readSS:
+                    GNSS_SS[curr_sys] = np.concatenate((GNSS_SS[curr_sys], np.zeros_like(GNSS_SS[curr_sys])), axis=0)
+            follow['epoch_dates'] = np.concatenate((follow['epoch_dates'], np.zeros_like(follow['epoch_dates'])), axis=0)
+        follow['epoch_dates'][current_epoch-1, :] = date[0:6]
+
+        ## -- Store obs, LLI and SS of all satellites of epoch, one GNSS system at a time
+        SV_systems = [SV[0] for SV in SVlist]
+        for k in np.arange(0, len(GNSSsystems)):
+            curr_sys = GNSSsystems[k+1]
+            sat_rows = [sat for sat in range(0, numSV) if SV_systems[sat] == curr_sys]
+            PRNs = [int(SVlist[sat][1:3]) for sat in sat_rows]
+            nObsTypes_current_sys = int(numOfObsCodes[k])
+
+            ## -- Columns of the satellites. Arrays are grown if new satellites are found
+            cols = assignPRNColumns(PRN2col[curr_sys], PRNs)
+            growSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, max(PRN2col[curr_sys].max(), len(PRNs)) + 1, readLLI, readSS)
+
+            GNSS_obs[curr_sys][current_epoch-1, cols, 0:nObsTypes_current_sys] = Obs[sat_rows, 0:nObsTypes_current_sys]
+            if readLLI:
+                GNSS_LLI[curr_sys][current_epoch-1, cols, 0:nObsTypes_current_sys] = LLI[sat_rows, 0:nObsTypes_current_sys]
+            if readSS:
+                GNSS_SS[curr_sys][current_epoch-1, cols, 0:nObsTypes_current_sys] = SS[sat_rows, 0:nObsTypes_current_sys]
+            GNSS_SVs[curr_sys][current_epoch-1, 0] = len(PRNs)
+            GNSS_SVs[curr_sys][current_epoch-1, 1:len(PRNs)+1] = PRNs
+        follow['nepochs'] = current_epoch
+
+    follow['offset'] = follow['offset'] + nbytes
+    return nNewEpochs
+
+
+def getRinexObsFollowData(follow, denseObs=None):
+    """
+    Function that returns the observations of all epochs read from a
+    followed RINEX observation file, with the same outputs as
+    readRinexObs304. The arrays are copies with the satellite columns in
+    order of PRN, and are not changed by later calls to pollRinexObsFollow.
+    TIME OF LAST OBS is the time of the last epoch read.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    follow:               dict from openRinexObsFollow
+
+    denseObs:             Boolean, 0 or 1. As in readRinexObs304. Default 1 (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    Same as readRinexObs304
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    if denseObs is None:
+        denseObs = 1
+    GNSSsystems = follow['GNSSsystems']
+    nepochs = follow['nepochs']
+    readLLI = follow['readLLI']
+    readSS = follow['readSS']
+    [approxPosition, markerName, rinexVersion, recType, timeSystem, leapSec, gnssType, rinexProgr, rinexDate, \
+     antDelta, tFirstObs, tLastObs, clockOffsetsON, GLO_Slot2ChannelMap] = follow['header']
+
+    ## -- Sort copies of the buffers. The buffers keep the order satellites were found in
+    GNSS_obs = dict(follow['GNSS_obs'])
+    GNSS_LLI = dict(follow['GNSS_LLI'])
+    GNSS_SS = dict(follow['GNSS_SS'])
+    GNSS_SVs = dict(follow['GNSS_SVs'])
+    max_sat = np.zeros([len(GNSSsystems), 1])
+    for k in np.arange(0, len(GNSSsystems)):
+        curr_sys = GNSSsystems[k+1]
+        PRNs = sortSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, follow['PRN2col'][curr_sys].copy(), nepochs, readLLI, readSS)
+        max_sat[k] = getMaxSat(curr_sys, PRNs)
+
+    ## -- Convert time stamps of all epochs to GPS-week and "time-of-week". Seconds are truncated to integers
+    epoch_dates = follow['epoch_dates'][0:nepochs]
+    time_epochs = np.zeros([0,2])
+    tInterval = follow['tInterval']
+    if nepochs > 0:
+        t_week, t_tow = dates2gpstime(np.column_stack((epoch_dates[:,0:5], np.fix(epoch_dates[:,5]))))
+        time_epochs = np.column_stack((t_week, t_tow))
+        tLastObs = epoch_dates[-1].reshape(6,1).astype(int)
+    if nepochs > 1 and np.isnan(tInterval):
+        t_week, t_tow = dates2gpstime(epoch_dates[0:2])
+        tInterval = (t_week[1] - t_week[0])*604800 + t_tow[1] - t_tow[0]
+
+    if not denseObs:
+        GNSS_obs, GNSS_LLI, GNSS_SS = denseObs2EpochDicts(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, nepochs, readLLI, readSS)
+    success = 1
+    return GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs, GNSSsystems,\
+        follow['obsCodes'], approxPosition, max_sat, tInterval, markerName, rinexVersion, recType, timeSystem, leapSec, gnssType,\
+        rinexProgr, rinexDate, antDelta, tFirstObs, tLastObs, clockOffsetsON, GLO_Slot2ChannelMap, success
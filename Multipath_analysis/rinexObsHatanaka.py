@@ -0,0 +1,431 @@
+import numpy as np
+from Geodetic_functions import date2gpstime
+from prnColumnMap import assignPRNColumns, growSatColumns
+from rinexCompression import openRinexFile, readRinexSource, getRinexSourceName
+
+
+def isCompactRinex(filename):
+    """
+    Returns True if filename is a compact RINEX (Hatanaka, CRINEX) file,
+    compressed or not. Compact RINEX files start with the line
+    CRINEX VERS   / TYPE.
+    """
+    with openRinexFile(readRinexSource(filename)) as fid:
+        line = fid.readline()
+    return 'CRINEX VERS' in line
+
+
+def repairCompactText(old, diff):
+    """
+    Returns the text line given by the text difference diff to the line old,
+    as in compact RINEX. A space in diff keeps the character of old, '&' sets
+    a space, and any other character replaces the character of old. If diff
+    is longer than old, old is extended.
+
+    Ex.
+        repairCompactText(' 21  1  1  0  0  0.0000000', '                3')
+        gives ' 21  1  1  0  0 30.0000000'
+    """
+    new = list(old)
+    for pos, char in enumerate(diff):
+        if char == ' ':
+            if pos >= len(new):
+                new.append(' ')
+            continue
+        if char == '&':
+            char = ' '
+        if pos < len(new):
+            new[pos] = char
+        else:
+            new.append(char)
+    return ''.join(new)
+
+
+def readCompactRinexHeader(fid):
+    """
+    Reads the header of a compact RINEX file from the start of the file,
+    and leaves fid at the first line after END OF HEADER.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    fid:                  text file object at start of file, see openRinexFile
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    success:              Boolean. 1 if the header seems to be valid, 0 otherwise
+
+    crxVersion:           compact RINEX version, '1.0' (RINEX 2) or '3.0' (RINEX 3)
+
+    nObsTypes:            dict with the number of observation types of each
+                          GNSS system in RINEX 3 files, ex. {'G': 8, 'R': 4}.
+                          RINEX 2 files have the same types for all systems,
+                          and the number is stored with key None
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    success = 1
+    nObsTypes = {}
+    line = fid.readline()
+    crxVersion = line[0:20].strip()
+    if 'CRINEX VERS' not in line or crxVersion not in ['1.0', '3.0']:
+        print('ERROR(readCompactRinexHeader): The file is not a compact RINEX file of version 1.0 or 3.0')
+        success = 0
+        return success, crxVersion, nObsTypes
+    fid.readline() # CRINEX PROG / DATE
+
+    while True:
+        line = fid.readline()
+        if not line:
+            print('ERROR(readCompactRinexHeader): END OF HEADER was not found')
+            success = 0
+            break
+        if 'END OF HEADER' in line:
+            break
+        if '# / TYPES OF OBSERV' in line and line[0:6].strip():
+            nObsTypes[None] = int(line[0:6])
+        elif 'SYS / # / OBS TYPES' in line and line[0] != ' ':
+            nObsTypes[line[0]] = int(line[3:6])
+    return success, crxVersion, nObsTypes
+
+
+def iterCompactRinexBlocks(filename):
+    """
+    Generator that decodes the observation blocks of a compact RINEX
+    (Hatanaka) file one epoch at a time. Compressed files, ex. .crx.gz, are
+    decompressed while they are read, see openRinexFile.
+
+    In compact RINEX the epoch line and the LLI and SS of each satellite are
+    given as text differences to the previous epoch, see repairCompactText.
+    The observations are integers in units of 0.001, and each arc of an
+    observation type of a satellite starts with 'n&value', where n is the max
+    order of the differences of the arc. The following epochs give the
+    difference of order 1, 2, ..., n of the value, and the values are
+    reconstructed by summing the differences. An empty field ends the arc.
+    The receiver clock offset is differenced in the same way.
+
+    Blocks with event flags with numbers greater than 1 are not yielded, and
+    their special records are skipped.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename:             compact RINEX observation filename, or content of
+                          the file in memory, see readRinexSource in
+                          rinexCompression.py
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    Yields one tuple per epoch:
+
+    date:                 time stamp of epoch [YYYY, MM, DD, hh, mm, ss.sssssss]
+
+    epochFlag:            epoch flag of block, 0 or 1
+
+    clockOffset:          receiver clock offset of block; seconds. NaN if not given
+
+    SVlist:               list of the satellites of the epoch, ex. ['G01', 'R12']
+
+    values:               list with one list of integer observations for each
+                          satellite, in units of 0.001. Missing observations
+                          are None
+
+    flags:                list with the LLI and SS characters of each
+                          satellite, 'LSLSLS...'. Can be shorter than two
+                          characters per observation type. LLI and SS of
+                          missing observations are blank
+
+    Raises ValueError if the file is not a valid compact RINEX file.
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    filename = readRinexSource(filename)
+    with openRinexFile(filename) as fid:
+        success, crxVersion, nObsTypes = readCompactRinexHeader(fid)
+        if not success:
+            raise ValueError('ERROR(iterCompactRinexBlocks): %s could not be read as a compact RINEX file' % getRinexSourceName(filename))
+        if crxVersion == '1.0':
+            ## -- ' yy mm dd hh mm ss.sssssss  f nnn' followed by all satellites
+            date_columns = [(1,3), (4,6), (7,9), (10,12), (13,15), (15,26)]
+            flag_pos, numSV_columns, sat_pos, clock_unit, init_char = 28, (29,32), 32, 1e-9, '&'
+        else:
+            ## -- '> yyyy mm dd hh mm ss.sssssss  f nnn      ' followed by all satellites
+            date_columns = [(2,6), (7,9), (10,12), (13,15), (16,18), (18,29)]
+            flag_pos, numSV_columns, sat_pos, clock_unit, init_char = 31, (32,35), 41, 1e-12, '>'
+
+        epoch_line = ''
+        clock_arc = None
+        sat_arcs = {}  # differences and flags of satellites of previous epoch
+        epoch = 0
+        while True:
+            line = fid.readline()
+            if not line:
+                break
+            line = line.rstrip()
+            if not line:
+                continue
+            epoch = epoch + 1
+
+            ## -- Epoch lines starting with init_char are given in full
+            if line[0] == init_char:
+                epoch_line = repairCompactText('', line) if crxVersion == '1.0' else line
+            else:
+                epoch_line = repairCompactText(epoch_line, line)
+            try:
+                epochFlag = int(epoch_line[flag_pos])
+                numSV = int(epoch_line[numSV_columns[0]:numSV_columns[1]])
+            except (ValueError, IndexError):
+                raise ValueError('ERROR(iterCompactRinexBlocks): Invalid epoch line %d of %s: %s' % (epoch, getRinexSourceName(filename), epoch_line))
+
+            ## -- Special records of events are not compressed
+            if epochFlag > 1:
+                for _ in range(numSV):
+                    fid.readline()
+                continue
+
+            date = [float(epoch_line[first:last]) for first, last in date_columns]
+            if crxVersion == '1.0':
+                ## -- Two-digit years 80-99 are 1980-1999
+                date[0] = date[0] + (2000 if date[0] < 80 else 1900)
+            SVlist = [epoch_line[pos:pos+3] for pos in range(sat_pos, sat_pos + 3*numSV, 3)]
+            SVlist = [('G' if SV[0] == ' ' else SV[0]) + SV[1:3].replace(' ', '0') for SV in SVlist]
+
+            ## -- Receiver clock offset
+            clock_field = fid.readline().strip()
+            clock_arc = decodeCompactArc(clock_arc, clock_field) if clock_field else None
+            clockOffset = clock_arc[0][0]*clock_unit if clock_arc is not None else np.nan
+
+            ## -- Observations and flags of each satellite
+            values = []
+            flags = []
+            new_sat_arcs = {}
+            for SV in SVlist:
+                n_types = nObsTypes.get(None, nObsTypes.get(SV[0], 0))
+                fields = fid.readline().rstrip().split(' ', n_types)
+                arcs, sat_flags = sat_arcs.get(SV, ([None]*n_types, ''))
+                sat_values = [None]*n_types
+                empty = []
+                for i in range(n_types):
+                    field = fields[i] if i < len(fields) else ''
+                    if not field:
+                        arcs[i] = None
+                        empty.append(i)
+                        continue
+                    try:
+                        arcs[i] = decodeCompactArc(arcs[i], field)
+                    except ValueError:
+                        raise ValueError('ERROR(iterCompactRinexBlocks): Invalid observation %d of %s in epoch %s of %s: %s' \
+                                         % (i+1, SV, epoch_line[0:sat_pos].strip(), getRinexSourceName(filename), field))
+                    sat_values[i] = arcs[i][0][0]
+                if len(fields) > n_types:
+                    sat_flags = repairCompactText(sat_flags, fields[n_types])
+                ## -- LLI and SS of empty fields are blank, as in CRX2RNX. The flags of the next epoch are differences to the flags given
+                if empty:
+                    sat_flags = list(sat_flags)
+                    for i in empty:
+                        sat_flags[2*i:2*i+2] = ' '*len(sat_flags[2*i:2*i+2])
+                    sat_flags = ''.join(sat_flags)
+                new_sat_arcs[SV] = (arcs, sat_flags)
+                values.append(sat_values)
+                flags.append(sat_flags)
+            sat_arcs = new_sat_arcs
+
+            yield date, epochFlag, clockOffset, SVlist, values, flags
+
+
+def decodeCompactArc(arc, field):
+    """
+    Decodes one field of a differenced value of compact RINEX.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    arc:                  state of the arc, ([value, diff1, diff2, ...], order)
+                          as returned for the previous epoch. None if there
+                          is no arc
+
+    field:                'n&value' to start a new arc of max order n, or the
+                          difference of the highest order so far
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    arc:                  new state of the arc. arc[0][0] is the value of the
+                          epoch. The differences of arc are updated in place
+    --------------------------------------------------------------------------------------------------------------------------
+    Raises ValueError if field is not a valid integer, or if it is a
+    difference and there is no arc.
+    """
+    if field[1:2] == '&':
+        return [int(field[2:])], int(field[0])
+    if arc is None:
+        raise ValueError('Difference without start of arc')
+    diffs, order = arc
+    if len(diffs) <= order:
+        diffs.append(int(field))
+    else:
+        diffs[order] = int(field)
+    for k in range(len(diffs) - 1, 0, -1):
+        diffs[k-1] = diffs[k-1] + diffs[k]
+    return diffs, order
+
+
+def compactObs2Floats(values, missing, LLIchars):
+    """
+    Converts observations of compact RINEX to the floats read from the
+    same observations in RINEX text by rinexReadObsBlock304 and
+    rinexReadObsBlock211. These decode characters 1-14 of the 16 characters
+    of F14.3, LLI and SS of an observation. The first character of F14.3 is
+    therefore not read, and an LLI digit is read as a 4th decimal.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    values:               int64 array of observations, in units of 0.001
+
+    missing:              boolean array, True where the observation is missing
+
+    LLIchars:             uint8 array with the LLI character of each observation
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    Obs:                  float array of observations. Missing observations
+                          are 0
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    ## -- First character of F14.3 is a digit for values >= 1e9, and '-' for values <= -1e8
+    values = np.where(values >= 10**12, values % 10**12, values)
+    values = np.where(values <= -10**11, -values, values)
+    values = np.where(missing, 0, values)
+    LLIdigit = (LLIchars >= ord('0')) & (LLIchars <= ord('9'))
+    digits = np.where(LLIdigit, LLIchars.astype(np.int64) - ord('0'), 0)
+    ## -- 'value' + 'digit' as units of 0.0001. Both divisions are correctly rounded, as the decoding of the text
+    Obs = values/1000
+    with_digit = LLIdigit & ~missing
+    Obs[with_digit] = (values[with_digit]*10 + np.where(values[with_digit] < 0, -1, 1)*digits[with_digit])/10000
+    return Obs
+
+
+def rinexReadObsBlocksHatanaka(filename, tStart, tEnd, GNSSsystems, numOfObsCodes, obsCodeIndex, readSS, readLLI, \
+                               GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col, LLIcodeIndex=None):
+    """
+    Reads all observation blocks of a compact RINEX (Hatanaka) observation
+    file, version 1.0 (RINEX 2) or 3.0 (RINEX 3). This is an alternative to
+    decompressing the file to RINEX before reading it. The blocks are decoded
+    one epoch at a time by iterCompactRinexBlocks, and the observations are
+    stored directly in the observation arrays.
+
+    The differences of all epochs before tStart must be decoded to
+    reconstruct the observations, so a time window saves memory but not time.
+
+    ATTENTION: As rinexReadObsBlockHead304, ignores all data in blocks with
+    event flags with numbers greater than 1!!!
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename:             compact RINEX observation filename
+
+    tStart, tEnd:         time window to read [YYYY, MM, DD, hh, mm, ss.sssssss].
+                          None = from first epoch/to last epoch
+
+    GNSSsystems, numOfObsCodes,
+    obsCodeIndex, readSS,
+    readLLI:              as in rinexReadObsBlocksMmap304, from the header of
+                          the file
+
+    GNSS_obs, GNSS_LLI,
+    GNSS_SS, GNSS_SVs,
+    PRN2col:              dicts with preallocated arrays and PRN-to-column maps
+                          of each GNSS system, as in rinexReadObsBlocksMmap304.
+                          Updated in place
+
+    LLIcodeIndex:         as in rinexReadObsBlocksMmap304 (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    success:              Boolean. 1 if the function seems to be successful,
+                          0 otherwise. Epochs read before an error are kept
+
+    nepochs:              number of epochs read
+
+    epoch_dates:          matrix [nepochs x 6] with time stamp of each epoch
+                          [YYYY, MM, DD, hh, mm, ss.sssssss]
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    success = 1
+    nepochs = 0
+    epoch_dates = []
+    nGNSSsystems = len(GNSSsystems)
+
+    ## -- Time window in seconds since GPS time origin
+    tStart_sec = -np.inf
+    tEnd_sec = np.inf
+    if tStart is not None:
+        week, tow = date2gpstime(int(tStart[0]), int(tStart[1]), int(tStart[2]), int(tStart[3]), int(tStart[4]), float(tStart[5]))
+        tStart_sec = week*604800 + tow
+    if tEnd is not None:
+        week, tow = date2gpstime(int(tEnd[0]), int(tEnd[1]), int(tEnd[2]), int(tEnd[3]), int(tEnd[4]), float(tEnd[5]))
+        tEnd_sec = week*604800 + tow
+
+    try:
+        for date, _, _, SVlist, values, flags in iterCompactRinexBlocks(filename):
+            ## -- Check time window
+            if tStart is not None or tEnd is not None:
+                week, tow = date2gpstime(int(date[0]), int(date[1]), int(date[2]), int(date[3]), int(date[4]), date[5])
+                t_sec = week*604800 + tow
+                if t_sec < tStart_sec:
+                    continue
+                if t_sec > tEnd_sec:
+                    break
+            nepochs = nepochs + 1
+            epoch_dates.append(date)
+
+            ## -- Double the size of the buffers if they are full
+            if nepochs > len(GNSS_SVs[GNSSsystems[1]]):
+                for curr_sys in GNSS_obs:
+                    GNSS_obs[curr_sys] = np.concatenate((GNSS_obs[curr_sys], np.zeros_like(GNSS_obs[curr_sys])), axis=0)
+                    GNSS_SVs[curr_sys] = np.concatenate((GNSS_SVs[curr_sys], np.zeros_like(GNSS_SVs[curr_sys])), axis=0)
+                    if readLLI:
+                        GNSS_LLI[curr_sys] = np.concatenate((GNSS_LLI[curr_sys], np.zeros_like(GNSS_LLI[curr_sys])), axis=0)
+                    if readSS:
+                        GNSS_SS[curr_sys] = np.concatenate((GNSS_SS[curr_sys], np.zeros_like(GNSS_SS[curr_sys])), axis=0)
+
+            ## -- Store obs, LLI and SS of all satellites of epoch, one GNSS system at a time
+            for k in np.arange(0, nGNSSsystems):
+                curr_sys = GNSSsystems[k+1]
+                sat_rows = [sat for sat in range(0, len(SVlist)) if SVlist[sat][0] == curr_sys]
+                if len(sat_rows) == 0:
+                    continue
+                PRNs = [int(SVlist[sat][1:3]) for sat in sat_rows]
+                obsIndex = np.asarray(obsCodeIndex[k+1], dtype=int)
+                nObsTypes_current_sys = int(numOfObsCodes[k])
+                n_types = len(values[sat_rows[0]])
+
+                ## -- Columns of the satellites. Arrays are grown if new satellites are found
+                cols = assignPRNColumns(PRN2col[curr_sys], PRNs)
+                growSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, max(PRN2col[curr_sys].max(), len(PRNs)) + 1, readLLI, readSS)
+
+                ## -- LLI and SS characters, padded with spaces to two per observation type
+                chars = np.frombuffer(''.join(flags[sat][0:2*n_types].ljust(2*n_types) for sat in sat_rows).encode(), dtype=np.uint8)
+                chars = chars.reshape(len(sat_rows), n_types, 2)[:, obsIndex, :]
+
+                ## -- Observations are integers in units of 0.001. Missing observations are 0.
+                ## -- Only the observation types to be read are converted, as from RINEX text
+                missing = np.array([[values[sat][i] is None for i in obsIndex] for sat in sat_rows], dtype=bool).reshape(len(sat_rows), len(obsIndex))
+                Obs = np.array([[0 if values[sat][i] is None else values[sat][i] for i in obsIndex] for sat in sat_rows], dtype=np.int64)
+                GNSS_obs[curr_sys][nepochs-1, cols, 0:nObsTypes_current_sys] = compactObs2Floats(Obs.reshape(len(sat_rows), len(obsIndex)), \
+                                                                                                   missing, chars[:, :, 0])
+
+                if readLLI or readSS:
+                    indicators = np.where(chars == ord(' '), -1, chars.astype(np.int8) - ord('0')).astype(np.int8)
+                    if readLLI:
+                        LLIcols = np.arange(nObsTypes_current_sys) if LLIcodeIndex is None else np.array(LLIcodeIndex[k+1], dtype=int)
+                        GNSS_LLI[curr_sys][nepochs-1, cols[:,None], LLIcols[None,:]] = indicators[:, LLIcols, 0]
+                    if readSS:
+                        GNSS_SS[curr_sys][nepochs-1, cols, 0:nObsTypes_current_sys] = indicators[:, :, 1]
+
+                ## --Set number of satellites with obs, and their PRN numbers, for each GNSS system this epoch
+                GNSS_SVs[curr_sys][nepochs-1, 0] = len(PRNs)
+                GNSS_SVs[curr_sys][nepochs-1, 1:len(PRNs)+1] = PRNs
+    except ValueError as error:
+        print('ERROR(rinexReadObsBlocksHatanaka): Observations of %s could not be decoded. %s' % (getRinexSourceName(filename), error))
+        success = 0
+
+    if len(epoch_dates) > 0:
+        epoch_dates = np.array(epoch_dates)
+    else:
+        epoch_dates = np.zeros([0,6])
+    return success, nepochs, epoch_dates
@@ -0,0 +1,178 @@
+import os, re
+import numpy as np
+from Geodetic_functions import date2gpstime
+from rinexCompression import rinexFileBuffer, isRinexBuffer, getRinexSourceName
+
+
+def getRinexObsIndex(filename, indexFilename=None):
+    """
+    Function that returns the epoch index of a RINEX 3.xx observation file.
+    The index is read from the sidecar file if it exists and matches the
+    size and modification time of the observation file. Otherwise the index
+    is built with buildRinexObsIndex and stored in the sidecar file. The
+    index of a file in memory is built, and not stored.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename:         RINEX observation filename, or content of the file in
+                      memory, see readRinexSource in rinexCompression.py
+
+    indexFilename:    filename of sidecar index file. Default is filename
+                      with '.idx.npz' appended (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    rinexObsIndex:    dict with the epoch index, see buildRinexObsIndex
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    if isRinexBuffer(filename):
+        return buildRinexObsIndex(filename)
+    if indexFilename is None:
+        indexFilename = filename + '.idx.npz'
+
+    file_stat = os.stat(filename)
+    if os.path.isfile(indexFilename):
+        try:
+            with np.load(indexFilename) as data:
+                rinexObsIndex = {key: data[key] for key in data.files}
+            if int(rinexObsIndex['fileSize']) == file_stat.st_size and int(rinexObsIndex['fileMtime']) == file_stat.st_mtime_ns:
+                return rinexObsIndex
+        except (OSError, ValueError, KeyError):
+            print('WARNING(getRinexObsIndex): Could not read index file %s. The index will be rebuilt' % indexFilename)
+
+    rinexObsIndex = buildRinexObsIndex(filename)
+    saveRinexObsIndex(rinexObsIndex, indexFilename)
+    return rinexObsIndex
+
+
+def buildRinexObsIndex(filename):
+    """
+    Function that scans a RINEX 3.xx observation file and records the byte
+    offset, time stamp, epoch flag and number of satellites of every
+    observation block head, ie. every line starting with '>'.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename:         RINEX observation filename, or content of the file in memory
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    rinexObsIndex:    dict with one element per epoch in the following arrays:
+
+                      offset:     byte offset of the block head in the file,
+                                  in the decompressed content of compressed
+                                  files
+                      time:       time stamp of block [YYYY, MM, DD, hh, mm, ss.sssssss].
+                                  NaN if not given (event flags > 1)
+                      gpsTime:    seconds since GPS time origin, 06.01.1980
+                      epochFlag:  epoch flag of block, 0-6
+                      numSV:      number of satellites, or number of special
+                                  records for event flags > 1
+
+                      fileSize and fileMtime of the observation file are
+                      also stored to detect if the file has changed. 0 for
+                      files in memory.
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    if isRinexBuffer(filename):
+        file_size, file_mtime = len(filename), 0
+    else:
+        file_stat = os.stat(filename)
+        file_size, file_mtime = file_stat.st_size, file_stat.st_mtime_ns
+    offset = []
+    epoch_lines = []
+    if file_size > 0:
+        with rinexFileBuffer(filename) as mm:
+            ## -- Observation blocks start after the header
+            end_of_header = mm.find(b'END OF HEADER')
+            if end_of_header == -1:
+                print('ERROR(buildRinexObsIndex): END OF HEADER was not found in %s' % getRinexSourceName(filename))
+            else:
+                start_pos = mm.find(b'\n', end_of_header) + 1
+                skip_until = 0 # end of special records following an event flag
+                for match in re.compile(rb'^>[^\r\n]*', re.MULTILINE).finditer(mm, start_pos):
+                    if match.start() < skip_until:
+                        continue
+                    line = match.group().decode('latin-1')
+                    offset.append(match.start())
+                    epoch_lines.append(line)
+                    ## -- Lines following event flags > 1 are special records, not epochs
+                    line = line.ljust(35)
+                    if line[31].isdigit() and int(line[31]) > 1 and not line[32:35].isspace():
+                        skip_until = match.end()
+                        for count in range(int(line[32:35]) + 1):
+                            skip_until = mm.find(b'\n', skip_until) + 1
+                            if skip_until == 0:
+                                skip_until = len(mm)
+                                break
+
+    nepochs = len(offset)
+    time = np.full([nepochs, 6], np.nan)
+    gpsTime = np.full(nepochs, np.nan)
+    epochFlag = np.zeros(nepochs, dtype=np.int8)
+    numSV = np.zeros(nepochs, dtype=np.int16)
+    for ep, line in enumerate(epoch_lines):
+        line = line.ljust(35)
+        if not line[31].isspace():
+            epochFlag[ep] = int(line[31])
+        if not line[32:35].isspace():
+            numSV[ep] = int(line[32:35])
+        ## -- Time stamp is optional for event flags > 1
+        date = [el for el in line[1:29].split(" ") if el != ""]
+        if len(date) == 6:
+            time[ep, :] = [float(el) for el in date]
+            week, tow = date2gpstime(int(time[ep,0]), int(time[ep,1]), int(time[ep,2]), int(time[ep,3]), int(time[ep,4]), time[ep,5])
+            gpsTime[ep] = week*604800 + tow
+
+    rinexObsIndex = {'offset': np.array(offset, dtype=np.int64),
+                     'time': time,
+                     'gpsTime': gpsTime,
+                     'epochFlag': epochFlag,
+                     'numSV': numSV,
+                     'fileSize': np.int64(file_size),
+                     'fileMtime': np.int64(file_mtime)}
+    return rinexObsIndex
+
+
+def saveRinexObsIndex(rinexObsIndex, indexFilename):
+    """
+    Function that stores epoch index in sidecar file. Failing to write the
+    file, ex. in a read-only directory, only gives a warning.
+    """
+    try:
+        with open(indexFilename, 'wb') as fid:
+            np.savez(fid, **rinexObsIndex)
+    except OSError:
+        print('WARNING(saveRinexObsIndex): Could not write index file %s' % indexFilename)
+
+
+def findEpochsInTimeWindow(rinexObsIndex, tStart=None, tEnd=None):
+    """
+    Function that finds the observation epochs of the index within a time window.
+    Blocks with event flags > 1 are not observation epochs and are left out.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    rinexObsIndex:    dict with the epoch index, see buildRinexObsIndex
+
+    tStart:           start of time window [YYYY, MM, DD, hh, mm, ss.sssssss].
+                      None means from first epoch
+
+    tEnd:             end of time window [YYYY, MM, DD, hh, mm, ss.sssssss].
+                      None means to last epoch
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    epochs:           array of index elements of the epochs within the time
+                      window, tStart <= t <= tEnd
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    in_window = rinexObsIndex['epochFlag'] <= 1
+    if tStart is not None:
+        week, tow = date2gpstime(int(tStart[0]), int(tStart[1]), int(tStart[2]), int(tStart[3]), int(tStart[4]), float(tStart[5]))
+        in_window = in_window & (rinexObsIndex['gpsTime'] >= week*604800 + tow)
+    if tEnd is not None:
+        week, tow = date2gpstime(int(tEnd[0]), int(tEnd[1]), int(tEnd[2]), int(tEnd[3]), int(tEnd[4]), float(tEnd[5]))
+        in_window = in_window & (rinexObsIndex['gpsTime'] <= week*604800 + tow)
+    epochs = np.nonzero(in_window)[0]
+    return epochs
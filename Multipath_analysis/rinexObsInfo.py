@@ -0,0 +1,229 @@
+import contextlib, glob, io, os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from readRinexObs import rinexReadObsFileHeader304, rinexReadObsFileHeader211, time_difference
+from rinexCompression import openRinexFile, getRinexCompression, readRinexSource, getRinexSourceName
+from rinexObsHatanaka import isCompactRinex
+from rinexObsIndex import getRinexObsIndex
+
+## -- Default filename patterns of RINEX observation files, compressed or not
+RINEX_OBS_PATTERNS = ['*.??o', '*.??O', '*.??d', '*.??D', '*.rnx', '*.crx', '*.RNX', '*.CRX']
+RINEX_COMPRESSION_EXTENSIONS = ['', '.gz', '.Z', '.bz2']
+
+
+def readRinexObsInfo(filename, useIndex=None):
+    """
+    Function that reads information about a RINEX 2 or 3 observation file
+    from its header only, without decoding the observations. Compressed and
+    compact RINEX (Hatanaka) files are supported, and only the start of the
+    file is decompressed.
+
+    The number of epochs is estimated from TIME OF FIRST OBS, TIME OF LAST
+    OBS and INTERVAL of the header. If useIndex = 1 the epoch index of RINEX
+    3 files is used instead, see rinexObsIndex.py. This scans the file once,
+    and stores the index next to the file, so that later reads with tStart,
+    tEnd or nWorkers can use it.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename:             RINEX observation filename, or content of the file
+                          in memory, see readRinexSource in rinexCompression.py
+
+    useIndex:             Boolean, 0 or 1. 1 = count epochs and find time span
+                          and interval from the epoch index of RINEX 3 files
+                          that are not compact RINEX. Default 0 (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    info:                 dict with the following fields. None if the header
+                          could not be read
+
+                          filename:       name of file
+                          rinexVersion:   RINEX version, string
+                          compression:    'gzip', 'bzip2', 'compress' or None
+                          compactRinex:   1 if compact RINEX (Hatanaka), 0 otherwise
+                          markerName:     name of antenna marker
+                          recType:        receiver type
+                          GNSSsystems:    list of GNSS systems, ex. ['G', 'R']
+                          obsCodes:       dict with list of obsCodes of each
+                                          GNSS system, ex. {'G': ['C1C', 'L1C']}
+                          tInterval:      observation interval; seconds. NaN if not known
+                          tFirstObs:      time of first observation
+                                          [YYYY, MM, DD, hh, mm, ss.sssssss]
+                          tLastObs:       time of last observation. NaN if not known
+                          duration:       seconds from first to last observation.
+                                          NaN if not known
+                          nepochs:        number of observation epochs. NaN if
+                                          not known
+                          epochsFromIndex: 1 if nepochs is counted from the
+                                          epoch index, 0 if estimated from header
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    if useIndex is None:
+        useIndex = 0
+
+    filename = readRinexSource(filename)
+    compression = getRinexCompression(filename)
+    compactRinex = int(isCompactRinex(filename))
+    with openRinexFile(filename) as fid:
+        line = fid.readline().rstrip()
+        ## -- Compact RINEX files start with two lines of their own
+        if 'CRINEX VERS' in line:
+            fid.readline()
+            line = fid.readline().rstrip()
+    rinexVersion = line[0:9].strip()
+
+    ## -- Read header of observation file. Messages of the header readers are not printed
+    headerError = None
+    with contextlib.redirect_stdout(io.StringIO()) as messages:
+        try:
+            if '2' in rinexVersion.split('.')[0]:
+                header = rinexReadObsFileHeader211(filename, 1, 1, [], [], [])
+            else:
+                header = rinexReadObsFileHeader304(filename, 1, 1, [], [], [])
+        except (ValueError, IndexError, KeyError) as error:
+            headerError = error
+            header = None
+    if header is None or type(header) is not tuple or header[0] == 0:
+        ## -- Error of the header readers, or their messages if they returned without success
+        reason = str(headerError) if headerError is not None else ' '.join(messages.getvalue().split())
+        print('ERROR(readRinexObsInfo): The header of %s could not be read. %s' % (getRinexSourceName(filename), reason))
+        return None
+    header[22].close()
+    [_, rinexVersion, _, markerName, recType, _, GNSSsystems, _, obsCodes, _, tFirstObs, tLastObs, tInterval] = header[0:13]
+    ## -- The header readers keep the label of the MARKER NAME line
+    markerName = str(markerName).replace('MARKER NAME', '').strip()
+    recType = str(recType).strip() if type(recType) is str else ''
+
+    tFirstObs = np.asarray(tFirstObs, dtype=float).ravel()
+    tLastObs = np.asarray(tLastObs, dtype=float).ravel()
+    nepochs = np.nan
+    epochsFromIndex = 0
+    if useIndex and '3' in rinexVersion.split('.')[0] and not compactRinex:
+        ## -- Observation epochs of index, ie. blocks with epoch flag 0 or 1
+        rinexObsIndex = getRinexObsIndex(filename)
+        epochs = np.flatnonzero(rinexObsIndex['epochFlag'] <= 1)
+        nepochs = len(epochs)
+        epochsFromIndex = 1
+        if nepochs > 0:
+            tFirstObs = rinexObsIndex['time'][epochs[0]]
+            tLastObs = rinexObsIndex['time'][epochs[-1]]
+        if nepochs > 1 and np.isnan(tInterval):
+            tInterval = float(np.median(np.diff(rinexObsIndex['gpsTime'][epochs])))
+
+    duration = np.nan
+    if len(tFirstObs) == 6 and len(tLastObs) == 6 and not np.any(np.isnan(tLastObs)) and not np.any(np.isnan(tFirstObs)):
+        duration = time_difference(tFirstObs, tLastObs)
+        if not epochsFromIndex and not np.isnan(tInterval) and tInterval > 0:
+            nepochs = int(np.floor(duration/tInterval)) + 1
+
+    info = {'filename': getRinexSourceName(filename),
+            'rinexVersion': str(rinexVersion).strip(),
+            'compression': compression,
+            'compactRinex': compactRinex,
+            'markerName': markerName,
+            'recType': recType,
+            'GNSSsystems': [GNSSsystems[k] for k in GNSSsystems],
+            'obsCodes': {GNSSsystems[k]: list(obsCodes[k][GNSSsystems[k]]) for k in GNSSsystems},
+            'tInterval': tInterval,
+            'tFirstObs': list(tFirstObs) if len(tFirstObs) == 6 else np.nan,
+            'tLastObs': list(tLastObs) if len(tLastObs) == 6 else np.nan,
+            'duration': duration,
+            'nepochs': nepochs,
+            'epochsFromIndex': epochsFromIndex}
+    return info
+
+
+def scanRinexObsDirectory(directory, patterns=None, recursive=None, useIndex=None, nWorkers=None, inventoryFilename=None):
+    """
+    Function that makes an inventory of the RINEX observation files in a
+    directory, ex. to plan batch runs over a large archive. The header of
+    every file is read by readRinexObsInfo, in nWorkers parallel processes.
+    Files with headers that can not be read are left out.
+
+    On platforms that start processes with 'spawn' (Windows, macOS) the script
+    calling this function must be protected by if __name__ == '__main__':
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    directory:            directory to scan
+
+    patterns:             list of filename patterns of observation files.
+                          Default: RINEX 2 and 3 observation and compact RINEX
+                          file names, compressed or not (optional)
+
+    recursive:            Boolean, 0 or 1. 1 = also scan subdirectories.
+                          Default 0 (optional)
+
+    useIndex:             as in readRinexObsInfo (optional)
+
+    nWorkers:             number of processes. Default: number of CPUs (optional)
+
+    inventoryFilename:    if given, the inventory is also stored in this
+                          CSV file (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    inventory:            pandas DataFrame with one row per observation file,
+                          sorted by filename, with the fields of
+                          readRinexObsInfo as columns. obsCodes are given as
+                          one string per file, ex. 'G: C1C L1C, R: C1C L1C'
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    if patterns is None:
+        patterns = [pattern + extension for pattern in RINEX_OBS_PATTERNS for extension in RINEX_COMPRESSION_EXTENSIONS]
+    if recursive is None:
+        recursive = 0
+    if useIndex is None:
+        useIndex = 0
+    if nWorkers is None:
+        nWorkers = os.cpu_count() or 1
+
+    ## -- Observation files matching any pattern
+    filenames = set()
+    for pattern in patterns:
+        if recursive:
+            filenames.update(glob.glob(os.path.join(directory, '**', pattern), recursive=True))
+        else:
+            filenames.update(glob.glob(os.path.join(directory, pattern)))
+    filenames = sorted([filename for filename in filenames if os.path.isfile(filename)])
+    columns = ['filename', 'rinexVersion', 'compression', 'compactRinex', 'markerName', 'recType', 'GNSSsystems', \
+               'obsCodes', 'tInterval', 'tFirstObs', 'tLastObs', 'duration', 'nepochs', 'epochsFromIndex']
+    if len(filenames) == 0:
+        print('INFO(scanRinexObsDirectory): No observation files were found in %s' % directory)
+        return pd.DataFrame(columns=columns)
+
+    jobs = [(filename, useIndex) for filename in filenames]
+    if nWorkers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(nWorkers, len(jobs))) as executor:
+            infos = list(executor.map(readRinexObsInfoJob, jobs, chunksize=max(len(jobs)//(8*nWorkers), 1)))
+    else:
+        infos = [readRinexObsInfoJob(job) for job in jobs]
+
+    ## -- One row per file. Lists are stored as strings, so the table can be stored as CSV
+    rows = []
+    for info in infos:
+        if info is None:
+            continue
+        info['GNSSsystems'] = ' '.join(info['GNSSsystems'])
+        info['obsCodes'] = ', '.join('%s: %s' % (sys, ' '.join(codes)) for sys, codes in info['obsCodes'].items())
+        rows.append(info)
+    inventory = pd.DataFrame(rows, columns=columns)
+    print('INFO(scanRinexObsDirectory): %d of %d observation files in %s were read' % (len(rows), len(filenames), directory))
+
+    if inventoryFilename is not None:
+        inventory.to_csv(inventoryFilename, index=False)
+    return inventory
+
+
+def readRinexObsInfoJob(job):
+    """
+    Worker of scanRinexObsDirectory. Errors of one file do not stop the scan.
+    """
+    filename, useIndex = job
+    try:
+        return readRinexObsInfo(filename, useIndex)
+    except (OSError, EOFError, ValueError) as error:
+        print('ERROR(scanRinexObsDirectory): %s could not be read. %s' % (filename, error))
+        return None
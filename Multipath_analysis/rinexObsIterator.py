@@ -0,0 +1,179 @@
+import numpy as np
+from Geodetic_functions import date2gpstime
+from readRinexObs import rinexReadObsFileHeader304, rinexReadObsBlockHead304, rinexReadObsBlock304
+from rinexCompression import openRinexFile, readRinexSource
+from rinexObsHatanaka import isCompactRinex
+
+
+def iterRinexObsEpochs(filename, readSS=None, readLLI=None, includeAllGNSSsystems=None, includeAllObsCodes=None, \
+                       desiredGNSSsystems=None, desiredObsCodes=None, desiredObsBands=None, tStart=None, tEnd=None):
+    """
+    Generator that reads a RINEX 3.xx observation file one epoch at a time.
+    Every observation block is read with rinexReadObsBlockHead304 and
+    rinexReadObsBlock304, as in readRinexObs304, and yielded before the
+    next block is read. Only one epoch is held in memory, so files of any
+    length can be scanned with constant memory.
+
+    The file is closed when the generator is exhausted, or when it is
+    closed or deleted by the caller, ex. by breaking out of a for-loop.
+
+    Example:
+        for epoch in iterRinexObsEpochs(filename, desiredGNSSsystems=['G']):
+            nSats = len(epoch['SVs']['G'])
+
+    ATTENTION: As rinexReadObsBlockHead304, ignores all data in blocks with
+    event flags with numbers greater than 1!!!
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename, readSS, readLLI,
+    includeAllGNSSsystems,
+    includeAllObsCodes,
+    desiredGNSSsystems,
+    desiredObsCodes,
+    desiredObsBands:          as in readRinexObs304
+
+    tStart:                   start of time window [YYYY, MM, DD, hh, mm, ss.sssssss].
+                              None means from first epoch (optional)
+
+    tEnd:                     end of time window [YYYY, MM, DD, hh, mm, ss.sssssss].
+                              None means to last epoch (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    Yields one dict per epoch, with the following keys:
+
+    epoch:                    epoch number, 1,2,... Counts epochs within the
+                              time window
+
+    date:                     time stamp of epoch [YYYY, MM, DD, hh, mm, ss.sssssss]
+
+    week, tow:                GPS-week and "time-of-week" of epoch, computed
+                              as time_epochs of readRinexObs304
+
+    epochFlag:                epoch flag of block, 0 or 1
+
+    clockOffset:              receiver clock offset of block
+
+    SVs:                      dict with an array of the PRN numbers of the
+                              satellites with observations, for each GNSS system
+
+    obs:                      dict with a matrix [nSats, numObsTypes] for
+                              each GNSS system, with one row for each
+                              satellite in SVs, in the same order
+
+    LLI, SS:                  dicts with matrices like obs, int8. Empty dicts
+                              if readLLI or readSS is 0
+
+    GNSSsystems, obsCodes:    header information as returned by readRinexObs304.
+                              The same objects are given in every epoch
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    ## -- Setting None arguments
+    if readSS is None:
+        readSS = 1
+    if readLLI is None:
+        readLLI = 1
+    if includeAllGNSSsystems is None:
+        includeAllGNSSsystems = 1
+    if includeAllObsCodes is None:
+        includeAllObsCodes = 1
+    if desiredGNSSsystems is None:
+        desiredGNSSsystems = ['G','R','E','C']
+    if desiredObsCodes is None:
+        desiredObsCodes = ['C','L','S','D']
+    if desiredObsBands is None:
+        desiredObsBands = list(np.arange(1,10))
+
+    ## -- Content of file-like objects is read into memory
+    filename = readRinexSource(filename)
+    with openRinexFile(filename) as fid:
+        rinexVersion = fid.readline()[0:9].strip()
+    if '2' in rinexVersion.split('.')[0]:
+        print('ERROR(iterRinexObsEpochs): Only RINEX 3 observation files are supported')
+        return
+    if isCompactRinex(filename):
+        print('ERROR(iterRinexObsEpochs): Compact RINEX files are not supported. Use iterCompactRinexBlocks in rinexObsHatanaka.py')
+        return
+
+    ## -- Read header of observation file
+    [success, _, _, _, _, _, GNSSsystems, numOfObsCodes, obsCodes, obsCodeIndex, _, _, _, \
+     _, _, _, _, _, _, _, _, _, fid] = \
+    rinexReadObsFileHeader304(filename, includeAllGNSSsystems, includeAllObsCodes, desiredGNSSsystems, desiredObsCodes, desiredObsBands)
+    if success == 0:
+        return
+
+    for k in GNSSsystems:
+        if GNSSsystems[k] not in ['G', 'R', 'E', 'C']:
+            print('ERROR(iterRinexObsEpochs): Only following GNSS systems are compatible with this program: GPS, GLONASS, Galileo, Beidou. %s is not valid' % GNSSsystems[k])
+            fid.close()
+            return
+
+    ## -- Time window in seconds since GPS time origin
+    tStart_sec = -np.inf
+    tEnd_sec = np.inf
+    if tStart is not None:
+        week, tow = date2gpstime(int(tStart[0]), int(tStart[1]), int(tStart[2]), int(tStart[3]), int(tStart[4]), float(tStart[5]))
+        tStart_sec = week*604800 + tow
+    if tEnd is not None:
+        week, tow = date2gpstime(int(tEnd[0]), int(tEnd[1]), int(tEnd[2]), int(tEnd[3]), int(tEnd[4]), float(tEnd[5]))
+        tEnd_sec = week*604800 + tow
+
+    current_epoch = 0
+    try:
+        while True:
+            ## Read Obs Block Header
+            success, epochFlag, clockOffset, date, numSV, eof = rinexReadObsBlockHead304(fid)
+            if success == 0 or eof == 1:
+                break
+
+            ## -- Read current block of observations
+            success, Obs, SVlist, numSV, LLI, SS, eof = rinexReadObsBlock304(fid, numSV, numOfObsCodes, GNSSsystems, obsCodeIndex, readSS, readLLI)
+            if success == 0 or eof == 1:
+                break
+
+            ## -- Check time window
+            t_sec = date2gpstime(int(date[0]), int(date[1]), int(date[2]), int(date[3]), int(date[4]), date[5])
+            t_sec = t_sec[0]*604800 + t_sec[1]
+            if t_sec < tStart_sec:
+                continue
+            if t_sec > tEnd_sec:
+                break
+            current_epoch = current_epoch + 1
+
+            ## Convert date to GPS-week and "time-of-week"
+            week, tow = date2gpstime(int(date[0]), int(date[1]), int(date[2]), int(date[3]), int(date[4]), int(date[5]))
+
+            ## -- Obs, LLI and SS of all satellites of epoch, one GNSS system at a time
+            epoch_obs = {}
+            epoch_LLI = {}
+            epoch_SS  = {}
+            epoch_SVs = {}
+            SV_systems = [SV[0] for SV in SVlist]
+            for k in np.arange(0, len(GNSSsystems)):
+                curr_sys = GNSSsystems[k+1]
+                nObsTypes_current_sys = int(numOfObsCodes[k])
+                sat_rows = [sat for sat in range(0, numSV) if SV_systems[sat] == curr_sys]
+                PRNs = np.array([int(SVlist[sat][1:3]) for sat in sat_rows], dtype=int)
+
+                epoch_SVs[curr_sys] = PRNs
+                epoch_obs[curr_sys] = Obs[sat_rows, 0:nObsTypes_current_sys]
+                if readLLI:
+                    epoch_LLI[curr_sys] = LLI[sat_rows, 0:nObsTypes_current_sys]
+                if readSS:
+                    epoch_SS[curr_sys] = SS[sat_rows, 0:nObsTypes_current_sys]
+
+            yield {'epoch': current_epoch,
+                   'date': date,
+                   'week': week,
+                   'tow': tow,
+                   'epochFlag': int(epochFlag),
+                   'clockOffset': clockOffset,
+                   'SVs': epoch_SVs,
+                   'obs': epoch_obs,
+                   'LLI': epoch_LLI,
+                   'SS': epoch_SS,
+                   'GNSSsystems': GNSSsystems,
+                   'obsCodes': obsCodes}
+    finally:
+        fid.close()
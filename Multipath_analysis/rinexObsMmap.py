@@ -0,0 +1,482 @@
+import numpy as np
+from prnColumnMap import assignPRNColumns, growSatColumns
+from rinexCompression import rinexFileBuffer, getRinexSourceName, getRinexSourceSize
+
+
+def rinexReadObsBlocksMmap304(filename, bodyOffset, maxEpochs, GNSSsystems, numOfObsCodes, obsCodeIndex, readSS, readLLI, \
+                              GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col, chunkSize=None, LLIcodeIndex=None):
+    """
+    Reads all observation blocks of a RINEX 3.xx observation file directly
+    from a memory mapped buffer. This is an alternative to reading the blocks
+    one at a time with rinexReadObsBlockHead304 and rinexReadObsBlock304.
+    Compressed files are decompressed into memory, see rinexFileBuffer.
+    Lines are never made into Python strings. The file is processed in chunks
+    of whole lines, and every chunk is decoded with array operations into
+    the observation arrays. The memory used is therefore the decoded arrays
+    plus the work arrays of one chunk.
+
+    ATTENTION: As rinexReadObsBlockHead304, ignores all data in blocks with
+    event flags with numbers greater than 1!!!
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename:             RINEX observation filename, or content of the
+                          file in memory, see readRinexSource in
+                          rinexCompression.py
+
+    bodyOffset:           byte offset in file of first observation block.
+                          None = first line after END OF HEADER
+
+    maxEpochs:            max number of epochs to read. np.inf = all epochs
+
+    GNSSsystems:          dict containing codes of GNSS systems to be read
+                          ex. {1: 'G', 2: 'R'}
+
+    numOfObsCodes:        number of observation types to be read for each
+                          GNSS system. Order is the same as GNSSsystems
+
+    obsCodeIndex:         dict with an array of indices for each GNSS system,
+                          indicating the observation types of the system
+                          that should be read
+
+    readSS:               Boolean, 0 or 1. 1 = read "Signal Strength" Indicators
+
+    readLLI:              Boolean, 0 or 1. 1 = read "Loss-Of-Lock Indicators"
+
+    GNSS_obs, GNSS_LLI,
+    GNSS_SS, GNSS_SVs:    dicts with preallocated arrays for each GNSS system,
+                          as in readRinexObs304. The arrays are filled, and
+                          doubled in size if more epochs are found than
+                          they have room for. Satellites are given columns
+                          as they are found, and the arrays are grown if
+                          there is no room. The dicts are updated in place.
+
+    PRN2col:              dict with the PRN-to-column map of each GNSS
+                          system, see prnColumnMap.py. Updated in place
+
+    chunkSize:            approximate number of bytes to decode at a time.
+                          Default 32 MB (optional)
+
+    LLIcodeIndex:         dict with the indices of the observation types to
+                          read "Loss-Of-Lock Indicators" of for each GNSS
+                          system, see getLLIcodeIndex in readRinexObs.py.
+                          The indicators of other observation types are
+                          left 0. None = all (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    success:              Boolean. 1 if the function seems to be successful,
+                          0 otherwise
+
+    nepochs:              number of epochs read
+
+    epoch_dates:          matrix [nepochs x 6] with time stamp of each epoch
+                          [YYYY, MM, DD, hh, mm, ss.sssssss]
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    if chunkSize is None:
+        chunkSize = 32*1024**2
+
+    success = 1
+    nepochs = 0
+    epoch_dates = np.zeros([0,6])
+    if getRinexSourceSize(filename) == 0:
+        return success, nepochs, epoch_dates
+
+    nGNSSsystems = len(GNSSsystems)
+    date_columns = [(2,6), (7,9), (10,12), (13,15), (16,18), (18,29)] # '> yyyy mm dd hh mm ss.sssssss  f nnn'
+    epoch_dates = []
+
+    with rinexFileBuffer(filename) as mm:
+        file_size = len(mm)
+        if bodyOffset is None:
+            end_of_header = mm.find(b'END OF HEADER')
+            if end_of_header == -1:
+                print('ERROR(rinexReadObsBlocksMmap304): END OF HEADER was not found in %s' % getRinexSourceName(filename))
+                success = 0
+                return success, nepochs, np.zeros([0,6])
+            bodyOffset = mm.find(b'\n', end_of_header) + 1
+            if bodyOffset == 0:
+                bodyOffset = file_size
+
+        buf = np.frombuffer(mm, dtype=np.uint8)
+        chunk = None
+        try:
+            chunk_start = bodyOffset
+            lines_to_skip = 0 # special records of event flags, can continue into next chunk
+            last_epoch_read = 0 # satellites of last epoch to read can continue into next chunk
+            while chunk_start < file_size and not last_epoch_read:
+                ## -- Chunk of whole lines
+                chunk_end = min(chunk_start + chunkSize, file_size)
+                if chunk_end < file_size:
+                    last_newline = mm.rfind(b'\n', chunk_start, chunk_end)
+                    chunk_end = last_newline + 1 if last_newline != -1 else mm.find(b'\n', chunk_end) + 1 or file_size
+                chunk = buf[chunk_start:chunk_end]
+
+                ## -- Start and length of all lines in chunk, without line endings
+                line_ends = np.flatnonzero(chunk == ord('\n'))
+                if len(line_ends) == 0 or line_ends[-1] != len(chunk) - 1:
+                    line_ends = np.append(line_ends, len(chunk))
+                line_starts = np.append(0, line_ends[:-1] + 1)
+                has_cr = (line_ends > line_starts) & (chunk[np.maximum(line_ends - 1, 0)] == ord('\r'))
+                line_lengths = line_ends - line_starts - has_cr
+                nlines = len(line_starts)
+
+                first_char = np.where(line_lengths > 0, chunk[np.minimum(line_starts, len(chunk) - 1)], ord(' '))
+                is_epoch = first_char == ord('>')
+
+                ## -- Epoch flags. Flags > 1 are followed by special records that are skipped
+                flag_char = getChars(chunk, line_starts, line_lengths, 31)
+                epoch_flag = np.where((flag_char >= ord('0')) & (flag_char <= ord('9')), flag_char.astype(int) - ord('0'), 0)
+                is_event = is_epoch & (epoch_flag > 1)
+                skip_line = np.zeros(nlines, dtype=bool)
+                skip_line[0:min(lines_to_skip, nlines)] = True
+                lines_to_skip = max(lines_to_skip - nlines, 0)
+                for line in np.flatnonzero(is_event):
+                    numRecords = decodeInts(chunk, line_starts[[line]], line_lengths[[line]], 32, 3)[0]
+                    skip_line[line+1:line+1+numRecords] = True
+                    lines_to_skip = max(lines_to_skip, line + 1 + numRecords - nlines)
+                is_epoch = is_epoch & ~is_event & ~skip_line
+
+                ## -- Epoch number of every line
+                epoch_of_line = nepochs + np.cumsum(is_epoch) - 1
+                epoch_lines = np.flatnonzero(is_epoch & (epoch_of_line < maxEpochs))
+                n_new_epochs = len(epoch_lines)
+                last_epoch_read = np.any(is_epoch & (epoch_of_line >= maxEpochs))
+
+                ## -- Time stamps of epochs
+                if n_new_epochs > 0:
+                    new_dates = np.zeros([n_new_epochs, 6])
+                    for col, (first, last) in enumerate(date_columns):
+                        new_dates[:, col] = decodeFloats(chunk, line_starts[epoch_lines], line_lengths[epoch_lines], first, last - first)
+                    epoch_dates.append(new_dates)
+
+                ## -- Double the size of the buffers if they are full
+                capacity = len(GNSS_SVs[GNSSsystems[1]])
+                while nepochs + n_new_epochs > capacity:
+                    for curr_sys in GNSS_obs:
+                        GNSS_obs[curr_sys] = np.concatenate((GNSS_obs[curr_sys], np.zeros_like(GNSS_obs[curr_sys])), axis=0)
+                        GNSS_SVs[curr_sys] = np.concatenate((GNSS_SVs[curr_sys], np.zeros_like(GNSS_SVs[curr_sys])), axis=0)
+                        if readLLI:
+                            GNSS_LLI[curr_sys] = np.concatenate((GNSS_LLI[curr_sys], np.zeros_like(GNSS_LLI[curr_sys])), axis=0)
+                        if readSS:
+                            GNSS_SS[curr_sys] = np.concatenate((GNSS_SS[curr_sys], np.zeros_like(GNSS_SS[curr_sys])), axis=0)
+                    capacity = 2*capacity
+
+                ## -- Satellite lines, decoded one GNSS system at a time
+                is_sat = ~is_epoch & ~is_event & ~skip_line & (epoch_of_line >= 0) & (epoch_of_line < maxEpochs) & (line_lengths > 0)
+                for k in np.arange(0, nGNSSsystems):
+                    curr_sys = GNSSsystems[k+1]
+                    sat_lines = np.flatnonzero(is_sat & (first_char == ord(curr_sys)))
+                    if len(sat_lines) == 0:
+                        continue
+                    starts = line_starts[sat_lines]
+                    lengths = line_lengths[sat_lines]
+                    epochs = epoch_of_line[sat_lines]
+                    PRNs = decodeInts(chunk, starts, lengths, 1, 2)
+
+                    ## -- Number of satellites with obs, and their PRN numbers, for each epoch.
+                    ## -- First epoch of chunk can have satellites in previous chunk
+                    first_sat_of_epoch = np.searchsorted(epochs, epochs)
+                    sat_num = GNSS_SVs[curr_sys][epochs, 0].astype(int) + np.arange(len(sat_lines)) - first_sat_of_epoch + 1
+
+                    ## -- Columns of the satellites. Arrays are grown if new satellites are found
+                    cols = assignPRNColumns(PRN2col[curr_sys], PRNs)
+                    growSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, max(PRN2col[curr_sys].max(), sat_num.max()) + 1, readLLI, readSS)
+                    GNSS_SVs[curr_sys][epochs, sat_num] = PRNs
+                    epochs_with_sats, n_sats = np.unique(epochs, return_counts=True)
+                    GNSS_SVs[curr_sys][epochs_with_sats, 0] = GNSS_SVs[curr_sys][epochs_with_sats, 0] + n_sats
+
+                    ## -- Observations, LLI and SS
+                    nObsTypes_current_sys = int(numOfObsCodes[k])
+                    for obs_num in np.arange(0, nObsTypes_current_sys):
+                        charPos = 4 + int(obsCodeIndex[k+1][obs_num])*16
+                        GNSS_obs[curr_sys][epochs, cols, obs_num] = decodeFloats(chunk, starts, lengths, charPos, 14)
+                        if readLLI and (LLIcodeIndex is None or obs_num in LLIcodeIndex[k+1]):
+                            GNSS_LLI[curr_sys][epochs, cols, obs_num] = decodeIndicators(chunk, starts, lengths, charPos + 13)
+                        if readSS:
+                            GNSS_SS[curr_sys][epochs, cols, obs_num] = decodeIndicators(chunk, starts, lengths, charPos + 14)
+
+                nepochs = nepochs + n_new_epochs
+                chunk_start = chunk_end
+
+        finally:
+            ## -- Views of the mapped file must be released before it is closed
+            del buf, chunk
+
+    if len(epoch_dates) > 0:
+        epoch_dates = np.concatenate(epoch_dates, axis=0)
+    else:
+        epoch_dates = np.zeros([0,6])
+    return success, nepochs, epoch_dates
+
+
+def rinexReadObsBlocksMmap211(filename, GNSSsystems, numOfObsCodes, obsCodeIndex, readSS, readLLI, \
+                              GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col, chunkSize=None):
+    """
+    Reads all observation blocks of a RINEX 2.xx observation file directly
+    from a memory mapped buffer. This is an alternative to reading the blocks
+    one at a time with rinexReadObsBlockHead211 and rinexReadObsBlock211.
+
+    In RINEX 2 the satellites of an epoch are listed in the epoch line, with
+    continuation lines for more than 12 satellites, and the observations of
+    a satellite are wrapped over several lines for more than 5 observation
+    types. The lines of an epoch are therefore found from the epoch line.
+    Only the epoch lines are visited one at a time. The satellite lists and
+    observations of all epochs of a chunk are decoded with array operations,
+    as in rinexReadObsBlocksMmap304.
+
+    ATTENTION: As rinexReadObsBlockHead211, ignores all data in blocks with
+    event flags with numbers greater than 1!!!
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename:             RINEX observation filename, or content of the
+                          file in memory, see readRinexSource in
+                          rinexCompression.py
+
+    GNSSsystems, numOfObsCodes,
+    obsCodeIndex, readSS,
+    readLLI:              as in rinexReadObsBlocksMmap304. The same
+                          observation types are read for all GNSS systems
+
+    GNSS_obs, GNSS_LLI,
+    GNSS_SS, GNSS_SVs,
+    PRN2col:              as in rinexReadObsBlocksMmap304. Updated in place
+
+    chunkSize:            approximate number of bytes to decode at a time.
+                          Default 32 MB (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    success:              Boolean. 1 if the function seems to be successful,
+                          0 otherwise
+
+    nepochs:              number of epochs read
+
+    epoch_dates:          matrix [nepochs x 6] with time stamp of each epoch
+                          [YYYY, MM, DD, hh, mm, ss.sssssss]
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    if chunkSize is None:
+        chunkSize = 32*1024**2
+
+    success = 1
+    nepochs = 0
+    epoch_dates = []
+    if getRinexSourceSize(filename) == 0:
+        return success, nepochs, np.zeros([0,6])
+
+    nGNSSsystems = len(GNSSsystems)
+    ## -- Indices of observation types to read. RINEX 2 has one list of types for all GNSS systems
+    obsIndex = np.asarray(obsCodeIndex[list(obsCodeIndex.keys())[0]], dtype=int)
+    date_columns = [(1,3), (4,6), (7,9), (10,12), (13,15), (15,26)] # ' yy mm dd hh mm ss.sssssss  f nnn'
+
+    with rinexFileBuffer(filename) as mm:
+        file_size = len(mm)
+        end_of_header = mm.find(b'END OF HEADER')
+        types_of_obs = mm.find(b'# / TYPES OF OBSERV', 0, max(end_of_header, 0))
+        if end_of_header == -1 or types_of_obs == -1:
+            print('ERROR(rinexReadObsBlocksMmap211): END OF HEADER or # / TYPES OF OBSERV was not found in %s' % getRinexSourceName(filename))
+            success = 0
+            return success, nepochs, np.zeros([0,6])
+        bodyOffset = mm.find(b'\n', end_of_header) + 1
+        if bodyOffset == 0:
+            bodyOffset = file_size
+        ## -- Total number of observation types in file, and lines with observations of each satellite
+        line_start = mm.rfind(b'\n', 0, types_of_obs) + 1
+        nObsTypes = int(mm[line_start:line_start+6])
+        nObsLines = max(int(np.ceil(nObsTypes/5)), 1)
+
+        buf = np.frombuffer(mm, dtype=np.uint8)
+        chunk = None
+        try:
+            chunk_start = bodyOffset
+            current_chunkSize = chunkSize
+            while chunk_start < file_size:
+                ## -- Chunk of whole lines
+                chunk_end = min(chunk_start + current_chunkSize, file_size)
+                if chunk_end < file_size:
+                    last_newline = mm.rfind(b'\n', chunk_start, chunk_end)
+                    chunk_end = last_newline + 1 if last_newline != -1 else mm.find(b'\n', chunk_end) + 1 or file_size
+                at_eof = chunk_end == file_size
+                chunk = buf[chunk_start:chunk_end]
+                chunk_bytes = mm[chunk_start:chunk_end]
+
+                ## -- Start and length of all lines in chunk, without line endings. One empty line is
+                ## -- added, used for lines missing at the end of the file
+                line_ends = np.flatnonzero(chunk == ord('\n'))
+                if len(line_ends) == 0 or line_ends[-1] != len(chunk) - 1:
+                    line_ends = np.append(line_ends, len(chunk))
+                line_starts = np.append(0, line_ends[:-1] + 1)
+                has_cr = (line_ends > line_starts) & (chunk[np.maximum(line_ends - 1, 0)] == ord('\r'))
+                line_lengths = line_ends - line_starts - has_cr
+                nlines = len(line_starts)
+                line_starts = np.append(line_starts, 0)
+                line_lengths = np.append(line_lengths, 0)
+
+                ## -- Find epoch lines. Number of satellites gives the number of lines of the epoch
+                epoch_lines = []
+                epoch_nSV = []
+                line = 0
+                next_chunk_line = nlines
+                while line < nlines:
+                    start = line_starts[line]
+                    length = line_lengths[line]
+                    if length == 0:
+                        line = line + 1 # empty line between epochs
+                        continue
+                    try:
+                        epochFlag = int(chunk_bytes[start+28:start+29].strip() or b'0')
+                        numSV = int(chunk_bytes[start+29:start+32])
+                    except ValueError:
+                        print('ERROR(rinexReadObsBlocksMmap211): Epoch line expected at byte %d of %s' % (chunk_start + start, getRinexSourceName(filename)))
+                        success = 0
+                        break
+                    nHeadLines = max(int(np.ceil(numSV/12)), 1)
+                    if epochFlag > 1 and epochFlag != 6:
+                        nEpochLines = 1 + numSV # special records
+                    else:
+                        nEpochLines = nHeadLines + numSV*nObsLines
+                    if line + nEpochLines > nlines and not at_eof:
+                        next_chunk_line = line # epoch continues into next chunk
+                        break
+                    if epochFlag <= 1:
+                        epoch_lines.append(line)
+                        epoch_nSV.append(numSV)
+                    line = line + nEpochLines
+
+                if next_chunk_line == 0 and not at_eof:
+                    ## -- Chunk is smaller than one epoch
+                    current_chunkSize = 2*current_chunkSize
+                    continue
+                epoch_lines = np.array(epoch_lines, dtype=int)
+                epoch_nSV = np.array(epoch_nSV, dtype=int)
+                n_new_epochs = len(epoch_lines)
+
+                if n_new_epochs > 0:
+                    ## -- Time stamps of epochs. Two-digit years 80-99 are 1980-1999
+                    new_dates = np.zeros([n_new_epochs, 6])
+                    for col, (first, last) in enumerate(date_columns):
+                        new_dates[:, col] = decodeFloats(chunk, line_starts[epoch_lines], line_lengths[epoch_lines], first, last - first)
+                    new_dates[:, 0] = np.where(new_dates[:, 0] < 80, 2000, 1900) + new_dates[:, 0]
+                    epoch_dates.append(new_dates)
+
+                    ## -- Double the size of the buffers if they are full
+                    capacity = len(GNSS_SVs[GNSSsystems[1]])
+                    while nepochs + n_new_epochs > capacity:
+                        for curr_sys in GNSS_obs:
+                            GNSS_obs[curr_sys] = np.concatenate((GNSS_obs[curr_sys], np.zeros_like(GNSS_obs[curr_sys])), axis=0)
+                            GNSS_SVs[curr_sys] = np.concatenate((GNSS_SVs[curr_sys], np.zeros_like(GNSS_SVs[curr_sys])), axis=0)
+                            if readLLI:
+                                GNSS_LLI[curr_sys] = np.concatenate((GNSS_LLI[curr_sys], np.zeros_like(GNSS_LLI[curr_sys])), axis=0)
+                            if readSS:
+                                GNSS_SS[curr_sys] = np.concatenate((GNSS_SS[curr_sys], np.zeros_like(GNSS_SS[curr_sys])), axis=0)
+                        capacity = 2*capacity
+
+                    ## -- Satellite k of an epoch is listed in head line k//12 of epoch, at column 32+3*(k%12).
+                    ## -- Its observations start at line nHeadLines + k*nObsLines of epoch
+                    sat_epoch = np.repeat(np.arange(n_new_epochs), epoch_nSV)
+                    sat_num = np.arange(len(sat_epoch)) - np.repeat(np.cumsum(epoch_nSV) - epoch_nSV, epoch_nSV)
+                    id_lines = np.minimum(epoch_lines[sat_epoch] + sat_num//12, nlines)
+                    id_starts = line_starts[id_lines] + 32 + 3*(sat_num % 12)
+                    id_lengths = line_lengths[id_lines] - 32 - 3*(sat_num % 12)
+                    sat_system = getChars(chunk, id_starts, id_lengths, 0)
+                    sat_system[sat_system == ord(' ')] = ord('G') # blank system identifier is GPS
+                    PRNs = decodeInts(chunk, id_starts, id_lengths, 1, 2)
+                    nHeadLines = np.maximum(np.ceil(epoch_nSV/12).astype(int), 1)
+                    obs_lines = epoch_lines[sat_epoch] + nHeadLines[sat_epoch] + sat_num*nObsLines
+
+                    for k in np.arange(0, nGNSSsystems):
+                        curr_sys = GNSSsystems[k+1]
+                        sats = np.flatnonzero(sat_system == ord(curr_sys))
+                        if len(sats) == 0:
+                            continue
+                        epochs = nepochs + sat_epoch[sats]
+
+                        ## -- Number of satellites with obs, and their PRN numbers, for each epoch
+                        first_sat_of_epoch = np.searchsorted(epochs, epochs)
+                        sys_sat_num = np.arange(len(sats)) - first_sat_of_epoch + 1
+                        cols = assignPRNColumns(PRN2col[curr_sys], PRNs[sats])
+                        growSatColumns(GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, curr_sys, max(PRN2col[curr_sys].max(), sys_sat_num.max()) + 1, readLLI, readSS)
+                        GNSS_SVs[curr_sys][epochs, sys_sat_num] = PRNs[sats]
+                        epochs_with_sats, n_sats = np.unique(epochs, return_counts=True)
+                        GNSS_SVs[curr_sys][epochs_with_sats, 0] = n_sats
+
+                        ## -- Observations, LLI and SS. Observation type i is at line i//5, column 16*(i%5).
+                        ## -- As in rinexReadObsBlock211, the observation is decoded from characters 1-14
+                        for obs_num in np.arange(0, min(int(numOfObsCodes[k]), len(obsIndex))):
+                            lines = np.minimum(obs_lines[sats] + obsIndex[obs_num]//5, nlines)
+                            starts = line_starts[lines] + 16*(obsIndex[obs_num] % 5)
+                            lengths = line_lengths[lines] - 16*(obsIndex[obs_num] % 5)
+                            GNSS_obs[curr_sys][epochs, cols, obs_num] = decodeFloats(chunk, starts, lengths, 1, 14)
+                            if readLLI:
+                                GNSS_LLI[curr_sys][epochs, cols, obs_num] = decodeIndicators(chunk, starts, lengths, 14)
+                            if readSS:
+                                GNSS_SS[curr_sys][epochs, cols, obs_num] = decodeIndicators(chunk, starts, lengths, 15)
+
+                nepochs = nepochs + n_new_epochs
+                if success == 0:
+                    break
+                chunk_start = chunk_start + (int(line_starts[next_chunk_line]) if next_chunk_line < nlines else len(chunk))
+                current_chunkSize = chunkSize
+
+        finally:
+            ## -- Views of the mapped file must be released before it is closed
+            del buf, chunk
+
+    if len(epoch_dates) > 0:
+        epoch_dates = np.concatenate(epoch_dates, axis=0)
+    else:
+        epoch_dates = np.zeros([0,6])
+    return success, nepochs, epoch_dates
+
+
+def getChars(chunk, starts, lengths, pos):
+    """
+    Returns the character at position pos of each line as uint8. Lines shorter than
+    pos+1 give space, as for a line padded with spaces.
+    """
+    chars = chunk[np.minimum(starts + pos, len(chunk) - 1)]
+    return np.where(lengths > pos, chars, ord(' ')).astype(np.uint8)
+
+
+def getFields(chunk, starts, lengths, pos, width):
+    """
+    Returns matrix [nlines x width] of uint8 with the characters pos to pos+width
+    of each line. Characters after end of line are set to space.
+    """
+    offsets = pos + np.arange(width)
+    fields = chunk[np.minimum(starts[:,None] + offsets[None,:], len(chunk) - 1)]
+    return np.where(offsets[None,:] < lengths[:,None], fields, ord(' ')).astype(np.uint8)
+
+
+def decodeFloats(chunk, starts, lengths, pos, width):
+    """
+    Decodes the fixed width field pos to pos+width of each line to float.
+    Blank fields are set to 0.
+    """
+    fields = getFields(chunk, starts, lengths, pos, width)
+    missing = np.all(fields == ord(' '), axis=1)
+    values = np.zeros(len(starts))
+    values[~missing] = np.ascontiguousarray(fields[~missing]).view('S%d' % width)[:,0].astype(float)
+    return values
+
+
+def decodeInts(chunk, starts, lengths, pos, width):
+    """
+    Decodes the fixed width integer field pos to pos+width of each line.
+    Spaces count as 0.
+    """
+    fields = getFields(chunk, starts, lengths, pos, width).astype(int)
+    digits = np.where(fields == ord(' '), 0, fields - ord('0'))
+    return digits @ (10**np.arange(width - 1, -1, -1))
+
+
+def decodeIndicators(chunk, starts, lengths, pos):
+    """
+    Decodes the LLI or SS character at position pos of each line to int8.
+    Missing indicators are set to -1.
+    """
+    chars = getChars(chunk, starts, lengths, pos)
+    return np.where(chars == ord(' '), -1, chars.astype(np.int8) - ord('0')).astype(np.int8)
@@ -0,0 +1,135 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from rinexObsMmap import rinexReadObsBlocksMmap304
+from prnColumnMap import newPRN2ColumnMap
+
+
+def rinexReadObsBlocksParallel304(filename, rinexObsIndex, epochs, nWorkers, GNSSsystems, numOfObsCodes, obsCodeIndex, \
+                                  readSS, readLLI, GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col, LLIcodeIndex=None):
+    """
+    Reads the observation blocks of a RINEX 3.xx observation file in parallel.
+    The epochs to read are split into nWorkers chunks of consecutive epochs.
+    Every chunk starts at the byte offset of an epoch block head, found from
+    the epoch index, and is decoded by rinexReadObsBlocksMmap304 in a separate
+    process. Blocks with event flags > 1, and their special records, are
+    never used as chunk start and are skipped by the process reading the
+    chunk they are in. The arrays of the chunks are merged in epoch order,
+    with the satellite columns of all chunks ordered by PRN number.
+
+    On platforms that start processes with 'spawn' (Windows, macOS) the script
+    calling this function must be protected by if __name__ == '__main__':
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    filename:             RINEX observation filename
+
+    rinexObsIndex:        dict with the epoch index, see rinexObsIndex.py
+
+    epochs:               array of index elements of the epochs to read. Must
+                          be consecutive observation epochs, ex. from
+                          findEpochsInTimeWindow
+
+    nWorkers:             number of processes
+
+    GNSSsystems, numOfObsCodes,
+    obsCodeIndex, readSS,
+    readLLI:              as in rinexReadObsBlocksMmap304
+
+    GNSS_obs, GNSS_LLI,
+    GNSS_SS, GNSS_SVs:    dicts of arrays for each GNSS system, as in
+                          readRinexObs304. The arrays are replaced by arrays
+                          with the observations of all epochs. The dicts
+                          are updated in place.
+
+    PRN2col:              dict with the PRN-to-column map of each GNSS
+                          system, see prnColumnMap.py. Replaced by the map
+                          of the merged arrays
+
+    LLIcodeIndex:         as in rinexReadObsBlocksMmap304 (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    success:              Boolean. 1 if the function seems to be successful,
+                          0 otherwise
+
+    nepochs:              number of epochs read
+
+    epoch_dates:          matrix [nepochs x 6] with time stamp of each epoch
+                          [YYYY, MM, DD, hh, mm, ss.sssssss]
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    chunks = [chunk for chunk in np.array_split(epochs, max(int(nWorkers), 1)) if len(chunk) > 0]
+    jobs = [(filename, int(rinexObsIndex['offset'][chunk[0]]), len(chunk), GNSSsystems, numOfObsCodes, obsCodeIndex, \
+             readSS, readLLI, LLIcodeIndex) for chunk in chunks]
+
+    with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+        results = list(executor.map(readRinexObsChunk304, jobs))
+
+    success = int(all([result[0] for result in results]))
+    nepochs = sum([result[1] for result in results])
+    epoch_dates = np.concatenate([result[2] for result in results], axis=0)
+
+    ## -- Merge chunks in epoch order. Every chunk has its own satellite columns,
+    ## -- the merged arrays have the satellites of all chunks in order of PRN
+    for curr_sys in GNSS_obs:
+        PRNs = np.flatnonzero(np.any([result[7][curr_sys] for result in results], axis=0))
+        PRN2col[curr_sys][:] = 0
+        PRN2col[curr_sys][PRNs] = np.arange(1, len(PRNs) + 1)
+        nCols = len(PRNs) + 1
+        nSVCols = max([result[6][curr_sys].shape[1] for result in results] + [nCols])
+
+        GNSS_obs[curr_sys] = np.zeros([nepochs, nCols, GNSS_obs[curr_sys].shape[2]])
+        GNSS_SVs[curr_sys] = np.zeros([nepochs, nSVCols])
+        if readLLI:
+            GNSS_LLI[curr_sys] = np.zeros([nepochs, nCols, GNSS_LLI[curr_sys].shape[2]], dtype=np.int8)
+        if readSS:
+            GNSS_SS[curr_sys] = np.zeros([nepochs, nCols, GNSS_SS[curr_sys].shape[2]], dtype=np.int8)
+
+        first_epoch = 0
+        for result in results:
+            chunk_PRN2col = result[7][curr_sys]
+            chunk_PRNs = np.flatnonzero(chunk_PRN2col)
+            chunk_cols = np.append(0, chunk_PRN2col[chunk_PRNs])
+            cols = np.append(0, PRN2col[curr_sys][chunk_PRNs])
+            epochs = np.arange(first_epoch, first_epoch + result[1])
+            GNSS_obs[curr_sys][epochs[:, None], cols] = result[3][curr_sys][0:result[1], chunk_cols]
+            GNSS_SVs[curr_sys][epochs, 0:result[6][curr_sys].shape[1]] = result[6][curr_sys][0:result[1]]
+            if readLLI:
+                GNSS_LLI[curr_sys][epochs[:, None], cols] = result[4][curr_sys][0:result[1], chunk_cols]
+            if readSS:
+                GNSS_SS[curr_sys][epochs[:, None], cols] = result[5][curr_sys][0:result[1], chunk_cols]
+            first_epoch = first_epoch + result[1]
+
+    return success, nepochs, epoch_dates
+
+
+def readRinexObsChunk304(job):
+    """
+    Worker of rinexReadObsBlocksParallel304. Decodes nepochs epochs starting
+    at byte offset bodyOffset into arrays of its own.
+    """
+    filename, bodyOffset, nepochs, GNSSsystems, numOfObsCodes, obsCodeIndex, readSS, readLLI, LLIcodeIndex = job
+
+    GNSS_obs = {}
+    GNSS_LLI = {}
+    GNSS_SS  = {}
+    GNSS_SVs = {}
+    PRN2col  = {}
+    for k in np.arange(0, len(GNSSsystems)):
+        curr_sys = GNSSsystems[k+1]
+        PRN2col[curr_sys] = newPRN2ColumnMap()
+        GNSS_obs[curr_sys] = np.zeros([nepochs, 1, int(numOfObsCodes[k])])
+        GNSS_SVs[curr_sys] = np.zeros([nepochs, 1])
+        if readLLI:
+            GNSS_LLI[curr_sys] = np.zeros([nepochs, 1, int(numOfObsCodes[k])], dtype=np.int8)
+        if readSS:
+            GNSS_SS[curr_sys] = np.zeros([nepochs, 1, int(numOfObsCodes[k])], dtype=np.int8)
+
+    success, nepochs_read, epoch_dates = rinexReadObsBlocksMmap304(filename, bodyOffset, nepochs, GNSSsystems, numOfObsCodes, \
+                                              obsCodeIndex, readSS, readLLI, GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col, \
+                                              LLIcodeIndex=LLIcodeIndex)
+    if nepochs_read != nepochs:
+        print('ERROR(readRinexObsChunk304): %d epochs were read from byte %d, expected %d' % (nepochs_read, bodyOffset, nepochs))
+        success = 0
+
+    return success, nepochs_read, epoch_dates, GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, PRN2col
@@ -0,0 +1,188 @@
+import os
+import numpy as np
+from Geodetic_functions import date2gpstime, gpstime2date
+from prnColumnMap import getObservedPRNs, getMaxSat
+
+
+def checkRinexObsCompatibility(result, refResult, filename, refFilename):
+    """
+    Function that checks that the observations read from two RINEX
+    observation files of one session can be merged. The GNSS systems,
+    observation codes and observation interval must be the same, and the
+    GLONASS slot numbers found in both files must have the same channels.
+    A different marker name only gives a warning.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    result, refResult:    outputs of readRinexObs of the two files, with denseObs = 1
+
+    filename,
+    refFilename:          names of the two files, used in messages
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    success:              Boolean. 1 if the files can be merged, 0 otherwise
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    success = 1
+    name = os.path.basename(filename)
+    refName = os.path.basename(refFilename)
+    GNSSsystems, obsCodes, tInterval, markerName = result[6], result[7], result[10], result[11]
+    GLO_Slot2ChannelMap = result[23]
+
+    if GNSSsystems != refResult[6]:
+        print('ERROR(checkRinexObsCompatibility): The GNSS systems of %s (%s) differ from those of %s (%s)' \
+              % (name, ', '.join(GNSSsystems.values()), refName, ', '.join(refResult[6].values())))
+        return 0
+    for k in GNSSsystems:
+        curr_sys = GNSSsystems[k]
+        if list(obsCodes[k][curr_sys]) != list(refResult[7][k][curr_sys]):
+            print('ERROR(checkRinexObsCompatibility): The %s observation codes of %s (%s) differ from those of %s (%s)' \
+                  % (curr_sys, name, ', '.join(obsCodes[k][curr_sys]), refName, ', '.join(refResult[7][k][curr_sys])))
+            success = 0
+    if not np.isnan(tInterval) and not np.isnan(refResult[10]) and abs(tInterval - refResult[10]) > 1e-6:
+        print('ERROR(checkRinexObsCompatibility): The observation interval of %s (%g s) differs from that of %s (%g s)' \
+              % (name, tInterval, refName, refResult[10]))
+        success = 0
+    if isinstance(GLO_Slot2ChannelMap, dict) and isinstance(refResult[23], dict):
+        slots = [slot for slot in GLO_Slot2ChannelMap if slot in refResult[23] and GLO_Slot2ChannelMap[slot] != refResult[23][slot]]
+        if len(slots) > 0:
+            print('ERROR(checkRinexObsCompatibility): The GLONASS channels of slots %s in %s differ from those in %s' \
+                  % (', '.join(str(slot) for slot in slots), name, refName))
+            success = 0
+    if markerName != refResult[11]:
+        print('WARNING(checkRinexObsCompatibility): The marker name of %s (%s) differs from that of %s (%s)' \
+              % (name, str(markerName).strip(), refName, str(refResult[11]).strip()))
+    return success
+
+
+def mergeRinexObs(results, filenames, tStart=None, tEnd=None):
+    """
+    Function that merges the observations read from the RINEX observation
+    files of one session into one continuous set of arrays, as if they were
+    read from one file. The files must be given in order of time. Epochs of
+    a file that are not after the last epoch of the previous files, ie.
+    epochs of overlapping files, are left out, so every epoch is kept only
+    once. The satellite columns of all files are merged, in order of PRN.
+    --------------------------------------------------------------------------------------------------------------------------
+    INPUTS
+
+    results:              list with the output of readRinexObs of each
+                          file, with denseObs = 1
+
+    filenames:            list of the names of the files
+
+    tStart, tEnd:         time window to keep [YYYY, MM, DD, hh, mm, ss.sssssss].
+                          None = from first epoch/to last epoch (optional)
+    --------------------------------------------------------------------------------------------------------------------------
+    OUTPUTS
+
+    result:               tuple with the same outputs as readRinexObs with
+                          denseObs = 1. Header information is that of the
+                          first file, except that tLastObs is that of the
+                          last file, and that GLO_Slot2ChannelMap contains
+                          the slots of all files. None if the files can not
+                          be merged
+    --------------------------------------------------------------------------------------------------------------------------
+    """
+    ref = results[0]
+    for k in range(1, len(results)):
+        if not checkRinexObsCompatibility(results[k], ref, filenames[k], filenames[0]):
+            return None
+
+    ## -- Epochs to keep of each file. Times are seconds since GPS time origin
+    keep = []
+    last_time = -np.inf
+    first_time_prev = -np.inf
+    for k, result in enumerate(results):
+        time_epochs = np.asarray(result[4]).reshape(-1, 2) if result[5] > 0 else np.zeros([0,2])
+        t = time_epochs[:,0]*604800 + time_epochs[:,1]
+        if len(t) > 0 and t[0] < first_time_prev:
+            print('ERROR(mergeRinexObs): The observation files must be given in order of time. %s starts before %s' \
+                  % (os.path.basename(filenames[k]), os.path.basename(filenames[k-1])))
+            return None
+        if len(t) > 0:
+            first_time_prev = t[0]
+        in_session = t > last_time
+        if np.sum(~in_session) > 0:
+            print('INFO(mergeRinexObs): %d epochs of %s overlap the previous files and are left out' \
+                  % (np.sum(~in_session), os.path.basename(filenames[k])))
+        if tStart is not None:
+            week, tow = date2gpstime(int(tStart[0]), int(tStart[1]), int(tStart[2]), int(tStart[3]), int(tStart[4]), float(tStart[5]))
+            in_session = in_session & (t >= week*604800 + tow)
+        if tEnd is not None:
+            week, tow = date2gpstime(int(tEnd[0]), int(tEnd[1]), int(tEnd[2]), int(tEnd[3]), int(tEnd[4]), float(tEnd[5]))
+            in_session = in_session & (t <= week*604800 + tow)
+        if len(t) > 0:
+            last_time = max(last_time, t.max())
+        keep.append(np.flatnonzero(in_session))
+    nepochs = int(sum(len(epochs) for epochs in keep))
+    if nepochs == 0:
+        print('ERROR(mergeRinexObs): There are no observation epochs in the session')
+        return None
+
+    GNSSsystems = ref[6]
+    GNSS_obs = {}
+    GNSS_LLI = {}
+    GNSS_SS = {}
+    GNSS_SVs = {}
+    max_sat = np.zeros([len(GNSSsystems), 1])
+    for k in GNSSsystems:
+        curr_sys = GNSSsystems[k]
+        readLLI = isinstance(ref[1][curr_sys], np.ndarray)
+        readSS = isinstance(ref[2][curr_sys], np.ndarray)
+
+        ## -- Satellites of the kept epochs of all files, in order of PRN
+        PRNs = np.unique(np.concatenate([getObservedPRNs(result[3][curr_sys][epochs]) for result, epochs in zip(results, keep)]))
+        max_sat[k-1] = getMaxSat(curr_sys, PRNs)
+        nObsCodes = ref[0][curr_sys].shape[2]
+        nSVcols = max([result[3][curr_sys].shape[1] for result in results] + [len(PRNs) + 1])
+        GNSS_obs[curr_sys] = np.zeros([nepochs, len(PRNs) + 1, nObsCodes])
+        GNSS_SVs[curr_sys] = np.zeros([nepochs, nSVcols])
+        GNSS_LLI[curr_sys] = np.zeros([nepochs, len(PRNs) + 1, nObsCodes], dtype=np.int8) if readLLI else np.nan
+        GNSS_SS[curr_sys] = np.zeros([nepochs, len(PRNs) + 1, nObsCodes], dtype=np.int8) if readSS else np.nan
+
+        ## -- Copy kept epochs of each file into the columns of its satellites
+        first_epoch = 0
+        for result, epochs in zip(results, keep):
+            rows = np.arange(first_epoch, first_epoch + len(epochs))
+            first_epoch = first_epoch + len(epochs)
+            ## -- Columns of the file are its satellites in order of PRN. Satellites
+            ## -- only observed in left out epochs have no observations to copy
+            file_PRNs = getObservedPRNs(result[3][curr_sys])
+            in_session = np.isin(file_PRNs, PRNs)
+            file_cols = np.append(0, 1 + np.flatnonzero(in_session))
+            cols = np.append(0, 1 + np.searchsorted(PRNs, file_PRNs[in_session]))
+            SVs = result[3][curr_sys]
+            GNSS_SVs[curr_sys][rows, 0:SVs.shape[1]] = SVs[epochs]
+            GNSS_obs[curr_sys][rows[:,None], cols[None,:]] = result[0][curr_sys][epochs][:, file_cols]
+            if readLLI:
+                GNSS_LLI[curr_sys][rows[:,None], cols[None,:]] = result[1][curr_sys][epochs][:, file_cols]
+            if readSS:
+                GNSS_SS[curr_sys][rows[:,None], cols[None,:]] = result[2][curr_sys][epochs][:, file_cols]
+
+        ## -- GNSS_SVs has one column more than the max number of satellites, as in sortSatColumns
+        GNSS_SVs[curr_sys] = GNSS_SVs[curr_sys][:, 0:max(int(GNSS_SVs[curr_sys][:,0].max()), len(PRNs)) + 1].copy()
+
+    time_epochs = np.concatenate([np.asarray(result[4]).reshape(-1, 2)[epochs] for result, epochs in zip(results, keep) if len(epochs) > 0], axis=0)
+
+    ## -- GLONASS slots of all files
+    GLO_Slot2ChannelMap = ref[23]
+    for result in results[1:]:
+        if isinstance(result[23], dict):
+            GLO_Slot2ChannelMap = {**result[23], **GLO_Slot2ChannelMap} if isinstance(GLO_Slot2ChannelMap, dict) else dict(result[23])
+
+    ## -- Time of first and last observation of session
+    tFirstObs = ref[20]
+    tLastObs = results[-1][21]
+    if tStart is not None or tEnd is not None:
+        tFirstObs = np.round(np.array(gpstime2date(time_epochs[0,0], time_epochs[0,1])), 7).reshape(6,1)
+        tLastObs = np.round(np.array(gpstime2date(time_epochs[-1,0], time_epochs[-1,1])), 7).reshape(6,1)
+
+    result = list(ref)
+    result[0:6] = [GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs]
+    result[9] = max_sat
+    result[20] = tFirstObs
+    result[21] = tLastObs
+    result[23] = GLO_Slot2ChannelMap
+    return tuple(result)
@@ -58,22 +58,23 @@ def signalAnalysis(currentGNSSsystem, range1_Code, range2_Code, GNSSsystems, fre
       current_GNSS_obs:            3D matrix  containing all observation of 
                                    current GNSS system for all epochs. 
                                    Order of obsType index is same order as in 
-                                   current_obsCodes
+                                   current_obsCodes. One column per satellite
+                                   with observations, see getPRN2ColumnMap
     
-                                   current_GNSS_obs(PRN, obsType, epoch)
-                                               PRN: int
-                                               ObsType: int: 1,2,...,numObsTypes
+                                   current_GNSS_obs[epoch, col, obsType]
                                                epoch: int
+                                               col: int
+                                               ObsType: int: 0,1,...,numObsTypes-1
     
       current_GNSS_LLI:             3D matrix  containing all Loss of Lock 
                                     indicators of current GNSS system for all epochs. 
                                     Order of obsType index is same order as in 
-                                    current_obsCodes
+                                    current_obsCodes. int8, -1 if indicator is blank
     
-                                    current_GNSS_LLI(PRN, obsType, epoch)
-                                                PRN: int
-                                                ObsType: int: 1,2,...,numObsTypes
+                                    current_GNSS_LLI[epoch, col, obsType]
                                                 epoch: int
+                                                col: int
+                                                ObsType: int: 0,1,...,numObsTypes-1
     
     current_sat_elevation_angles:  matrix contaning satellite elevation angles 
                                    at each epoch, for current GNSS system. 
@@ -105,6 +106,7 @@ def signalAnalysis(currentGNSSsystem, range1_Code, range2_Code, GNSSsystems, fre
     from estimateSignalDelays import estimateSignalDelays
     from getLLISlipPeriods import getLLISlipPeriods
     from computeDelayStats import computeDelayStats
+    from prnColumnMap import getPRN2ColumnMap
     import numpy as np
     
     ## --Get corrosponding phase codes to the range codes
@@ -171,12 +173,10 @@ def signalAnalysis(currentGNSSsystem, range1_Code, range2_Code, GNSSsystems, fre
       currentStats = np.nan
       return currentStats
     
-    ## -- Compute slips from LLI in rinex file
-    max_sat = len(current_GNSS_obs[1])
-    LLI_current_phase =  np.zeros([nepochs,max_sat]) ## sjekk hvordan LLI beeregnes. Skal være 1 i øvserste raden for mange av satellittene
-    for ep in np.arange(0, nepochs):
-        LLI_current_dum = np.array(current_GNSS_LLI[ep+1][:,ismember(current_obsCodes[currentGNSSsystem],phase1_Code)]).reshape(1, len(current_GNSS_LLI[ep+1][:,ismember(current_obsCodes[currentGNSSsystem],phase1_Code)]))
-        LLI_current_phase[ep,:] = np.squeeze(LLI_current_dum)
+    ## -- Compute slips from LLI in rinex file. Columns of satellites are mapped to PRN, 
+    ## -- PRN without observations get the unused column 0
+    PRN2col, _ = getPRN2ColumnMap(current_GNSS_SVs, current_max_sat)
+    LLI_current_phase = current_GNSS_LLI[0:nepochs, :, ismember(current_obsCodes[currentGNSSsystem],phase1_Code)][:, PRN2col] ## sjekk hvordan LLI beeregnes. Skal være 1 i øvserste raden for mange av satellittene
 
     LLI_slip_periods = getLLISlipPeriods(LLI_current_phase)
    
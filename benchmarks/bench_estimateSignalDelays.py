@@ -0,0 +1,354 @@
+"""
+Regression benchmark of estimateSignalDelays on the RINEX 3 test file
+TestData/ObservationFiles/OPEC00_20100010000.10o (GPS and GLONASS, 24 h,
+30 s interval, 2880 epochs), for every pair of code observations, with phase
+observations, on different bands, ex. GPS C1C/C2W and C2W/C1C.
+
+estimateSignalDelays is compared with referenceEstimateSignalDelays, the
+function as it was before range1_observations and phase1_observations were
+taken as a column slice of GNSS_obs. The reference detects and corrects
+slips one PRN at a time, and rebuilds both observation matrices with
+ismember for every PRN. All outputs, ie. delay estimates, slip periods and
+observation matrices, must be equal. The run time of both functions is
+reported.
+
+Usage:
+
+    python benchmarks/bench_estimateSignalDelays.py [nRepeats]
+"""
+import os, sys, time, contextlib, io
+import numpy as np
+
+base_path = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.insert(0, os.path.join(base_path, 'Multipath_analysis'))
+from readRinexObs import readRinexObs
+from readFrequencyOverview import readFrequencyOverview
+from prnColumnMap import getPRN2ColumnMap
+from estimateSignalDelays import estimateSignalDelays, ismember
+
+rinObsFilename = os.path.join(base_path, 'TestData', 'ObservationFiles', 'OPEC00_20100010000.10o')
+frequencyOverviewFilename = os.path.join(base_path, 'Multipath_analysis', 'Rinex_Frequency_Overview.txt')
+
+
+def referenceEstimateSignalDelays(range1_Code, range2_Code,phase1_Code, phase2_Code, carrier_freq1, \
+                                  carrier_freq2, nepochs, max_sat, GNSS_SVs, obsCodes, GNSS_obs, \
+                                  currentGNSSsystem, tInterval, phaseCodeLimit, ionLimit):
+    """
+    estimateSignalDelays with the per-PRN loops of slip detection and
+    correction, and of range1 and phase1 observations. Same inputs and
+    outputs as estimateSignalDelays.
+    """
+    FDMA_used = 0
+    success = 1
+
+    if 'R' in currentGNSSsystem:
+        FDMA_used = 1
+        carrier_freq1_list = carrier_freq1
+        carrier_freq2_list = carrier_freq2
+    else:
+        alpha = carrier_freq1**2/carrier_freq2**2 # amplfication factor
+
+    c = 299792458 # speed of light
+
+    if ionLimit ==0:
+        ionLimit = 4/60   # critical rate of change of ionosphere delay  to indicate ambiguity slip on either
+
+
+    if phaseCodeLimit == 0:
+        phaseCodeLimit = 4/60*100   # critical rate of change of
+
+    ## -- Initialize cell for storing phase slip periods
+    ambiguity_slip_periods = {}
+    ## -- Initialize cell for storing slip periods for only range1/phase1
+
+    range1_slip_periods = {}
+
+    ## -- Column of each PRN in GNSS_obs. PRN without observations get the unused column 0
+    PRN2col, _ = getPRN2ColumnMap(GNSS_SVs, max_sat)
+    PRN2col = PRN2col[0:max_sat+1]
+
+    ## -- Index of each observation type in GNSS_obs
+    obsIndex = [ismember(obsCodes[currentGNSSsystem], code) for code in [range1_Code, range2_Code, phase1_Code, phase2_Code]]
+    if [] in obsIndex:
+        print('ERROR(estimateSignalDelays): There is no observation type %s. Check for missing data in RINEX observation file!' \
+              % ([code for code, indx in zip([range1_Code, range2_Code, phase1_Code, phase2_Code], obsIndex) if indx == []][0]))
+        success = 0
+        return np.array([]), np.array([]), range1_slip_periods, ambiguity_slip_periods, np.array([]), np.array([]), success
+
+    ## -- Carrier frequencies and amplification factor of each PRN
+    if FDMA_used:
+        carrier_freq1 = np.full(max_sat+1, np.nan)
+        carrier_freq2 = np.full(max_sat+1, np.nan)
+        n_freq = min(len(carrier_freq1_list), max_sat+1)
+        carrier_freq1[0:n_freq] = carrier_freq1_list[0:n_freq]
+        carrier_freq2[0:n_freq] = carrier_freq2_list[0:n_freq]
+        alpha = carrier_freq1**2/carrier_freq2**2 # amplfication factor
+
+    ## -- Mask of epochs and PRN with observations, ie. PRN listed in GNSS_SVs for the epoch
+    n_sat = GNSS_SVs[0:nepochs, 0].astype(int)
+    epoch_PRNs = GNSS_SVs[0:nepochs, 1:].astype(int)
+    listed = np.arange(epoch_PRNs.shape[1]) < n_sat[:, None]
+    observed = np.zeros([nepochs, max_sat+1], dtype=bool)
+    observed[np.nonzero(listed)[0], epoch_PRNs[listed]] = True
+
+    ## -- Get observations of all epochs and PRN. Column PRN of these matrices is satellite PRN
+    range1 = GNSS_obs[0:nepochs, PRN2col, obsIndex[0]]
+    range2 = GNSS_obs[0:nepochs, PRN2col, obsIndex[1]]
+    phase1 = GNSS_obs[0:nepochs, PRN2col, obsIndex[2]]*c/carrier_freq1
+    phase2 = GNSS_obs[0:nepochs, PRN2col, obsIndex[3]]*c/carrier_freq2
+
+    ## -- If any of the four observations are missing, ie 0, estimate remains 0 for that epoch and satellite
+    complete = observed & (range1 != 0) & (range2 != 0) & (phase1 != 0) & (phase2 != 0)
+    range1_complete = observed & (range1 != 0) & (phase1 != 0)
+
+    ## -- Calculate estimate for Ionospheric delay on phase 1 signal, and multipath on first code signal
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ion_delay_phase1 = np.where(complete, 1/(alpha-1)*(phase1-phase2), 0)
+        multipath_range1 = np.where(complete, range1 - (1 + 2/(alpha-1))*phase1 + (2/(alpha-1))*phase2, 0)
+    N1_pseudo_estimate = np.where(range1_complete, phase1 - range1, 0)
+
+    ## Flag epochs and PRN as missing obs
+    missing_obs_overview = (observed & ~complete)*1.0
+    missing_range1_overview = (observed & ~range1_complete)*1.0
+
+    ## -- Detect and correct for ambiguity slips
+    for PRN in np.arange(0,max_sat):
+        PRN = PRN + 1
+        ## -- Get first and last epoch with observations for current PRN
+        if len(np.nonzero(ion_delay_phase1[:,PRN])[0]) != 0:
+            epoch_first_obs = np.nonzero(ion_delay_phase1[:,PRN])[0][0]
+            epoch_last_obs = np.nonzero(ion_delay_phase1[:,PRN])[0][-1]
+        else:
+            epoch_first_obs = np.nonzero(ion_delay_phase1[:,PRN])[0]
+            epoch_last_obs = np.nonzero(ion_delay_phase1[:,PRN])[0]
+
+
+        ## -- Get first and last epoch with range 1 observations for current PRN
+        if len(np.nonzero(N1_pseudo_estimate[:,PRN])[0]) != 0:
+            epoch_first_range1obs =  np.nonzero(N1_pseudo_estimate[:,PRN])[0][0]
+            epoch_last_range1obs =  np.nonzero(N1_pseudo_estimate[:,PRN])[0][-1]
+        else:
+            epoch_first_range1obs =  np.nonzero(N1_pseudo_estimate[:,PRN])[0]
+            epoch_last_range1obs =  np.nonzero(N1_pseudo_estimate[:,PRN])[0]
+
+
+        ## -- Run function to detect cycle slips for current epoch for range1/phase1 only
+        range1_slip_epochs = referenceDetectCycleSlips(N1_pseudo_estimate[:, PRN], missing_range1_overview[:, PRN],epoch_first_range1obs, epoch_last_range1obs, tInterval, phaseCodeLimit)
+
+        ionosphere_slip_epochs = referenceDetectCycleSlips(ion_delay_phase1[:, PRN], missing_obs_overview[:, PRN],epoch_first_obs, epoch_last_obs, tInterval, ionLimit)
+
+        ## -- Make combined array of slip epochs from both lin. combinations used to detects slips
+        ambiguity_slip_epochs = np.union1d(range1_slip_epochs, ionosphere_slip_epochs)
+        range1_slip_epochs = range1_slip_epochs #tester om det gir stor forskjell uten intersect
+
+        ## -- Organize slips detected on range1/phase1 signal only
+        range1_slip_periods[PRN],_ = referenceOrgSlipEpochs(range1_slip_epochs)
+
+        ## -- Orginize combined slips detected on range1/phase1 signal only
+        ambiguity_slip_periods[PRN], n_slip_periods = referenceOrgSlipEpochs(ambiguity_slip_epochs)
+
+        ion_delay_phase1[ion_delay_phase1[:, PRN]==0, PRN] = np.nan
+        multipath_range1[multipath_range1[:, PRN]==0, PRN] = np.nan
+
+        ## If there are no slips then there is only one "ambiguity period". All estimates are therefore reduced by the same relative value
+        if len(ambiguity_slip_periods[PRN]) == 0:
+            if epoch_first_obs.size == 0: # added 18.02.2023 because of error when running on RINEX v2 (should be like this either way!)
+                pass
+            else:
+                ion_delay_phase1[epoch_first_obs::, PRN] = ion_delay_phase1[epoch_first_obs::, PRN] - ion_delay_phase1[epoch_first_obs, PRN]
+                multipath_range1[epoch_first_obs::, PRN] = multipath_range1[epoch_first_obs::, PRN] - np.nanmean(multipath_range1[epoch_first_obs::, PRN])
+
+        else:
+            ## -- Set all estimates of epochs with cycle slips to nan
+            for slip_period in np.arange(0,n_slip_periods):
+                slip_start   = int(ambiguity_slip_periods[PRN][slip_period,0])
+                slip_end     = int(ambiguity_slip_periods[PRN][slip_period,1])
+
+                if slip_start == slip_end:  # need a if test bacause if there equal, python dont set to nan
+                    ion_delay_phase1[slip_start, PRN] = np.nan
+                    multipath_range1[slip_start, PRN] = np.nan
+                else:
+                    ion_delay_phase1[slip_start:slip_end+1, PRN] = np.nan # + 1 because a[2:3] gives one element. Matlab a(2:3) gives 2 element.
+                    multipath_range1[slip_start:slip_end+1, PRN] = np.nan # if error msg here, try add "if slip_end != epoch_last_obs else epoch_last_obs" in the slicing (oneliner)
+
+
+            ## Extract start and end of each segment and correct multipath and ionosphere estimates for each segment
+            for ambiguity_period in np.arange(0,n_slip_periods+1): # removed + 1 cause of indexproblem 29.11
+                if ambiguity_period == 0:
+                    ambiguity_period_start  = epoch_first_obs
+                    ambiguity_period_end    = int(ambiguity_slip_periods[PRN][0,0])   #INK -1 igjen???
+                ## -- If last ambiguity period
+                elif ambiguity_period == n_slip_periods: # removed + 1
+                    ambiguity_period_start       = int(ambiguity_slip_periods[PRN][-1,1] + 1)
+                    ambiguity_period_end         = epoch_last_obs +1
+
+                    ## If last epoch with observation is a slip, then there is no  last ambiguity period
+                    if ambiguity_period_start > epoch_last_obs:
+                        ambiguity_period_start = []
+                        ambiguity_period_end = []
+
+                else:
+                    ambiguity_period_start = int(ambiguity_slip_periods[PRN][ambiguity_period-1, 1] + 1)
+                    ambiguity_period_end   = int(ambiguity_slip_periods[PRN][ambiguity_period, 0])
+
+
+                ## -- Ionosphere delay estimates of current ambiguity period is reduced by first estimate of ambiguity period
+                if ambiguity_period_start != ambiguity_period_end:
+                    ion_delay_phase1[ambiguity_period_start:ambiguity_period_end, PRN] = ion_delay_phase1[ambiguity_period_start:ambiguity_period_end, PRN] - \
+                        ion_delay_phase1[ambiguity_period_start, PRN]
+
+                    ## -- Multipath delays of current ambiguity period are reduced by mean of estimates in ambiguity period, excluding NaN and
+                    multipath_range1[ambiguity_period_start:ambiguity_period_end, PRN] = multipath_range1[ambiguity_period_start:ambiguity_period_end, PRN] - \
+                        np.nanmean(multipath_range1[ambiguity_period_start:ambiguity_period_end, PRN]) # added nanmean 30.11
+
+                else:
+
+                    ion_delay_phase1[ambiguity_period_start, PRN] = ion_delay_phase1[ambiguity_period_start, PRN] - \
+                        ion_delay_phase1[ambiguity_period_start, PRN]
+                    ## -- Multipath delays of current ambiguity period are reduced by mean of estimates in ambiguity period, excluding NaN and
+                    multipath_range1[ambiguity_period_start, PRN] = multipath_range1[ambiguity_period_start, PRN] - \
+                        np.nanmean(multipath_range1[ambiguity_period_start, PRN])
+
+
+        ## -- Get range1 and phase 1 observations for all epochs and PRN
+        range1_observations =  np.zeros([nepochs, max_sat+1])
+        phase1_observations =  np.zeros([nepochs, max_sat+1])
+        for ep in np.arange(0, len(GNSS_obs)):
+            for PRN in np.arange(0,max_sat+1):
+                range1_observations[ep,PRN] = GNSS_obs[ep, PRN2col[PRN], ismember(obsCodes[currentGNSSsystem],range1_Code)]
+                phase1_observations[ep,PRN] = GNSS_obs[ep, PRN2col[PRN], ismember(obsCodes[currentGNSSsystem],phase1_Code)]
+
+    return ion_delay_phase1, multipath_range1, range1_slip_periods,ambiguity_slip_periods, range1_observations, phase1_observations, success #removed multipath_range2
+
+
+def referenceDetectCycleSlips(estimates, missing_obs_overview,epoch_first_obs, epoch_last_obs, tInterval, crit_slip_rate):
+    """
+    Epochs with cycle slips of one PRN, as detectCycleSlips before slips
+    were detected for all PRN at once.
+    """
+    slips_from_missing_obs = []
+    estimates_rate_of_change = np.diff(estimates)/tInterval
+    slips_from_crit_rate =  [idx for idx,val in enumerate(estimates_rate_of_change) if abs(val) > crit_slip_rate]
+    if type(epoch_first_obs) !=np.ndarray and type(epoch_last_obs) != np.ndarray:
+        slips_from_missing_obs = (np.where(missing_obs_overview[epoch_first_obs:epoch_last_obs] == 1) + epoch_first_obs)[0].tolist()
+    if len(slips_from_missing_obs) != 0:
+        slip_epochs = np.array(sorted(set(slips_from_crit_rate + slips_from_missing_obs)))
+    else:
+        slip_epochs = np.array(sorted(set(slips_from_crit_rate)))
+    return slip_epochs
+
+
+def referenceOrgSlipEpochs(slip_epochs):
+    """
+    Slip periods [start, end] of one PRN and their number, as orgSlipEpochs
+    before slip periods were found for all PRN at once.
+    """
+    if len(slip_epochs) != 0:
+        dummy = (np.diff(slip_epochs) != 1) * 1
+        dummy2 = np.where(dummy==1)
+        slip_period_ends = np.append(slip_epochs[dummy2], np.array([slip_epochs[-1]]))
+        n_slip_periods = np.sum(dummy) + 1
+        slip_periods = np.zeros([n_slip_periods,2])
+        slip_periods[:,1] = slip_period_ends
+        slip_periods[0,0] = slip_epochs[0]
+        for k in range(1,n_slip_periods):
+            indx = [x+1 for x, val in enumerate(slip_epochs) if val == slip_periods[k-1, 1]]
+            if len(indx) != 0:
+                indx = indx[0]
+                slip_periods[k, 0] = slip_epochs[indx]
+    else:
+        slip_periods = []
+        n_slip_periods = 0
+    return slip_periods, n_slip_periods
+
+
+def getSignalPairs(rinObsFilename, frequencyOverviewFilename):
+    """
+    Reads the observation file, and returns the arguments of
+    estimateSignalDelays for every pair of code observations with phase
+    observations on different bands, as a list of tuples
+    (GNSS system, range1_Code, range2_Code, arguments).
+    """
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        rinexObs = readRinexObs(rinObsFilename, denseObs=1)
+        frequencyOverview, _, _ = readFrequencyOverview(frequencyOverviewFilename)
+    [GNSS_obs, _, _, GNSS_SVs, _, nepochs, GNSSsystems, obsCodes, _, max_sat, tInterval] = rinexObs[0:11]
+    GLO_Slot2ChannelMap = rinexObs[23]
+    frequencyOverview = dict(zip(['G', 'R', 'E', 'C'], frequencyOverview.values()))
+
+    signalPairs = []
+    for k, curr_sys in GNSSsystems.items():
+        ## -- GLONASS carrier frequencies of every satellite, as in GNSS_MultipathAnalysis
+        if curr_sys == 'R':
+            frequencies = np.full([9, 37], np.nan)
+            for band in np.arange(0, 9):
+                for slot in GLO_Slot2ChannelMap:
+                    frequencies[band, slot] = frequencyOverview['R'][band, 0] + GLO_Slot2ChannelMap[slot]*frequencyOverview['R'][band, 1]
+        else:
+            frequencies = frequencyOverview[curr_sys][:, 0]
+        codes = [code for code in obsCodes[k][curr_sys] if code[0] == 'C' and 'L' + code[1:] in obsCodes[k][curr_sys]]
+        for range1_Code in codes:
+            for range2_Code in codes:
+                if range1_Code[1] == range2_Code[1]:
+                    continue
+                args = (range1_Code, range2_Code, 'L' + range1_Code[1:], 'L' + range2_Code[1:], \
+                        frequencies[int(range1_Code[1])-1], frequencies[int(range2_Code[1])-1], nepochs, \
+                        int(max_sat[k-1][0]), GNSS_SVs[curr_sys], obsCodes[k], GNSS_obs[curr_sys], curr_sys, tInterval, 0, 0)
+                signalPairs.append((curr_sys, range1_Code, range2_Code, args))
+    return signalPairs
+
+
+def compareOutputs(outputs, referenceOutputs):
+    """
+    Returns list of names of the outputs of estimateSignalDelays that differ
+    from the reference. NaN are equal. Slip periods are compared as arrays
+    of [start, end] rows for every PRN.
+    """
+    names = ['ion_delay_phase1', 'multipath_range1', 'range1_slip_periods', 'ambiguity_slip_periods', \
+             'range1_observations', 'phase1_observations', 'success']
+    differences = []
+    for name, output, referenceOutput in zip(names, outputs, referenceOutputs):
+        if isinstance(referenceOutput, dict):
+            equal = output.keys() == referenceOutput.keys() and \
+                all(np.array_equal(np.asarray(output[PRN], dtype=float).reshape(-1, 2), \
+                                   np.asarray(referenceOutput[PRN], dtype=float).reshape(-1, 2)) for PRN in referenceOutput)
+        else:
+            equal = np.array_equal(output, referenceOutput, equal_nan=isinstance(output, np.ndarray))
+        if not equal:
+            differences.append(name)
+    return differences
+
+
+if __name__ == '__main__':
+    nRepeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    signalPairs = getSignalPairs(rinObsFilename, frequencyOverviewFilename)
+    failed = 0
+    total, referenceTotal = 0, 0
+    for curr_sys, range1_Code, range2_Code, args in signalPairs:
+        ## -- The observation matrix is copied for every run, in case it is changed
+        t = time.time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            referenceOutputs = referenceEstimateSignalDelays(*(args[:10] + (args[10].copy(),) + args[11:]))
+        referenceElapsed = time.time() - t
+        ## -- Best of nRepeats runs
+        elapsed = []
+        for _ in range(nRepeats):
+            t = time.time()
+            with contextlib.redirect_stdout(io.StringIO()):
+                outputs = estimateSignalDelays(*(args[:10] + (args[10].copy(),) + args[11:]))
+            elapsed.append(time.time() - t)
+        total += min(elapsed)
+        referenceTotal += referenceElapsed
+
+        differences = compareOutputs(outputs, referenceOutputs)
+        if differences:
+            failed = 1
+            print('ERROR(bench_estimateSignalDelays): %s %s/%s differs from reference: %s' \
+                  % (curr_sys, range1_Code, range2_Code, ', '.join(differences)))
+        print('INFO(bench_estimateSignalDelays): %s %s/%s: reference %.3f seconds, estimateSignalDelays %.3f seconds, speed-up %.0fx' \
+              % (curr_sys, range1_Code, range2_Code, referenceElapsed, min(elapsed), referenceElapsed/min(elapsed)))
+    print('INFO(bench_estimateSignalDelays): Total of %d signal pairs: reference %.3f seconds, estimateSignalDelays %.3f seconds, speed-up %.0fx' \
+          % (len(signalPairs), referenceTotal, total, referenceTotal/total))
+    if failed:
+        sys.exit(1)
+    print('INFO(bench_estimateSignalDelays): All outputs are equal to the reference')
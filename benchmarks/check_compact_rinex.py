@@ -0,0 +1,58 @@
+"""
+Check of the compact RINEX (Hatanaka) reader on the files in
+TestData/ObservationFiles/CompactRinex. These are one hour of the OPEC test
+file, 12:00-12:59:30, as RINEX 2.11 and RINEX 3.04, and the same files
+compressed by RNX2CRX ver.4.1.0. The observations, LLI, SS, satellites and
+epochs decoded from every compact RINEX file must equal those decoded from
+its RINEX file, by both text readers of readRinexObs.
+
+Usage:
+
+    python benchmarks/check_compact_rinex.py
+"""
+import os, sys, contextlib, io
+import numpy as np
+
+base_path = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.insert(0, os.path.join(base_path, 'Multipath_analysis'))
+from readRinexObs import readRinexObs
+
+fixture_path = os.path.join(base_path, 'TestData', 'ObservationFiles', 'CompactRinex')
+## -- RINEX file and compact RINEX file of same observations
+filePairs = [('OPEC00_20100011200_rinex2.10o', 'OPEC00_20100011200_rinex2.10d'),
+             ('OPEC00_20100011200_rinex3.10o', 'OPEC00_20100011200_rinex3.crx')]
+
+
+def compareRinexObs(rinexObs, compactObs):
+    """
+    Returns list of names of the outputs of readRinexObs that differ. NaN
+    are equal.
+    """
+    [GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs, time_epochs, nepochs, GNSSsystems] = rinexObs[0:7]
+    differences = []
+    if nepochs != compactObs[5] or GNSSsystems != compactObs[6]:
+        return ['nepochs/GNSSsystems']
+    if not np.array_equal(time_epochs, compactObs[4]):
+        differences.append('time_epochs')
+    for i, name in enumerate(['GNSS_obs', 'GNSS_LLI', 'GNSS_SS', 'GNSS_SVs']):
+        for curr_sys in GNSSsystems.values():
+            if not np.array_equal([GNSS_obs, GNSS_LLI, GNSS_SS, GNSS_SVs][i][curr_sys], compactObs[i][curr_sys], equal_nan=True):
+                differences.append('%s[%s]' % (name, curr_sys))
+    return differences
+
+
+if __name__ == '__main__':
+    failed = 0
+    for rinexFilename, compactFilename in filePairs:
+        for useMmap in [0, 1]:
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                rinexObs = readRinexObs(os.path.join(fixture_path, rinexFilename), denseObs=1, useMmap=useMmap)
+                compactObs = readRinexObs(os.path.join(fixture_path, compactFilename), denseObs=1)
+            differences = compareRinexObs(rinexObs, compactObs)
+            if differences:
+                failed = 1
+                print('ERROR(check_compact_rinex): %s differs from %s, useMmap = %d: %s' \
+                      % (compactFilename, rinexFilename, useMmap, ', '.join(differences)))
+            else:
+                print('INFO(check_compact_rinex): %s equals %s, useMmap = %d, %d epochs' % (compactFilename, rinexFilename, useMmap, rinexObs[5]))
+    sys.exit(failed)
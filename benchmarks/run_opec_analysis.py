@@ -0,0 +1,69 @@
+"""
+Regression run of GNSS_MultipathAnalysis on the RINEX 3 test file
+TestData/ObservationFiles/OPEC00_20100010000.10o (GPS and GLONASS, 24 h,
+30 s interval). The run must complete, and write the output file.
+
+There is no SP3 file of 2010-01-01 in TestData. The SP3 test file of
+2022-01-01 is therefore copied to a temporary directory, with its epochs
+moved to 2010-01-01. The satellite elevation angles of the run are not
+physical, but all steps of the analysis, including the output file, are
+executed.
+
+Usage:
+
+    python benchmarks/run_opec_analysis.py [outputDir]
+"""
+import os, sys, time, tempfile
+
+base_path = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.insert(0, os.path.join(base_path, 'Multipath_analysis'))
+import matplotlib
+matplotlib.use('Agg')
+from GNSS_MultipathAnalysis import GNSS_MultipathAnalysis
+
+rinObsFilename = os.path.join(base_path, 'TestData', 'ObservationFiles', 'OPEC00_20100010000.10o')
+sp3NavFilename = os.path.join(base_path, 'TestData', 'SP3', 'Testfile_20220101.eph')
+
+
+def shiftSP3Date(sp3Filename, outFilename, yearFrom, yearTo, gpsWeek, gpsTow, mjd):
+    """
+    Copies a SP3 file, with year of the header and of all epochs changed from
+    yearFrom to yearTo. GPS week, time-of-week and MJD of the second header
+    line are set to gpsWeek, gpsTow and mjd.
+    """
+    with open(sp3Filename) as fid:
+        lines = fid.readlines()
+    for i, line in enumerate(lines):
+        if line.startswith('#') and i == 0:
+            lines[i] = line[0:3] + line[3:7].replace(str(yearFrom), str(yearTo)) + line[7:]
+        elif line.startswith('##'):
+            lines[i] = '## %4d %15.8f' % (gpsWeek, gpsTow) + line[23:39] + '%5d' % mjd + line[44:]
+        elif line.startswith('*'):
+            lines[i] = line[0:3] + line[3:7].replace(str(yearFrom), str(yearTo)) + line[7:]
+    with open(outFilename, 'w') as fid:
+        fid.writelines(lines)
+
+
+if __name__ == '__main__':
+    outputDir = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else tempfile.mkdtemp()
+    ## -- GNSS_MultipathAnalysis reads Rinex_Frequency_Overview.txt from the working directory
+    os.chdir(os.path.join(base_path, 'Multipath_analysis'))
+    tmpDir = tempfile.mkdtemp()
+    ## -- 2010-01-01: GPS week 1564, time-of-week 432000 s, MJD 55197
+    sp3Filename_2010 = os.path.join(tmpDir, 'Testfile_20100101.eph')
+    shiftSP3Date(sp3NavFilename, sp3Filename_2010, 2022, 2010, 1564, 432000.0, 55197)
+
+    t = time.time()
+    analysisResults = GNSS_MultipathAnalysis(rinObsFilename, sp3NavFilename_1=sp3Filename_2010, outputDir=outputDir, \
+                                             plotEstimates=False, plot_polarplot=False)
+    e = time.time() - t
+
+    outputFiles = [file for file in os.listdir(outputDir) if file.endswith('.txt')]
+    if not outputFiles:
+        print('ERROR(run_opec_analysis): No output file was written to %s' % outputDir)
+        sys.exit(1)
+    for GNSSsystemName in analysisResults['GNSSsystems']:
+        print('INFO(run_opec_analysis): %s: %d bands, %d satellites in observation overview' \
+              % (GNSSsystemName, analysisResults[GNSSsystemName]['nBands'], \
+                 len(analysisResults[GNSSsystemName]['observationOverview'])))
+    print('INFO(run_opec_analysis): Output file %s written to %s in %.1f seconds' % (outputFiles[0], outputDir, e))